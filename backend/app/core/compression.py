@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import metrics
+from app.db.mongodb import get_database
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+MINIMUM_SIZE = 1024
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",") if part.strip()}
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+class CompressionMiddleware:
+    # Compresses buffered JSON/text responses above MINIMUM_SIZE with brotli
+    # or gzip. Responses that already carry Content-Encoding (the cached
+    # catalog bodies below) and event streams pass through untouched.
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message: Optional[Message] = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                return await send(message)
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if ("content-encoding" in headers or "text/event-stream" in content_type
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    return await send(message)
+                start_message = message
+                return
+
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                body = b"".join(chunks)
+                headers = MutableHeaders(raw=start_message["headers"])
+                if len(body) >= self.minimum_size:
+                    body = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                    metrics.incr(f"compression.{encoding}")
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+class CatalogCache:
+    # Serialized and precompressed bodies of public catalog responses, kept
+    # until the underlying collection changes. Writers call bump(); other
+    # worker processes see the new version within `revalidate_interval`
+    # seconds because versions are shared through Mongo.
+    def __init__(self, max_entries: int = 256, revalidate_interval: float = 1.0):
+        self.max_entries = max_entries
+        self.revalidate_interval = revalidate_interval
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+    async def _version(self, namespace: str) -> int:
+        version, checked_at = self._versions.get(namespace, (0, 0.0))
+        if time.monotonic() - checked_at < self.revalidate_interval:
+            return version
+        db = await get_database()
+        doc = await db.cache_versions.find_one({"_id": namespace})
+        version = doc["version"] if doc else 0
+        self._versions[namespace] = (version, time.monotonic())
+        return version
+
+    async def bump(self, *namespaces: str):
+        db = await get_database()
+        for namespace in namespaces:
+            doc = await db.cache_versions.find_one_and_update(
+                {"_id": namespace}, {"$inc": {"version": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            self._versions[namespace] = (doc["version"], time.monotonic())
+
+    async def respond(self, request: Request, namespace: str, key: str, build: Callable[[], Awaitable[Any]]) -> Response:
+        version = await self._version(namespace)
+        cache_key = (namespace, key)
+        entry = self._entries.get(cache_key)
+
+        if entry is None or entry["version"] != version:
+            body = json.dumps(jsonable_encoder(await build()), separators=(",", ":")).encode()
+            entry = {
+                "version": version,
+                "bodies": {None: body},
+                "etag": f'"{namespace}-{version}-{hashlib.sha1(body).hexdigest()[:16]}"',
+            }
+            self._entries[cache_key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            metrics.incr(f"catalogCache.{namespace}.miss")
+        else:
+            metrics.incr(f"catalogCache.{namespace}.hit")
+        self._entries.move_to_end(cache_key)
+
+        headers = {"ETag": entry["etag"], "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == entry["etag"]:
+            return Response(status_code=304, headers=headers)
+
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        raw = entry["bodies"][None]
+        if encoding is None or len(raw) < MINIMUM_SIZE:
+            return Response(content=raw, media_type="application/json", headers=headers)
+
+        # Compressed once per encoding per version, then reused
+        if encoding not in entry["bodies"]:
+            entry["bodies"][encoding] = compress(raw, encoding)
+        headers["Content-Encoding"] = encoding
+        return Response(content=entry["bodies"][encoding], media_type="application/json", headers=headers)
+
+catalog_cache = CatalogCache()
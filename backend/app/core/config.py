@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import List, Optional, Union
 from pydantic_settings import BaseSettings
 from pydantic import field_validator
 from functools import lru_cache
@@ -6,11 +6,52 @@ from functools import lru_cache
 class Settings(BaseSettings):
     PROJECT_NAME: str = "TechnoVIT API"
     MONGODB_URL: str
+    MONGODB_MIN_POOL_SIZE: int = 0
+    MONGODB_MAX_POOL_SIZE: int = 100
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
+    STRIPE_WEBHOOK_SECRET: Optional[str] = None
+    STRIPE_WEBHOOK_TOLERANCE_SECONDS: int = 300
+    TEAM_INVITATIONS_ENABLED: bool = False
+    INVITATION_EXPIRE_HOURS: int = 48
+    FRONTEND_URL: str = "http://localhost:5173"
+    RATE_LIMIT_ENABLED: bool = True
+    # Campus NAT puts many students behind one address, so the per-IP
+    # limits are generous; brute force is held back per account instead
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 600
+    RATE_LIMIT_LOGIN_ACCOUNT_PER_MINUTE: int = 10
+    RATE_LIMIT_REGISTRATION_PER_MINUTE: int = 10
+    RATE_LIMIT_REGISTRATION_IP_PER_MINUTE: int = 600
+    CONCURRENCY_LIMIT_LOGIN: int = 16
+    CONCURRENCY_LIMIT_REGISTRATION: int = 32
+    ADMISSION_MAX_WAITING: int = 64
+    ADMISSION_WAIT_TIMEOUT_SECONDS: float = 2.0
+    TRUST_FORWARDED_FOR: bool = False
+    # Signs venue passes; derived from SECRET_KEY when unset
+    CHECKIN_PASS_SECRET: Optional[str] = None
+    SCHEDULE_CLASH_CHECK_ENABLED: bool = True
+    LIVE_UPDATES_SOURCE: str = "auto"  # auto | local | changestream
+    MERCH_RESERVATION_MINUTES: int = 15
+    MERCH_MAX_QUANTITY_PER_ITEM: int = 10
+    MEDIA_BACKEND: str = "local"
+    MEDIA_ROOT: str = "media"
+    # Prefix of uploaded image URLs; point at a CDN that fronts /media if any
+    MEDIA_URL_PREFIX: str = "/media"
+    MEDIA_MAX_UPLOAD_BYTES: int = 10 * 1024 * 1024
+    MEDIA_WORKERS: int = 0  # 0 = one per CPU
+    PROFILING_ENABLED: bool = False
+    # Requests sending "X-Profile: <token>" are profiled
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 50
+    # Mongo commands slower than this are logged with an explain plan; 0 disables
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_LOG_BYTES: int = 16 * 1024 * 1024  # size of the capped collection
     BACKEND_CORS_ORIGINS: Union[List[str], str] = ["http://localhost:3000", "http://localhost:5173", "http://localhost:5174"]
 
     @field_validator("BACKEND_CORS_ORIGINS", mode="before")
@@ -0,0 +1,38 @@
+from typing import Any, Dict
+
+from app.db.maintenance import to_object_id
+
+# Mirrors frontend/src/lib/feeCalculator.ts so the amount shown at checkout
+# is the amount stored on the registration.
+def compute_amount_due(event: Dict[str, Any], team_size: int) -> float:
+    fee_per_person = event.get("feePerPerson")
+    if fee_per_person:
+        return fee_per_person * team_size
+
+    fee_structure = event.get("feeStructure")
+    if fee_structure and fee_structure.get(str(team_size)):
+        return fee_structure[str(team_size)]
+
+    return event.get("fee") or 0
+
+# Fields compute_amount_due reads, for projections
+FEE_FIELDS = {"fee": 1, "feePerPerson": 1, "feeStructure": 1}
+
+def billed_team_size(reg: Dict[str, Any]) -> int:
+    # Accepted members plus invitees who have not answered yet, so the
+    # amount does not drop while the team is still forming. Declined and
+    # expired invitations no longer count.
+    members = {str(m) for m in reg.get("teamMembers", [])}
+    members.update(str(inv["userId"]) for inv in reg.get("invitationStatus", []) if inv.get("status") == "pending")
+    return len(members)
+
+async def refresh_amount_due(db, registration_id) -> None:
+    # Recompute after the team changes; paid registrations keep what was charged
+    reg = await db.registrations.find_one({"_id": registration_id}, {"event": 1, "teamMembers": 1, "invitationStatus": 1, "paymentStatus": 1})
+    if not reg or reg.get("paymentStatus") == "paid":
+        return
+    event = await db.events.find_one({"_id": to_object_id(reg.get("event"))}, FEE_FIELDS)
+    if not event:
+        return
+    amount = compute_amount_due(event, billed_team_size(reg))
+    await db.registrations.update_one({"_id": registration_id}, {"$set": {"amountDue": amount}})
@@ -0,0 +1,62 @@
+import time
+from collections import deque
+from typing import Callable, Deque, Dict
+
+# In-process counters, gauges and latency summaries, exposed at /admin/metrics.
+# Values are per worker process.
+
+class _Timing:
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        recent = sorted(self.recent)
+
+        def pct(p: float) -> float:
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+
+        return {
+            "count": self.count,
+            "avgMs": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50Ms": round(pct(0.5) * 1000, 2),
+            "p95Ms": round(pct(0.95) * 1000, 2),
+            "maxMs": round(self.max * 1000, 2),
+        }
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.timings: Dict[str, _Timing] = {}
+
+    def incr(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = _Timing()
+        timing.observe(seconds)
+
+    def gauge(self, name: str, fn: Callable[[], float]):
+        self.gauges[name] = fn
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "uptimeSeconds": round(time.time() - self.started_at, 1),
+            "counters": dict(self.counters),
+            "gauges": {name: fn() for name, fn in self.gauges.items()},
+            "timings": {name: t.snapshot() for name, t in self.timings.items()},
+        }
+
+metrics = Metrics()
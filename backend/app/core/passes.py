@@ -0,0 +1,62 @@
+import base64
+import hashlib
+import hmac
+from dataclasses import dataclass
+from functools import lru_cache
+
+from bson import ObjectId
+
+from app.core.config import get_settings
+
+# Venue passes: the QR code holds the registration, attendee and event IDs
+# plus a truncated HMAC-SHA256 over them, so a gate can verify a pass with
+# no database read. Passes are deterministic - fetching one twice gives the
+# same string - and are never stored.
+#
+#   VP1.<base64url(registration | user | event, 36 bytes)>.<base64url(mac, 16 bytes)>
+
+PASS_PREFIX = "VP1"
+MAC_BYTES = 16
+
+class PassError(Exception):
+    pass
+
+@dataclass(frozen=True)
+class PassClaims:
+    registration: ObjectId
+    user: ObjectId
+    event: ObjectId
+
+@lru_cache()
+def _pass_key() -> bytes:
+    settings = get_settings()
+    if settings.CHECKIN_PASS_SECRET:
+        return settings.CHECKIN_PASS_SECRET.encode()
+    # Derived so that passes and JWTs never share a key
+    return hmac.new(settings.SECRET_KEY.encode(), b"checkin-pass", hashlib.sha256).digest()
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _mac(body: bytes) -> bytes:
+    return hmac.new(_pass_key(), PASS_PREFIX.encode() + body, hashlib.sha256).digest()[:MAC_BYTES]
+
+def issue_pass(registration_id, user_id, event_id) -> str:
+    body = ObjectId(registration_id).binary + ObjectId(user_id).binary + ObjectId(event_id).binary
+    return f"{PASS_PREFIX}.{_b64(body)}.{_b64(_mac(body))}"
+
+def verify_pass(token: str) -> PassClaims:
+    prefix, _, rest = token.strip().partition(".")
+    body_text, _, mac_text = rest.partition(".")
+    if prefix != PASS_PREFIX or not body_text or not mac_text:
+        raise PassError("Not a venue pass")
+    try:
+        body, mac = _unb64(body_text), _unb64(mac_text)
+    except (ValueError, TypeError):
+        raise PassError("Malformed pass")
+    if len(body) != 36 or not hmac.compare_digest(mac, _mac(body)):
+        raise PassError("Invalid pass signature")
+    return PassClaims(ObjectId(body[:12]), ObjectId(body[12:24]), ObjectId(body[24:]))
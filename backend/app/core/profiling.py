@@ -0,0 +1,207 @@
+import asyncio
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from pymongo import monitoring
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+# Opt-in per-request profiling. When PROFILING_ENABLED is set, a request is
+# profiled if it carries `X-Profile: <PROFILING_TOKEN>` or is picked by
+# PROFILING_SAMPLE_RATE. It gets a cProfile dump plus a trace of the Mongo
+# commands it issued, written to PROFILING_DIR (oldest files rotated out)
+# and listed at /admin/profiles. When disabled neither the middleware nor
+# the command listener is installed, so there is no per-request cost.
+#
+# cProfile sees the whole thread, so coroutines of other requests running
+# at the same time show up too; only one request is profiled at a time.
+# Event streams are dropped at their first response message: they stay
+# open for as long as the client does and would block all other profiling.
+
+PROFILE_HEADER = "x-profile"
+TOP_FUNCTIONS = 40
+_ID_RE = re.compile(r"^[0-9A-Za-z_-]+$")
+# Query parameters that carry credentials (EventSource auth, invitation
+# links); their values are not written to profile files
+SECRET_PARAMS = {"access_token", "token"}
+
+def redacted_query(query_string: bytes) -> str:
+    params = parse_qsl(query_string.decode(errors="replace"), keep_blank_values=True)
+    return urlencode([(k, "***" if k in SECRET_PARAMS else v) for k, v in params], safe="*")
+
+# Mongo commands of the profiled request; None everywhere else. Motor runs
+# pymongo on executor threads with a copy of the caller's context, so the
+# listener below sees the request's value.
+_trace: ContextVar[Optional[Dict[str, Any]]] = ContextVar("profile_trace", default=None)
+
+class MongoTraceListener(monitoring.CommandListener):
+    def __init__(self):
+        self._pending: Dict[int, Dict[str, Any]] = {}
+
+    def started(self, event):
+        trace = _trace.get()
+        if trace is None or trace.get("stopped"):
+            return
+        target = event.command.get(event.command_name)
+        entry = {
+            "command": event.command_name,
+            "collection": target if isinstance(target, str) else None,
+            "startedMs": round((time.perf_counter() - trace["t0"]) * 1000, 3),
+        }
+        trace["commands"].append(entry)
+        self._pending[event.request_id] = entry
+
+    def _finish(self, event, ok: bool):
+        entry = self._pending.pop(event.request_id, None)
+        if entry is not None:
+            entry["durationMs"] = round(event.duration_micros / 1000, 3)
+            entry["ok"] = ok
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+mongo_trace_listener = MongoTraceListener()
+
+class ProfileStore:
+    # Pairs of <id>.prof (pstats) and <id>.json (request, Mongo trace, top
+    # functions) in one directory, keeping the newest `max_files` profiles
+    def __init__(self, directory: str, max_files: int):
+        self.directory = os.path.abspath(directory)
+        self.max_files = max_files
+
+    def path(self, profile_id: str, ext: str) -> Optional[str]:
+        if not _ID_RE.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.{ext}")
+        return path if os.path.isfile(path) else None
+
+    def save(self, profile_id: str, profiler: cProfile.Profile, meta: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        meta["topFunctions"] = out.getvalue()
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as f:
+            json.dump(meta, f, default=str)
+        self.rotate()
+
+    def rotate(self):
+        metas = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        for name in metas[:max(0, len(metas) - self.max_files)]:
+            for ext in ("json", "prof"):
+                try:
+                    os.remove(os.path.join(self.directory, name[:-4] + ext))
+                except FileNotFoundError:
+                    pass
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for name in sorted((n for n in os.listdir(self.directory) if n.endswith(".json")), reverse=True)[:limit]:
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            meta.pop("topFunctions", None)
+            meta["mongoCommands"] = len(meta.pop("mongoTrace", []))
+            summaries.append(meta)
+        return summaries
+
+    def read(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        path = self.path(profile_id, "json")
+        if path is None:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+def get_profile_store() -> ProfileStore:
+    settings = get_settings()
+    return ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.settings = get_settings()
+        self.store = get_profile_store()
+        self._busy = False
+
+    def _wanted(self, scope: Scope) -> bool:
+        token = self.settings.PROFILING_TOKEN
+        if token:
+            header = Headers(scope=scope).get(PROFILE_HEADER)
+            if header and hmac.compare_digest(header, token):
+                return True
+        rate = self.settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self._busy or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        self._busy = True
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        status_code = None
+        streaming = False
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                if headers.get("content-type", "").startswith("text/event-stream"):
+                    # Give up on this one and free the slot for other requests
+                    streaming = True
+                    profiler.disable()
+                    trace["stopped"] = True
+                    self._busy = False
+                else:
+                    headers.append("X-Profile-Id", profile_id)
+            await send(message)
+
+        t0 = time.perf_counter()
+        trace: Dict[str, Any] = {"t0": t0, "commands": []}
+        token = _trace.set(trace)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _trace.reset(token)
+            if not streaming:
+                profiler.disable()
+                self._busy = False
+                meta = {
+                    "id": profile_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": redacted_query(scope.get("query_string", b"")),
+                    "status": status_code,
+                    "durationMs": round((time.perf_counter() - t0) * 1000, 3),
+                    "createdAt": datetime.utcnow(),
+                    "mongoTrace": trace["commands"],
+                }
+                meta["mongoTimeMs"] = round(sum(c.get("durationMs", 0) for c in meta["mongoTrace"]), 3)
+                try:
+                    await asyncio.to_thread(self.store.save, profile_id, profiler, meta)
+                except Exception as e:
+                    print(f"WARNING: Could not save profile {profile_id}: {e}")
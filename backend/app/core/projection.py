@@ -0,0 +1,47 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+# Sparse fieldsets: `?fields=name,venue` becomes a Mongo projection so
+# unrequested fields never leave the database. Field names are the public
+# (alias) names, e.g. `_id`. Required model fields are always fetched so the
+# documents still validate, and forbidden fields can never be selected.
+
+def public_fields(model: Type[BaseModel]) -> Set[str]:
+    return {info.alias or name for name, info in model.model_fields.items()}
+
+class FieldSelector:
+    def __init__(self, model: Type[BaseModel], always: Iterable[str] = ("_id",),
+                 default_exclude: Iterable[str] = (), forbidden: Iterable[str] = ()):
+        self.model = model
+        self.forbidden = set(forbidden)
+        self.allowed = public_fields(model) - self.forbidden
+        self.always = set(always)
+        self.default_exclude = set(default_exclude) | self.forbidden
+        self.required = {info.alias or name for name, info in model.model_fields.items() if info.is_required()}
+        self._names = {info.alias or name: name for name, info in model.model_fields.items()}
+
+    def parse(self, fields: Optional[str]) -> Optional[Set[str]]:
+        if fields is None:
+            return None
+        selected = {f.strip() for f in fields.split(",") if f.strip()}
+        if "id" in selected:
+            selected.discard("id")
+            selected.add("_id")
+        unknown = selected - self.allowed
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown or unavailable fields: {', '.join(sorted(unknown))}")
+        return selected | self.always
+
+    def projection(self, selected: Optional[Set[str]]) -> Optional[Dict[str, int]]:
+        if selected is None:
+            return {f: 0 for f in self.default_exclude} or None
+        return {f: 1 for f in selected | self.required}
+
+    def wants(self, selected: Optional[Set[str]], field: str) -> bool:
+        return selected is None or field in selected
+
+    def dump(self, items: List[BaseModel], selected: Set[str]) -> List[Dict[str, Any]]:
+        include = {self._names[f] for f in selected if f in self._names}
+        return [item.model_dump(mode="json", by_alias=True, include=include) for item in items]
@@ -0,0 +1,203 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from jose import JWTError
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.core.security import decode_access_token
+
+# Admission control for the endpoints that melt down first when
+# registrations open: login and registration creation. Requests are checked
+# against per-IP and per-user token buckets (429 when empty) and then
+# against a concurrency limit per route class; a short bounded wait is
+# allowed, after which excess load is shed with 503. Limits are per worker
+# process.
+
+@dataclass
+class RouteClass:
+    name: str
+    ip_rate: int           # requests per minute per client IP (0 = off)
+    user_rate: int         # requests per minute per authenticated user (0 = off)
+    concurrency: int       # requests in flight at once
+    max_waiting: int       # requests allowed to queue for a slot
+    wait_timeout: float    # seconds a queued request may wait
+
+class TokenBuckets:
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, per_minute: int) -> float:
+        # Returns 0 when a token was taken, else seconds until one is available.
+        # Bucket capacity is one minute's worth of requests.
+        rate = per_minute / 60.0
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(key, (float(per_minute), now))
+        tokens = min(float(per_minute), tokens + (now - last) * rate)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            wait = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            wait = (1 - tokens) / rate
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+# Password attempts per submitted account. The middleware cannot see the
+# login form, so the login route takes from these buckets itself.
+login_attempts = TokenBuckets()
+
+def take_login_attempt(username: str) -> float:
+    # Seconds until another attempt is allowed for this account (0 = go ahead)
+    settings = get_settings()
+    if not settings.RATE_LIMIT_ENABLED or not settings.RATE_LIMIT_LOGIN_ACCOUNT_PER_MINUTE:
+        return 0.0
+    wait = login_attempts.take(f"login:account:{username.strip().lower()}", settings.RATE_LIMIT_LOGIN_ACCOUNT_PER_MINUTE)
+    if wait:
+        metrics.incr("admission.login.shedAccount")
+    return wait
+
+class ConcurrencyGate:
+    def __init__(self, route_class: RouteClass):
+        self.route_class = route_class
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> bool:
+        async with self._condition:
+            if self.in_flight < self.route_class.concurrency:
+                self.in_flight += 1
+                return True
+            if self.waiting >= self.route_class.max_waiting:
+                return False
+            self.waiting += 1
+            metrics.incr(f"admission.{self.route_class.name}.queued")
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_flight < self.route_class.concurrency),
+                    self.route_class.wait_timeout,
+                )
+            except asyncio.TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            return True
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+def build_route_classes() -> Dict[str, RouteClass]:
+    settings = get_settings()
+    return {
+        "login": RouteClass(
+            "login",
+            ip_rate=settings.RATE_LIMIT_LOGIN_PER_MINUTE,
+            user_rate=0,
+            concurrency=settings.CONCURRENCY_LIMIT_LOGIN,
+            max_waiting=settings.ADMISSION_MAX_WAITING,
+            wait_timeout=settings.ADMISSION_WAIT_TIMEOUT_SECONDS,
+        ),
+        "registration": RouteClass(
+            "registration",
+            ip_rate=settings.RATE_LIMIT_REGISTRATION_IP_PER_MINUTE,
+            user_rate=settings.RATE_LIMIT_REGISTRATION_PER_MINUTE,
+            concurrency=settings.CONCURRENCY_LIMIT_REGISTRATION,
+            max_waiting=settings.ADMISSION_MAX_WAITING,
+            wait_timeout=settings.ADMISSION_WAIT_TIMEOUT_SECONDS,
+        ),
+    }
+
+def classify(method: str, path: str) -> Optional[str]:
+    if method != "POST":
+        return None
+    path = path.rstrip("/")
+    if path in ("/auth/login", "/auth/google", "/auth/signup", "/auth/refresh"):
+        return "login"
+    if path == "/registrations":
+        return "registration"
+    return None
+
+class AdmissionControlMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.settings = get_settings()
+        self.route_classes = build_route_classes()
+        self.gates = {name: ConcurrencyGate(rc) for name, rc in self.route_classes.items()}
+        self.buckets = TokenBuckets()
+        for name, gate in self.gates.items():
+            metrics.gauge(f"admission.{name}.inFlight", lambda gate=gate: gate.in_flight)
+            metrics.gauge(f"admission.{name}.waiting", lambda gate=gate: gate.waiting)
+
+    def _client_ip(self, scope: Scope) -> str:
+        if self.settings.TRUST_FORWARDED_FOR:
+            for key, value in scope.get("headers", []):
+                if key == b"x-forwarded-for":
+                    return value.decode().split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _user(self, scope: Scope) -> Optional[str]:
+        for key, value in scope.get("headers", []):
+            if key == b"authorization":
+                scheme, _, token = value.decode().partition(" ")
+                if scheme.lower() != "bearer" or not token:
+                    return None
+                try:
+                    return decode_access_token(token).get("sub")
+                except JWTError:
+                    return None
+        return None
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, status_code: int, retry_after: float, detail: str, route_class: str):
+        metrics.incr(f"admission.{route_class}.shed{status_code}")
+        response = JSONResponse(
+            {"detail": detail},
+            status_code=status_code,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.settings.RATE_LIMIT_ENABLED:
+            return await self.app(scope, receive, send)
+
+        name = classify(scope["method"], scope["path"])
+        if name is None:
+            return await self.app(scope, receive, send)
+
+        route_class = self.route_classes[name]
+
+        # 1. Per-client rate limits
+        if route_class.ip_rate:
+            wait = self.buckets.take(f"{name}:ip:{self._client_ip(scope)}", route_class.ip_rate)
+            if wait:
+                return await self._reject(scope, receive, send, 429, wait, "Too many requests, slow down", name)
+        if route_class.user_rate:
+            user = self._user(scope)
+            if user:
+                wait = self.buckets.take(f"{name}:user:{user}", route_class.user_rate)
+                if wait:
+                    return await self._reject(scope, receive, send, 429, wait, "Too many requests, slow down", name)
+
+        # 2. Global concurrency for the route class
+        gate = self.gates[name]
+        if not await gate.acquire():
+            return await self._reject(scope, receive, send, 503, route_class.wait_timeout, "Server is busy, please retry", name)
+
+        metrics.incr(f"admission.{name}.admitted")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await gate.release()
@@ -0,0 +1,99 @@
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db.maintenance import id_variants, to_object_id
+
+# Schedule clashes between a new registration and the ones its team members
+# already hold. Each registration carries its event's time window
+# (startsAt/endsAt, copied from the event) so the check is one indexed query
+# on (teamMembers, startsAt) instead of loading every registration and event
+# of every member.
+
+# Events without an end are assumed to take this long
+DEFAULT_EVENT_DURATION = timedelta(hours=2)
+SCHEDULE_FIELDS = {"startDate": 1, "startTime": 1, "endDate": 1, "endTime": 1}
+MAX_CLASHES_REPORTED = 20
+
+_TIME_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])?\s*$")
+
+def _with_time(day: datetime, time_str: Optional[str]) -> datetime:
+    # startDate is normally a full timestamp; older events stored the day
+    # only, with the time of day in startTime ("14:30" or "2:30 PM")
+    day = day.replace(tzinfo=None)
+    if not time_str or (day.hour, day.minute, day.second) != (0, 0, 0):
+        return day
+    match = _TIME_RE.match(time_str)
+    if not match:
+        return day
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if match.group(3):
+        hour = hour % 12 + (12 if match.group(3).lower() == "pm" else 0)
+    if hour > 23 or minute > 59:
+        return day
+    return day.replace(hour=hour, minute=minute)
+
+def event_window(event: Dict[str, Any]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    if not event.get("startDate"):
+        return None, None
+    start = _with_time(event["startDate"], event.get("startTime"))
+    end = None
+    if event.get("endDate"):
+        end = _with_time(event["endDate"], event.get("endTime"))
+    elif event.get("endTime"):
+        end = _with_time(event["startDate"], event["endTime"])
+    if end is None or end <= start:
+        end = start + DEFAULT_EVENT_DURATION
+    return start, end
+
+def window_fields(event: Dict[str, Any]) -> Dict[str, Optional[datetime]]:
+    start, end = event_window(event)
+    return {"startsAt": start, "endsAt": end}
+
+async def find_clashes(db, member_ids: List[Any], event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # Registrations of any of `member_ids` whose window overlaps the event's
+    start, end = event_window(event)
+    return await find_clashes_in_window(db, member_ids, start, end, event["_id"])
+
+async def find_clashes_in_window(db, member_ids: List[Any], start: Optional[datetime], end: Optional[datetime], event_id: Any) -> List[Dict[str, Any]]:
+    # Same, for a window already stored on a registration (startsAt/endsAt)
+    if start is None:
+        return []
+    refs = [ref for uid in member_ids for ref in id_variants(uid)]
+    return await db.registrations.find(
+        {
+            "teamMembers": {"$in": refs},
+            "startsAt": {"$lt": end},
+            "endsAt": {"$gt": start},
+            "event": {"$nin": id_variants(event_id)},
+        },
+        {"event": 1, "teamMembers": 1, "startsAt": 1, "endsAt": 1},
+    ).limit(MAX_CLASHES_REPORTED).to_list(MAX_CLASHES_REPORTED)
+
+async def describe_clashes(db, clashes: List[Dict[str, Any]], member_ids: List[Any]) -> List[Dict[str, Any]]:
+    members = {str(uid) for uid in member_ids}
+    event_ids = list({to_object_id(c["event"]) for c in clashes})
+    user_ids = list({to_object_id(u) for c in clashes for u in c.get("teamMembers", []) if str(u) in members})
+    events = {e["_id"]: e["name"] for e in await db.events.find({"_id": {"$in": event_ids}}, {"name": 1}).to_list(None)}
+    users = {u["_id"]: u.get("name") or u["email"] for u in await db.users.find({"_id": {"$in": user_ids}}, {"name": 1, "email": 1}).to_list(None)}
+    return [
+        {
+            "eventId": str(c["event"]),
+            "eventName": events.get(to_object_id(c["event"]), "Unknown event"),
+            "startsAt": c["startsAt"],
+            "endsAt": c["endsAt"],
+            "members": [users.get(to_object_id(u), str(u)) for u in c.get("teamMembers", []) if str(u) in members],
+        }
+        for c in clashes
+    ]
+
+def clash_summary(described: List[Dict[str, Any]]) -> str:
+    return "; ".join(f"{', '.join(c['members'])} in {c['eventName']} ({c['startsAt']:%d %b %H:%M}-{c['endsAt']:%H:%M})" for c in described)
+
+async def refresh_registration_windows(db, event_id: Any) -> int:
+    # Called after an event's dates change
+    event = await db.events.find_one({"_id": to_object_id(event_id)}, SCHEDULE_FIELDS)
+    if not event:
+        return 0
+    result = await db.registrations.update_many({"event": {"$in": id_variants(event_id)}}, {"$set": window_fields(event)})
+    return result.modified_count
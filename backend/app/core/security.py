@@ -1,17 +1,31 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from functools import lru_cache
 from app.core.config import get_settings
 
 settings = get_settings()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+@lru_cache()
+def get_pwd_context():
+    # Built on first use; loading passlib's bcrypt backend is slow and most
+    # requests never hash a password
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def warm_up_password_hashing():
+    # Loads the bcrypt backend (first hash is noticeably slower than the rest)
+    get_pwd_context().hash("warm-up")
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -22,3 +36,69 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+class DecodedTokenCache:
+    # LRU of verified JWT claims keyed by a digest of the token. Entries are
+    # dropped once the token's exp passes, and the whole cache is cleared
+    # when the signing key or algorithm changes.
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._key_fingerprint: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(secret: str, algorithm: str) -> bytes:
+        return hashlib.sha256(f"{algorithm}:{secret}".encode()).digest()
+
+    def _check_key(self, secret: str, algorithm: str):
+        fingerprint = self._fingerprint(secret, algorithm)
+        if fingerprint != self._key_fingerprint:
+            self._entries.clear()
+            self._key_fingerprint = fingerprint
+
+    def get(self, token: str, secret: str, algorithm: str) -> Optional[Dict[str, Any]]:
+        digest = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._check_key(secret, algorithm)
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            payload, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[digest]
+                return None
+            self._entries.move_to_end(digest)
+            return payload
+
+    def put(self, token: str, payload: Dict[str, Any], secret: str, algorithm: str):
+        exp = payload.get("exp")
+        if exp is None:
+            # Without an expiry there is nothing to bound the entry's lifetime
+            return
+        digest = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            self._check_key(secret, algorithm)
+            self._entries[digest] = (payload, float(exp))
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = DecodedTokenCache()
+
+def decode_access_token(token: str, use_cache: bool = True) -> Dict[str, Any]:
+    # Raises JWTError like jwt.decode; a cached hit skips signature checks
+    # because the same token already passed them
+    current = get_settings()
+    if use_cache:
+        payload = token_cache.get(token, current.SECRET_KEY, current.ALGORITHM)
+        if payload is not None:
+            return payload
+    payload = jwt.decode(token, current.SECRET_KEY, algorithms=[current.ALGORITHM])
+    if use_cache:
+        token_cache.put(token, payload, current.SECRET_KEY, current.ALGORITHM)
+    return payload
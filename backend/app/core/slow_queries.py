@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import json
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.db.mongodb import get_database
+
+# Slow-query log. A command listener times every Mongo command; those over
+# SLOW_QUERY_THRESHOLD_MS are reduced to a shape (the filter with its values
+# replaced by "?"), tagged with the route that issued them and handed to a
+# background task, which captures an explain plan and writes the record to
+# the capped `slow_queries` collection. /admin/slow-queries groups them by
+# shape. The listener thread only keeps a reference to each command until
+# it finishes; nothing is copied or serialised for fast commands.
+
+SLOW_QUERIES_COLLECTION = "slow_queries"
+EXPLAIN_INTERVAL = 300  # seconds before the same shape is explained again
+IGNORED_COMMANDS = {
+    "explain", "hello", "ismaster", "isMaster", "ping", "buildInfo", "endSessions",
+    "saslStart", "saslContinue", "getMore", "killCursors", "create", "createIndexes",
+}
+EXPLAINABLE = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+SESSION_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction"}
+
+# Scope of the request being handled; the matched route is read from it
+# lazily. Motor runs pymongo on executor threads with a copy of the
+# caller's context, so the listener sees the request's value.
+_request_scope: ContextVar[Optional[Scope]] = ContextVar("request_scope", default=None)
+
+class RouteContextMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = _request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_scope.reset(token)
+
+def current_route() -> Optional[str]:
+    scope = _request_scope.get()
+    if scope is None:
+        return None  # background jobs, workers
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+
+def shape_of(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: shape_of(v) for k, v in value.items()}
+    # $or/$and branches keep their structure; value lists ($in) collapse
+    if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+        return [shape_of(v) for v in value]
+    return "?"
+
+def command_shape(name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    target = command.get(name)
+    shape: Dict[str, Any] = {"command": name, "collection": target if isinstance(target, str) else None}
+    if name == "find":
+        shape["filter"] = shape_of(command.get("filter", {}))
+        if command.get("sort"):
+            shape["sort"] = dict(command["sort"])
+    elif name == "aggregate":
+        shape["pipeline"] = [
+            {stage: shape_of(spec) if stage == "$match" else "..."}
+            for step in command.get("pipeline", []) for stage, spec in step.items()
+        ]
+    elif name in ("count", "distinct", "findAndModify"):
+        shape["filter"] = shape_of(command.get("query", {}))
+    elif name in ("update", "delete"):
+        statements = command.get("updates" if name == "update" else "deletes", [])
+        shape["filter"] = shape_of(statements[0].get("q", {})) if statements else {}
+    return shape
+
+def explain_command(name: str, command: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if name not in EXPLAINABLE:
+        return None
+    # $db, $clusterTime, session fields etc. belong to the original send
+    inner = {k: v for k, v in command.items() if not k.startswith("$") and k not in SESSION_FIELDS}
+    if name in ("update", "delete"):
+        key = "updates" if name == "update" else "deletes"
+        inner[key] = list(inner.get(key, []))[:1]
+    return {"explain": inner, "verbosity": "queryPlanner"}
+
+def plan_summary(planner: Dict[str, Any]) -> Dict[str, Any]:
+    # Winning plan as "FETCH <- IXSCAN(email_1)" plus the indexes it uses
+    stages: List[str] = []
+    indexes: List[str] = []
+    node = planner.get("winningPlan", {})
+    node = node.get("queryPlan", node)  # slot-based engine nests it
+    while node:
+        stage = node.get("stage", "?")
+        if node.get("indexName"):
+            indexes.append(node["indexName"])
+            stage += f"({node['indexName']})"
+        stages.append(stage)
+        children = node.get("inputStages") or [node.get("inputStage")]
+        node = children[0] if children and children[0] else None
+    return {"stages": " <- ".join(stages), "indexes": indexes, "collscan": "COLLSCAN" in stages}
+
+class SlowQueryListener(monitoring.CommandListener):
+    def __init__(self, threshold_ms: float):
+        self.threshold_micros = threshold_ms * 1000
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self._pending: Dict[Tuple[Any, int], Tuple[Dict[str, Any], Optional[str], str]] = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS or event.command.get(event.command_name) == SLOW_QUERIES_COLLECTION:
+            return
+        self._pending[(event.connection_id, event.request_id)] = (event.command, current_route(), event.database_name)
+
+    def _finish(self, event, ok: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None or event.duration_micros < self.threshold_micros:
+            return
+        command, route, database = pending
+        metrics.incr("mongo.slowCommands")
+        if self.loop is None:
+            return
+        record = {
+            "command": event.command_name,
+            "shape": command_shape(event.command_name, command),
+            "route": route,
+            "database": database,
+            "durationMs": round(event.duration_micros / 1000, 3),
+            "ok": ok,
+            "at": datetime.utcnow(),
+        }
+        self.loop.call_soon_threadsafe(self._enqueue, record, explain_command(event.command_name, command))
+
+    def _enqueue(self, record: Dict[str, Any], explain: Optional[Dict[str, Any]]):
+        try:
+            self.queue.put_nowait((record, explain))
+        except asyncio.QueueFull:
+            metrics.incr("mongo.slowCommandsDropped")
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+class SlowQueryRecorder:
+    def __init__(self, listener: SlowQueryListener, max_queue: int = 1000):
+        self.listener = listener
+        self.max_queue = max_queue
+        self._explained: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        db = await get_database()
+        try:
+            await db.create_collection(SLOW_QUERIES_COLLECTION, capped=True, size=get_settings().SLOW_QUERY_LOG_BYTES)
+        except CollectionInvalid:
+            pass  # already there
+        # Created here rather than in ensure_indexes, which would otherwise
+        # create the collection uncapped on a fresh database
+        await db[SLOW_QUERIES_COLLECTION].create_index([("at", -1)], name="slow_query_at")
+        self.listener.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.listener.loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.listener.loop = None
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            record, explain = await self.listener.queue.get()
+            try:
+                await self._record(record, explain)
+            except Exception as e:
+                print(f"WARNING: Could not record slow query: {e}")
+
+    async def _record(self, record: Dict[str, Any], explain: Optional[Dict[str, Any]]):
+        db = await get_database()
+        # Shapes keep operator names as keys ($or, $in), so they are stored
+        # as JSON text rather than as documents
+        shape = json.dumps(record["shape"], sort_keys=True, default=str)
+        record["shape"] = shape
+        record["shapeId"] = hashlib.sha1(shape.encode()).hexdigest()[:16]
+
+        now = time.monotonic()
+        if explain is not None and now - self._explained.get(record["shapeId"], -EXPLAIN_INTERVAL) >= EXPLAIN_INTERVAL:
+            self._explained[record["shapeId"]] = now
+            try:
+                result = await db.client[record["database"]].command(explain)
+                planner = result.get("queryPlanner") or result.get("stages", [{}])[0].get("$cursor", {}).get("queryPlanner", {})
+                record["plan"] = plan_summary(planner)
+                record["explain"] = json.dumps(planner, default=str)
+            except Exception as e:
+                record["planError"] = str(e)
+
+        await db[SLOW_QUERIES_COLLECTION].insert_one(record)
+
+slow_query_listener = SlowQueryListener(get_settings().SLOW_QUERY_THRESHOLD_MS)
+slow_query_recorder = SlowQueryRecorder(slow_query_listener)
@@ -0,0 +1,40 @@
+import re
+from typing import Any, Dict, List
+
+# Typeahead over users. Every user document carries `searchKeys`: its
+# lower-cased email, full name, each word of the name and registration
+# number, each tagged with its kind ("e:", "n:", "r:"). One multikey index
+# on that array serves anchored prefix regexes as bounded index scans, so a
+# lookup reads at most `limit` entries no matter how many users there are.
+# Keep the keys in step whenever email, name or registrationNumber change.
+#
+# Students may only look people up by email or registration number, with a
+# longer prefix, so the endpoint cannot be walked to list every user.
+
+SEARCH_KEYS_FIELD = "searchKeys"
+SEARCH_SOURCE_FIELDS = ("email", "name", "registrationNumber")
+MIN_QUERY_LENGTH = 2
+MIN_STUDENT_QUERY_LENGTH = 4
+MAX_RESULTS = 20
+ALL_KINDS = ("e", "n", "r")
+STUDENT_KINDS = ("e", "r")
+
+def search_keys(user: Dict[str, Any]) -> List[str]:
+    keys = set()
+    if user.get("email"):
+        keys.add("e:" + str(user["email"]).strip().lower())
+    if user.get("registrationNumber"):
+        keys.add("r:" + str(user["registrationNumber"]).strip().lower())
+    name = " ".join(str(user.get("name") or "").lower().split())
+    if name:
+        keys.add("n:" + name)
+        keys.update("n:" + word for word in name.split(" "))
+    return sorted(keys)
+
+def with_search_keys(user: Dict[str, Any]) -> Dict[str, Any]:
+    user[SEARCH_KEYS_FIELD] = search_keys(user)
+    return user
+
+def search_filter(q: str, kinds=ALL_KINDS) -> Dict[str, Any]:
+    prefix = re.escape(" ".join(q.lower().split()))
+    return {SEARCH_KEYS_FIELD: {"$in": [re.compile(f"^{kind}:{prefix}") for kind in kinds]}}
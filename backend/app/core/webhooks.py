@@ -0,0 +1,44 @@
+import hashlib
+import hmac
+import time
+from typing import Optional
+
+# Stripe-compatible webhook signatures: the header looks like
+# "t=<unix timestamp>,v1=<hex HMAC-SHA256 of '<t>.<raw body>'>"
+
+class WebhookSignatureError(Exception):
+    pass
+
+def _compute_signature(payload: bytes, secret: str, timestamp: int) -> str:
+    signed_payload = f"{timestamp}.".encode() + payload
+    return hmac.new(secret.encode(), signed_payload, hashlib.sha256).hexdigest()
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    return f"t={timestamp},v1={_compute_signature(payload, secret, timestamp)}"
+
+def verify_signature(payload: bytes, header: Optional[str], secret: str, tolerance: int = 300) -> None:
+    if not header:
+        raise WebhookSignatureError("Missing signature header")
+
+    timestamp = None
+    signatures = []
+    for part in header.split(","):
+        key, _, value = part.strip().partition("=")
+        if key == "t":
+            try:
+                timestamp = int(value)
+            except ValueError:
+                raise WebhookSignatureError("Invalid timestamp")
+        elif key == "v1":
+            signatures.append(value)
+
+    if timestamp is None or not signatures:
+        raise WebhookSignatureError("Malformed signature header")
+
+    if tolerance and abs(time.time() - timestamp) > tolerance:
+        raise WebhookSignatureError("Timestamp outside the tolerance zone")
+
+    expected = _compute_signature(payload, secret, timestamp)
+    if not any(hmac.compare_digest(expected, sig) for sig in signatures):
+        raise WebhookSignatureError("No matching signature")
@@ -0,0 +1,52 @@
+from pymongo import ASCENDING, DESCENDING, TEXT
+from pymongo.errors import OperationFailure
+
+async def ensure_indexes(db):
+    # Each index is created independently so one failure (e.g. duplicate
+    # emails already in the collection) does not block the others.
+    specs = [
+        (db.users, [("email", ASCENDING)], {"unique": True, "name": "email_unique"}),
+        # Typeahead: prefix match on email, name words and registration number
+        (db.users, [("searchKeys", ASCENDING)], {"name": "user_search"}),
+        (db.events, [("name", TEXT), ("description", TEXT), ("venue", TEXT)],
+         {"name": "event_text", "weights": {"name": 10, "venue": 3, "description": 1}, "default_language": "english"}),
+        # Serves the feed sort (pinned first, then by date) and calendar ranges
+        (db.events, [("isHidden", ASCENDING), ("isPinned", DESCENDING), ("startDate", ASCENDING)], {"name": "event_feed"}),
+        # Revenue / dues reports group by these without touching events
+        (db.registrations, [("event", ASCENDING), ("paymentStatus", ASCENDING)], {"name": "event_payment_status"}),
+        # Schedule-clash lookups: a member's registrations by start time
+        (db.registrations, [("teamMembers", ASCENDING), ("startsAt", ASCENDING)], {"name": "member_schedule"}),
+        # Sweep of lapsed team invitations
+        (db.registrations, [("invitationStatus.tokenExpires", ASCENDING)], {"name": "invitation_status_expiry"}),
+        # One check-in per attendee; later scans are rejected as duplicates
+        (db.checkins, [("registration", ASCENDING), ("user", ASCENDING)], {"unique": True, "name": "checkin_unique"}),
+        (db.checkins, [("event", ASCENDING), ("scannedAt", ASCENDING)], {"name": "checkin_event"}),
+        # Mongo drops stale pending invitations itself; answered ones have no expiresAt
+        (db.invitations, [("expiresAt", ASCENDING)], {"name": "invitation_ttl", "expireAfterSeconds": 0}),
+        (db.invitations, [("userId", ASCENDING), ("status", ASCENDING)], {"name": "invitation_user_status"}),
+        (db.refresh_tokens, [("expiresAt", ASCENDING)], {"name": "refresh_token_ttl", "expireAfterSeconds": 0}),
+        (db.refresh_tokens, [("family", ASCENDING)], {"name": "refresh_token_family"}),
+        (db.refresh_tokens, [("userId", ASCENDING)], {"name": "refresh_token_user"}),
+        # Time series reads: one dimension value over an hour range
+        (db.registration_buckets, [("dim", ASCENDING), ("key", ASCENDING), ("hour", ASCENDING)], {"name": "bucket_series"}),
+        (db.registration_buckets, [("dim", ASCENDING), ("hour", ASCENDING)], {"name": "bucket_dim_hour"}),
+        # Expiry sweep and per-user order history
+        (db.merch_orders, [("status", ASCENDING), ("expiresAt", ASCENDING)], {"name": "merch_order_expiry"}),
+        (db.merch_orders, [("user", ASCENDING), ("createdAt", DESCENDING)], {"name": "merch_order_user"}),
+        (db.jobs, [("type", ASCENDING), ("status", ASCENDING), ("runAt", ASCENDING)], {"name": "job_dispatch"}),
+        (db.jobs, [("finishedAt", ASCENDING)],
+         {"name": "job_done_ttl", "expireAfterSeconds": 7 * 24 * 3600, "partialFilterExpression": {"status": "done"}}),
+    ]
+    for collection, keys, options in specs:
+        try:
+            await collection.create_index(keys, **options)
+        except OperationFailure as e:
+            print(f"WARNING: Could not create index {options.get('name')} on {collection.name}: {e}")
+
+    # Deleted registrations reach the live dashboards with their counts only
+    # when the change stream can return the pre-image (app/services/live.py).
+    # Needs MongoDB 6.0+; standalone servers and older versions refuse it.
+    try:
+        await db.command("collMod", "registrations", changeStreamPreAndPostImages={"enabled": True})
+    except OperationFailure as e:
+        print(f"WARNING: Could not enable change stream pre-images on registrations: {e}")
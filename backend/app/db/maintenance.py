@@ -0,0 +1,128 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+CHECKPOINT_COLLECTION = "maintenance_checkpoints"
+
+def to_object_id(value: Any) -> Any:
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return ObjectId(value)
+    return value
+
+def id_variants(value: Any) -> List[Any]:
+    # References are stored as either strings or ObjectIds across the collections
+    if isinstance(value, ObjectId):
+        return [value, str(value)]
+    if isinstance(value, str) and ObjectId.is_valid(value):
+        return [value, ObjectId(value)]
+    return [value]
+
+# A unit of maintenance work applied to one collection in _id order.
+# Subclasses set `name` and `collection`, optionally narrow `query` and
+# `projection`, and implement `process_batch`, which returns how many
+# documents it changed (or would change, in dry-run mode).
+class BatchTask:
+    name: str = ""
+    collection: str = ""
+
+    def __init__(self, **params):
+        self.params = params
+
+    @property
+    def query(self) -> Dict[str, Any]:
+        return {}
+
+    @property
+    def projection(self) -> Optional[Dict[str, Any]]:
+        return None
+
+    @property
+    def writes(self) -> bool:
+        # Report-only runs are not checkpointed, so a later run that does
+        # write is not skipped as already completed
+        return True
+
+    @property
+    def checkpoint_key(self) -> str:
+        return f"{self.name}:{json.dumps(self.params, sort_keys=True, default=str)}"
+
+    async def prepare(self, db, resuming: bool, dry_run: bool):
+        # Called once before the scan, e.g. to reset derived data on a fresh run
+        pass
+
+    async def process_batch(self, db, docs: List[Dict[str, Any]], dry_run: bool) -> int:
+        raise NotImplementedError
+
+    async def finish(self, db, dry_run: bool):
+        pass
+
+async def run_batched(db, task: BatchTask, batch_size: int = 500, throttle: float = 0.0,
+                      dry_run: bool = False, restart: bool = False, report_every: int = 10):
+    checkpoints = db[CHECKPOINT_COLLECTION]
+    collection = db[task.collection]
+    # Neither dry runs nor report-only runs read or record checkpoints
+    checkpointed = task.writes and not dry_run
+
+    state = None if restart or not checkpointed else await checkpoints.find_one({"_id": task.checkpoint_key})
+    if state and state.get("done"):
+        print(f"[{task.name}] Already completed at {state.get('updatedAt')}. Use --restart to run again.")
+        return state
+
+    last_id = state.get("lastId") if state else None
+    processed = state.get("processed", 0) if state else 0
+    modified = state.get("modified", 0) if state else 0
+    if last_id is not None:
+        print(f"[{task.name}] Resuming after _id {last_id} ({processed} already processed)")
+
+    await task.prepare(db, resuming=last_id is not None, dry_run=dry_run)
+
+    total = await collection.count_documents(task.query)
+    print(f"[{task.name}] {total} matching documents in '{task.collection}'{' (dry run)' if dry_run else ''}")
+
+    started = time.perf_counter()
+    run_processed = 0
+    batches = 0
+
+    while True:
+        query = dict(task.query)
+        if last_id is not None:
+            query = {"$and": [query, {"_id": {"$gt": last_id}}]} if query else {"_id": {"$gt": last_id}}
+
+        docs = await collection.find(query, task.projection).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+
+        modified += await task.process_batch(db, docs, dry_run)
+        processed += len(docs)
+        run_processed += len(docs)
+        last_id = docs[-1]["_id"]
+        batches += 1
+
+        if checkpointed:
+            await checkpoints.update_one(
+                {"_id": task.checkpoint_key},
+                {"$set": {"lastId": last_id, "processed": processed, "modified": modified, "done": False, "updatedAt": datetime.utcnow()}},
+                upsert=True,
+            )
+
+        if batches % report_every == 0:
+            elapsed = time.perf_counter() - started
+            print(f"[{task.name}] {processed} processed, {modified} {'to modify' if dry_run else 'modified'} ({run_processed / elapsed:.0f} docs/s)")
+
+        if throttle:
+            await asyncio.sleep(throttle)
+
+    await task.finish(db, dry_run)
+
+    elapsed = time.perf_counter() - started
+    rate = run_processed / elapsed if elapsed else 0
+    print(f"[{task.name}] Done: {processed} processed, {modified} {'would be modified' if dry_run else 'modified'} in {elapsed:.1f}s ({rate:.0f} docs/s)")
+
+    result = {"lastId": last_id, "processed": processed, "modified": modified, "done": True, "updatedAt": datetime.utcnow()}
+    if checkpointed:
+        await checkpoints.update_one({"_id": task.checkpoint_key}, {"$set": result}, upsert=True)
+    return result
@@ -8,13 +8,29 @@ class Database:
 
 db = Database()
 
+# pymongo command listeners, registered at startup before the client exists
+_command_listeners = []
+
+def register_command_listener(listener):
+    _command_listeners.append(listener)
+
 async def get_database():
     return db.client.get_default_database('test')
 
 async def connect_to_mongo():
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db.client = AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        event_listeners=list(_command_listeners),
+    )
     print("Connected to MongoDB")
 
+async def warm_up_mongo():
+    # The client connects lazily; pinging here makes server selection and the
+    # first pooled connections happen before the worker accepts traffic
+    await db.client.admin.command("ping")
+
 async def close_mongo_connection():
     db.client.close()
     print("Closed MongoDB connection")
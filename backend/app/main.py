@@ -1,20 +1,63 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
-from app.db.mongodb import connect_to_mongo, close_mongo_connection
+from app.core.ratelimit import AdmissionControlMiddleware
+from app.core.compression import CompressionMiddleware
+import asyncio
+from app.core.profiling import ProfilingMiddleware, mongo_trace_listener
+from app.core.slow_queries import RouteContextMiddleware, slow_query_listener, slow_query_recorder
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, get_database, warm_up_mongo, register_command_listener
+from app.core.security import warm_up_password_hashing
+from app.db.indexes import ensure_indexes
 from contextlib import asynccontextmanager
-from app.routers import auth, users, events, clubs, registrations, merch, payments, admin
+from app.routers import auth, users, events, clubs, registrations, merch, orders, payments, admin, media, checkin
+from app.services.payment_events import payment_worker
+from app.services.jobs import job_runner
+from app.services.live import live_bus
+from app.services.checkin import checkin_writer
+from app.services.media import shutdown_image_pool
+from app.services import background  # noqa: F401 - registers job handlers
 
 settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    # Warm-up: the worker only reports ready (lifespan startup completes)
+    # once Mongo is reachable and the bcrypt backend is loaded
+    await asyncio.gather(warm_up_mongo(), asyncio.to_thread(warm_up_password_hashing))
+    await ensure_indexes(await get_database())
+    if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+        await slow_query_recorder.start()
+    await live_bus.start()
+    await payment_worker.start()
+    await checkin_writer.start()
+    await job_runner.start()
     yield
+    await job_runner.stop()
+    await checkin_writer.stop()
+    await payment_worker.stop()
+    await live_bus.stop()
+    await slow_query_recorder.stop()
+    shutdown_image_pool()
     await close_mongo_connection()
 
 app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
+app.add_middleware(CompressionMiddleware)
+
+# Only installed when enabled, so normal requests pay nothing for it
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+    register_command_listener(mongo_trace_listener)
+
+if settings.SLOW_QUERY_THRESHOLD_MS > 0:
+    app.add_middleware(RouteContextMiddleware)
+    register_command_listener(slow_query_listener)
+
+# Added before CORS so that shed (429/503) responses still carry CORS headers
+app.add_middleware(AdmissionControlMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.BACKEND_CORS_ORIGINS,
@@ -29,8 +72,11 @@ app.include_router(events.router)
 app.include_router(clubs.router)
 app.include_router(registrations.router)
 app.include_router(merch.router)
+app.include_router(orders.router)
 app.include_router(payments.router)
 app.include_router(admin.router)
+app.include_router(media.router)
+app.include_router(checkin.router)
 
 @app.get("/")
 async def root():
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, Field, BeforeValidator
 from typing import Optional, List, Annotated
+from app.core.projection import FieldSelector
 
 # Helper to map MongoDB ObjectId to str
 PyObjectId = Annotated[str, BeforeValidator(str)]
@@ -20,3 +21,5 @@ class ClubInDB(ClubBase):
     
     class Config:
         populate_by_name = True
+
+CLUB_FIELDS = FieldSelector(ClubInDB, always=("_id", "name"))
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field, BeforeValidator
 from typing import Optional, List, Dict, Any, Annotated
 from datetime import datetime
+from bson import ObjectId
+from app.core.projection import FieldSelector
 
 # Helper to map MongoDB ObjectId to str
 PyObjectId = Annotated[str, BeforeValidator(str)]
@@ -14,6 +16,7 @@ class EventBase(BaseModel):
     name: str
     description: Optional[str] = None
     poster: Optional[str] = None
+    posterThumbnail: Optional[str] = None  # derived from poster on write
     clubs: List[Any] = [] # List of Club IDs or Club Objects
     isCollaboration: bool = False
     venue: Optional[str] = None
@@ -40,3 +43,38 @@ class EventInDB(EventBase):
 
     class Config:
         populate_by_name = True
+
+class EventBulkFilter(BaseModel):
+    club: Optional[str] = None
+    startFrom: Optional[datetime] = None
+    startTo: Optional[datetime] = None
+    isHidden: Optional[bool] = None
+    isPinned: Optional[bool] = None
+    registrationsOpen: Optional[bool] = None
+
+    def to_query(self) -> Dict[str, Any]:
+        query: Dict[str, Any] = {}
+        if self.club:
+            # Club references are stored either as strings or ObjectIds
+            club_refs: List[Any] = [self.club]
+            if ObjectId.is_valid(self.club):
+                club_refs.append(ObjectId(self.club))
+            query["clubs"] = {"$in": club_refs}
+        if self.startFrom or self.startTo:
+            query["startDate"] = {}
+            if self.startFrom:
+                query["startDate"]["$gte"] = self.startFrom
+            if self.startTo:
+                query["startDate"]["$lte"] = self.startTo
+        for key in ("isHidden", "isPinned", "registrationsOpen"):
+            value = getattr(self, key)
+            if value is not None:
+                query[key] = value
+        return query
+
+class EventBulkPatch(BaseModel):
+    eventIds: Optional[List[str]] = None
+    filter: Optional[EventBulkFilter] = None
+    updates: Dict[str, Any]
+
+EVENT_FIELDS = FieldSelector(EventInDB, always=("_id", "name"), default_exclude=("pendingChanges", "changeRequestedBy", "changeRequestedAt"))
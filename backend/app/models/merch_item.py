@@ -1,14 +1,37 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Optional
+from app.core.projection import FieldSelector
 
 class MerchItemBase(BaseModel):
     name: str
     price: float
     image: Optional[str] = None
+    imageThumbnail: Optional[str] = None  # derived from image on write
     salesOpen: bool = True
+    # Units left; None means unlimited. Items sold in sizes track stock per
+    # size in sizeStock instead, e.g. {"S": 40, "M": 60}.
+    stock: Optional[int] = None
+    sizeStock: Dict[str, int] = {}
+
+    @field_validator("sizeStock")
+    @classmethod
+    def check_sizes(cls, v: Dict[str, int]) -> Dict[str, int]:
+        # Sizes become field paths in stock updates
+        for size, count in v.items():
+            if not size or "." in size or size.startswith("$"):
+                raise ValueError(f"Invalid size name: {size!r}")
+            if count < 0:
+                raise ValueError("Stock cannot be negative")
+        return v
 
 class MerchItemInDB(MerchItemBase):
     id: Optional[str] = Field(None, alias="_id")
 
     class Config:
         populate_by_name = True
+
+class MerchRestock(BaseModel):
+    quantity: int  # negative to correct a miscount
+    size: Optional[str] = None
+
+MERCH_FIELDS = FieldSelector(MerchItemInDB, always=("_id", "name", "price"))
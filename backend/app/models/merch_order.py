@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field, BeforeValidator
+from typing import Optional, List, Annotated
+from enum import Enum
+from datetime import datetime
+
+# Helper to map MongoDB ObjectId to str
+PyObjectId = Annotated[str, BeforeValidator(str)]
+
+class OrderStatus(str, Enum):
+    RESERVED = 'reserved'   # stock held until expiresAt
+    PAID = 'paid'
+    CANCELLED = 'cancelled'
+    EXPIRED = 'expired'     # not paid in time, stock released
+    PAID_AFTER_EXPIRY = 'paid_after_expiry'  # needs a refund or manual fulfilment
+
+class MerchOrderLine(BaseModel):
+    item: PyObjectId
+    size: Optional[str] = None
+    quantity: int = Field(1, ge=1)
+    # Filled in from the catalog when the order is placed
+    name: Optional[str] = None
+    price: Optional[float] = None
+
+class MerchOrderCreate(BaseModel):
+    items: List[MerchOrderLine] = Field(..., min_length=1)
+
+class MerchOrderInDB(BaseModel):
+    id: Optional[PyObjectId] = Field(None, alias="_id")
+    user: PyObjectId
+    items: List[MerchOrderLine]
+    total: float
+    status: OrderStatus = OrderStatus.RESERVED
+    paymentId: Optional[str] = None
+    createdAt: datetime
+    expiresAt: Optional[datetime] = None
+    paidAt: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field, BeforeValidator
-from typing import Optional, List, Annotated, Any, Union
+from typing import Optional, List, Annotated, Any, Union, Literal
 from datetime import datetime
 from enum import Enum
+from app.core.projection import FieldSelector
 
 # Helper to map MongoDB ObjectId to str
 PyObjectId = Annotated[str, BeforeValidator(str)]
@@ -9,6 +10,8 @@ PyObjectId = Annotated[str, BeforeValidator(str)]
 class InvitationStatus(str, Enum):
     PENDING = 'pending'
     ACCEPTED = 'accepted'
+    DECLINED = 'declined'
+    EXPIRED = 'expired'
 
 class PaymentStatus(str, Enum):
     PENDING = 'pending'
@@ -38,6 +41,10 @@ class RegistrationBase(BaseModel):
     invitationStatus: List[Invitation] = []
     paymentStatus: PaymentStatus = PaymentStatus.PENDING
     paymentId: Optional[str] = None
+    amountDue: Optional[float] = None
+    # Copy of the event's time window, for schedule-clash checks
+    startsAt: Optional[datetime] = None
+    endsAt: Optional[datetime] = None
 
 class RegistrationInDB(RegistrationBase):
     id: Optional[PyObjectId] = Field(None, alias="_id")
@@ -48,3 +55,16 @@ class RegistrationInDB(RegistrationBase):
 class RegistrationCreate(BaseModel):
     event: PyObjectId
     teamEmails: List[str] = []
+    # Register even if a team member has an overlapping event
+    allowScheduleClash: bool = False
+
+class InvitationTokenAction(BaseModel):
+    token: str
+    action: Literal['accept', 'decline'] = 'accept'
+    allowScheduleClash: bool = False  # the invitee's own override
+
+class InvitationBatchAction(BaseModel):
+    action: Literal['accept', 'decline']
+    allowScheduleClash: bool = False
+
+REGISTRATION_FIELDS = FieldSelector(RegistrationInDB)
@@ -2,6 +2,7 @@ from pydantic import BaseModel, EmailStr, Field, BeforeValidator
 from typing import Optional, List, Any, Annotated
 from enum import Enum
 from datetime import datetime
+from app.core.projection import FieldSelector
 
 # Helper to map MongoDB ObjectId to str
 PyObjectId = Annotated[str, BeforeValidator(str)]
@@ -56,3 +57,7 @@ class UserInDB(UserBase):
                 "name": "John Doe",
             }
         }
+
+# The bcrypt hash is never read back out through the API; searchKeys is
+# only there for the typeahead index
+USER_FIELDS = FieldSelector(UserInDB, always=("_id", "email"), default_exclude=("searchKeys",), forbidden=("password",))
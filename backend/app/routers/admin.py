@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from app.db.mongodb import get_database
-from app.deps import get_current_user
+from app.deps import get_current_user, get_user_from_token
 from app.models.user import UserInDB
-from typing import List
+from app.services.live import live_bus
+from app.services.analytics import read_series, default_range
+from typing import List, Optional, Literal
+from datetime import datetime, timedelta
+import asyncio
+import json
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -41,43 +47,31 @@ async def get_admin_stats(admin: UserInDB = Depends(get_current_admin)):
          
          match_stage = {"event": {"$in": event_ids}}
 
-    total_registrations = await db.registrations.count_documents(match_stage)
-    
-    paid_query = match_stage.copy()
-    paid_query["paymentStatus"] = "paid"
-    paid_count = await db.registrations.count_documents(paid_query)
-    
-    unpaid_query = match_stage.copy()
-    unpaid_query["paymentStatus"] = "pending"
-    unpaid_count = await db.registrations.count_documents(unpaid_query)
-    
-    # Calculate Total Revenue accurately
-    # Fetch all paid registrations and their event fees
+    # Counts and amounts per payment status in one pass; amountDue is stored
+    # on each registration so no join with events is needed
     pipeline = [
-        {"$match": paid_query},
-        {"$lookup": {
-            "from": "events",
-            "localField": "event",
-            "foreignField": "_id",
-            "as": "eventData"
-        }},
-        {"$unwind": "$eventData"},
-        {"$project": {
-            "fee": "$eventData.fee",
-        }},
+        {"$match": match_stage},
         {"$group": {
-            "_id": None,
-            "totalRevenue": {"$sum": "$fee"}
+            "_id": "$paymentStatus",
+            "count": {"$sum": 1},
+            "amount": {"$sum": {"$ifNull": ["$amountDue", 0]}}
         }}
     ]
+    by_status = {row["_id"]: row for row in await db.registrations.aggregate(pipeline).to_list(None)}
     
-    revenue_result = await db.registrations.aggregate(pipeline).to_list(1)
-    total_revenue = revenue_result[0]["totalRevenue"] if revenue_result else 0
+    paid = by_status.get("paid", {})
+    unpaid = by_status.get("pending", {})
+    total_registrations = sum(row["count"] for row in by_status.values())
+    paid_count = paid.get("count", 0)
+    unpaid_count = unpaid.get("count", 0)
+    total_revenue = paid.get("amount", 0)
+    outstanding_dues = unpaid.get("amount", 0)
     
     return {
         "success": True,
         "data": {
             "totalRevenue": total_revenue,
+            "outstandingDues": outstanding_dues,
             "totalRegistrations": total_registrations,
             "paidCount": paid_count,
             "unpaidCount": unpaid_count
@@ -104,16 +98,30 @@ async def get_admin_events(admin: UserInDB = Depends(get_current_admin)):
          
     events = await db.events.find(query).to_list(100)
     
+    # Registration counts and collected amounts for all listed events at once
+    totals_pipeline = [
+        {"$match": {"event": {"$in": [e["_id"] for e in events]}}},
+        {"$group": {
+            "_id": {"event": "$event", "paymentStatus": "$paymentStatus"},
+            "count": {"$sum": 1},
+            "amount": {"$sum": {"$ifNull": ["$amountDue", 0]}}
+        }}
+    ]
+    totals = {}
+    for row in await db.registrations.aggregate(totals_pipeline).to_list(None):
+        totals[(row["_id"]["event"], row["_id"].get("paymentStatus"))] = row
+    
     enriched_events = []
     for event in events:
         event_id = event["_id"]
         
         # Counts
-        reg_count = await db.registrations.count_documents({"event": event_id})
-        paid_count = await db.registrations.count_documents({"event": event_id, "paymentStatus": "paid"})
+        paid = totals.get((event_id, "paid"), {})
+        paid_count = paid.get("count", 0)
+        reg_count = sum(row["count"] for (eid, _), row in totals.items() if eid == event_id)
         
-        # Calculate Revenue for this event
-        revenue = paid_count * event.get("fee", 0)
+        # Revenue for this event
+        revenue = paid.get("amount", 0)
         
         # Demographic Stats (VITians vs Non-VITians)
         # 1. Get all registrations for this event
@@ -209,3 +217,191 @@ async def get_event_participants(event_id: str, admin: UserInDB = Depends(get_cu
         },
         "data": participants
     }
+
+@router.get("/metrics")
+async def get_metrics(admin: UserInDB = Depends(get_current_admin)):
+    if admin.role not in ['admin', 'super_coordinator']:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    from app.core.metrics import metrics
+    from app.services.jobs import job_runner
+
+    return {
+        "success": True,
+        "data": {
+            **metrics.snapshot(),
+            "jobs": await job_runner.stats()
+        }
+    }
+
+@router.get("/profiles")
+async def list_profiles(limit: int = Query(50, ge=1, le=500), admin: UserInDB = Depends(get_current_admin)):
+    if admin.role not in ['admin', 'super_coordinator']:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    from app.core.profiling import get_profile_store
+    return {"success": True, "data": await asyncio.to_thread(get_profile_store().list, limit)}
+
+@router.get("/profiles/{profile_id}")
+async def read_profile(profile_id: str, download: bool = False, admin: UserInDB = Depends(get_current_admin)):
+    # JSON summary (Mongo trace, top functions); ?download=true returns the
+    # raw .prof file for snakeviz/pstats
+    if admin.role not in ['admin', 'super_coordinator']:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    from app.core.profiling import get_profile_store
+    store = get_profile_store()
+    if download:
+        path = store.path(profile_id, "prof")
+        if path is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+    profile = await asyncio.to_thread(store.read, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {"success": True, "data": profile}
+
+@router.get("/slow-queries")
+async def list_slow_queries(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    route: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    admin: UserInDB = Depends(get_current_admin),
+):
+    # Slow Mongo commands grouped by filter shape, worst total time first,
+    # each with the latest captured plan; see app/core/slow_queries.py
+    if admin.role not in ['admin', 'super_coordinator']:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    from app.core.slow_queries import SLOW_QUERIES_COLLECTION
+    db = await get_database()
+    match = {"at": {"$gte": datetime.utcnow() - timedelta(hours=hours)}}
+    if route:
+        match["route"] = route
+    groups = await db[SLOW_QUERIES_COLLECTION].aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": "$shapeId",
+            "shape": {"$first": "$shape"},
+            "command": {"$first": "$command"},
+            "count": {"$sum": 1},
+            "totalMs": {"$sum": "$durationMs"},
+            "avgMs": {"$avg": "$durationMs"},
+            "maxMs": {"$max": "$durationMs"},
+            "routes": {"$addToSet": "$route"},
+            "lastSeen": {"$max": "$at"},
+        }},
+        {"$sort": {"totalMs": -1}},
+        {"$limit": limit},
+    ]).to_list(length=limit)
+
+    async def latest_plan(shape_id):
+        # Capped collections keep insertion order
+        doc = await db[SLOW_QUERIES_COLLECTION].find_one(
+            {"shapeId": shape_id, "plan": {"$exists": True}},
+            {"plan": 1, "explain": 1, "at": 1},
+            sort=[("$natural", -1)],
+        )
+        return doc and {"summary": doc["plan"], "explain": json.loads(doc["explain"]), "capturedAt": doc["at"]}
+
+    plans = await asyncio.gather(*(latest_plan(g["_id"]) for g in groups))
+    for group, plan in zip(groups, plans):
+        group["shapeId"] = group.pop("_id")
+        group["shape"] = json.loads(group["shape"])
+        group["avgMs"] = round(group["avgMs"], 3)
+        group["totalMs"] = round(group["totalMs"], 3)
+        group["plan"] = plan
+    return {"success": True, "data": groups}
+
+STREAM_KEEPALIVE_SECONDS = 15
+
+@router.get("/stream")
+async def stream_admin_updates(request: Request, access_token: Optional[str] = None):
+    # Server-Sent Events with registration/payment count deltas. EventSource
+    # cannot send headers, so the token may also come as ?access_token=.
+    # Clients load /admin/stats and /admin/events after the "ready" message
+    # and apply each delta to those numbers; "resync" means reload them.
+    scheme, _, header_token = request.headers.get("authorization", "").partition(" ")
+    token = header_token if scheme.lower() == "bearer" and header_token else access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    admin = await get_current_admin(await get_user_from_token(token))
+
+    events = None
+    if admin.role == 'coordinator':
+        db = await get_database()
+        user_id = str(admin.id)
+        coord_events = await db.events.find({
+            "$or": [
+                {"studentCoordinators._id": user_id},
+                {"facultyCoordinators._id": user_id}
+            ]
+        }, {"_id": 1}).to_list(None)
+        events = {str(e["_id"]) for e in coord_events}
+
+    subscriber = live_bus.subscribe(events)
+
+    async def stream():
+        try:
+            yield f"data: {json.dumps({'type': 'ready'})}\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(message)}\n\n"
+                if message["type"] == "shutdown":
+                    break
+        finally:
+            live_bus.unsubscribe(subscriber)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Longest range per request, so a series stays a bounded number of buckets
+ANALYTICS_MAX_DAYS = {"hour": 31, "day": 366}
+
+@router.get("/analytics/registrations")
+async def get_registration_analytics(
+    dim: Literal["all", "event", "club", "school", "vitian"] = "all",
+    key: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    granularity: Literal["hour", "day"] = "hour",
+    admin: UserInDB = Depends(get_current_admin),
+):
+    # Registrations (and participants) per hour or day from the
+    # pre-aggregated buckets; see app/services/analytics.py
+    start, end = default_range(start, end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if (end - start).days > ANALYTICS_MAX_DAYS[granularity]:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {ANALYTICS_MAX_DAYS[granularity]} days for {granularity} granularity")
+
+    if admin.role == 'coordinator':
+        # Coordinators only see their own events
+        if dim != "event" or not key or not ObjectId.is_valid(key):
+            raise HTTPException(status_code=403, detail="Coordinators can only view analytics for their events")
+        db = await get_database()
+        user_id = str(admin.id)
+        if not await db.events.find_one({
+            "_id": ObjectId(key),
+            "$or": [{"studentCoordinators._id": user_id}, {"facultyCoordinators._id": user_id}]
+        }, {"_id": 1}):
+            raise HTTPException(status_code=403, detail="Not authorized for this event")
+
+    db = await get_database()
+    series = await read_series(db, dim, key, start, end, granularity)
+    return {
+        "success": True,
+        "data": {
+            "dim": dim,
+            "granularity": granularity,
+            "from": start,
+            "to": end,
+            "series": series,
+        }
+    }
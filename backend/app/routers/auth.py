@@ -3,9 +3,13 @@ from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from app.core.config import get_settings
 from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.user_search import with_search_keys
+from app.core.ratelimit import take_login_attempt
+import math
 from app.db.mongodb import get_database
 from app.models.user import UserCreate, UserInDB
-from app.schemas.token import Token
+from app.schemas.token import Token, RefreshRequest
+from app.services.sessions import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -30,6 +34,7 @@ async def signup(user: UserCreate):
         user_dict["isVITian"] = True
     else:
         user_dict["isVITian"] = False
+    with_search_keys(user_dict)
     
     result = await db.users.insert_one(user_dict)
     created_user = await db.users.find_one({"_id": result.inserted_id})
@@ -37,6 +42,13 @@ async def signup(user: UserCreate):
 
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    wait = take_login_attempt(form_data.username)
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts for this account, try again shortly",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
     db = await get_database()
     user = await db.users.find_one({"email": form_data.username}) # OAuth2 form sends email as username
     if not user or not verify_password(form_data.password, user["password"]):
@@ -50,16 +62,36 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     access_token = create_access_token(
         data={"sub": user["email"]}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    refresh_token = await issue_refresh_token(db, user)
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(payload: RefreshRequest):
+    # No password check: the rotated refresh token is the credential
+    db = await get_database()
+    session = await rotate_refresh_token(db, payload.refresh_token)
+    
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": session["email"]}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": session["refresh_token"]}
 
-from google.oauth2 import id_token
-from google.auth.transport import requests
+@router.post("/logout")
+async def logout(payload: RefreshRequest):
+    db = await get_database()
+    await revoke_refresh_token(db, payload.refresh_token)
+    return {"success": True}
 
 class GoogleLogin(BaseModel):
     token: str
 
 @router.post("/google", response_model=Token)
 async def google_login(login_data: GoogleLogin):
+    # google-auth (and requests) are only loaded when someone signs in with Google
+    from google.oauth2 import id_token
+    from google.auth.transport import requests
+
     try:
         # Verify the token using Google's libraries
         # settings.GOOGLE_CLIENT_ID comes from .env
@@ -83,13 +115,16 @@ async def google_login(login_data: GoogleLogin):
                 "authProvider": "google",
                 "isVITian": email.endswith("@vitstudent.ac.in") if email else False
             }
-            db.users.insert_one(user_dict)
+            with_search_keys(user_dict)
+            result = await db.users.insert_one(user_dict)
+            user = {"_id": result.inserted_id, "email": email}
             
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
             data={"sub": email}, expires_delta=access_token_expires
         )
-        return {"access_token": access_token, "token_type": "bearer"}
+        refresh_token = await issue_refresh_token(db, user)
+        return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid token: {str(e)}")
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from bson import ObjectId
+from app.db.mongodb import get_database
+from app.deps import get_current_user
+from app.core.passes import PassError, verify_pass
+from app.models.user import UserInDB, UserRole
+from app.services.checkin import CHECKINS_COLLECTION, checkin_doc, checkin_writer, insert_checkins
+
+router = APIRouter(prefix="/checkin", tags=["checkin"])
+
+SCANNER_ROLES = [UserRole.REGISTRATION_COORDINATOR, UserRole.COORDINATOR, UserRole.SUPER_COORDINATOR, UserRole.ADMIN]
+SYNC_LIMIT = 5000
+
+class ScanRequest(BaseModel):
+    # `pass` is a Python keyword
+    pass_: str = Field(..., alias="pass")
+    eventId: Optional[str] = None  # the gate's event; passes for others are refused
+    scannedAt: Optional[datetime] = None
+    deviceId: Optional[str] = None
+
+    class Config:
+        populate_by_name = True
+
+class SyncRequest(BaseModel):
+    deviceId: Optional[str] = None
+    eventId: Optional[str] = None
+    scans: List[ScanRequest]
+
+async def get_scanner(current_user: UserInDB = Depends(get_current_user)):
+    if current_user.role not in SCANNER_ROLES:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return current_user
+
+def check_scan(scan: ScanRequest, gate_event: Optional[str]):
+    # Signature and gate only; no database access
+    claims = verify_pass(scan.pass_)
+    event_id = scan.eventId or gate_event
+    if event_id and str(claims.event) != event_id:
+        raise PassError("Pass is for a different event")
+    return claims
+
+@router.post("/scan")
+async def scan_pass(scan: ScanRequest, scanner: UserInDB = Depends(get_scanner)):
+    try:
+        claims = check_scan(scan, None)
+    except PassError as e:
+        return {"status": "invalid", "detail": str(e)}
+
+    result = {"registration": str(claims.registration), "user": str(claims.user), "event": str(claims.event)}
+    if checkin_writer.seen(claims):
+        return {"status": "duplicate", **result}
+
+    # The cache only knows this process's scans since it started; a pass
+    # used at another worker or before a restart is found in the database
+    # (one lookup on the unique index) so the gate is never told "ok" twice.
+    # Two first scans of one pass racing at different workers within the
+    # batch window can still both pass; the index keeps one check-in.
+    db = await get_database()
+    if await db[CHECKINS_COLLECTION].find_one({"registration": claims.registration, "user": claims.user}, {"_id": 1}):
+        checkin_writer.remember(claims)
+        return {"status": "duplicate", **result}
+
+    if not checkin_writer.submit(checkin_doc(claims, scanner.id, scan.scannedAt, scan.deviceId, "live")):
+        raise HTTPException(status_code=503, detail="Check-in queue is full, retry")
+    checkin_writer.remember(claims)
+    return {"status": "ok", **result}
+
+@router.post("/sync")
+async def sync_scans(payload: SyncRequest, scanner: UserInDB = Depends(get_scanner)):
+    # Bulk upload of scans a device queued while offline. Written directly
+    # so every scan gets an exact ok/duplicate/invalid answer.
+    if len(payload.scans) > SYNC_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {SYNC_LIMIT} scans per sync")
+
+    results = [None] * len(payload.scans)
+    docs, positions = [], []
+    batch_keys = set()
+    for i, scan in enumerate(payload.scans):
+        try:
+            claims = check_scan(scan, payload.eventId)
+        except PassError as e:
+            results[i] = {"status": "invalid", "detail": str(e)}
+            continue
+        key = (claims.registration, claims.user)
+        if key in batch_keys:
+            results[i] = {"status": "duplicate", "registration": str(claims.registration), "user": str(claims.user)}
+            continue
+        batch_keys.add(key)
+        docs.append(checkin_doc(claims, scanner.id, scan.scannedAt, scan.deviceId or payload.deviceId, "sync"))
+        positions.append((i, claims))
+
+    db = await get_database()
+    inserted = await insert_checkins(db, docs)
+    for (i, claims), new in zip(positions, inserted):
+        checkin_writer.remember(claims)
+        results[i] = {"status": "ok" if new else "duplicate", "registration": str(claims.registration), "user": str(claims.user)}
+
+    summary = {}
+    for r in results:
+        summary[r["status"]] = summary.get(r["status"], 0) + 1
+    return {"success": True, "summary": summary, "data": results}
+
+@router.get("/events/{event_id}/stats")
+async def read_checkin_stats(event_id: str, scanner: UserInDB = Depends(get_scanner)):
+    if not ObjectId.is_valid(event_id):
+        raise HTTPException(status_code=404, detail="Event not found")
+    db = await get_database()
+    checked_in = await db[CHECKINS_COLLECTION].count_documents({"event": ObjectId(event_id)})
+    return {"success": True, "data": {"eventId": event_id, "checkedIn": checked_in}}
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Optional
 from app.db.mongodb import get_database
-from app.models.club import ClubInDB, ClubBase
+from app.models.club import ClubInDB, ClubBase, CLUB_FIELDS
 from app.deps import get_current_user
+from app.core.compression import catalog_cache
 from app.models.user import UserInDB, UserRole
 
 router = APIRouter(prefix="/clubs", tags=["clubs"])
 
 @router.get("/", response_model=List[ClubInDB])
-async def read_clubs():
-    db = await get_database()
-    clubs = await db.clubs.find().to_list(1000)
-    return [ClubInDB(**club) for club in clubs]
+async def read_clubs(request: Request, fields: Optional[str] = None):
+    selected = CLUB_FIELDS.parse(fields)
+
+    async def build():
+        db = await get_database()
+        clubs = await db.clubs.find({}, CLUB_FIELDS.projection(selected)).to_list(1000)
+        models = [ClubInDB(**club) for club in clubs]
+        return models if selected is None else CLUB_FIELDS.dump(models, selected)
+
+    key = "list" if selected is None else "list:" + ",".join(sorted(selected))
+    return await catalog_cache.respond(request, "clubs", key, build)
 
 @router.post("/", response_model=ClubInDB)
 async def create_club(club: ClubBase, current_user: UserInDB = Depends(get_current_user)):
@@ -20,6 +28,7 @@ async def create_club(club: ClubBase, current_user: UserInDB = Depends(get_curre
     
     db = await get_database()
     result = await db.clubs.insert_one(club.model_dump())
+    await catalog_cache.bump("clubs")
     created_club = await db.clubs.find_one({"_id": result.inserted_id})
     return ClubInDB(**created_club)
 
@@ -40,6 +49,8 @@ async def update_club(club_id: str, club_update: ClubBase, current_user: UserInD
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Club not found")
+    # Event responses embed club names
+    await catalog_cache.bump("clubs", "events")
         
     updated_club = await db.clubs.find_one({"_id": ObjectId(club_id)})
     return ClubInDB(**updated_club)
@@ -56,5 +67,6 @@ async def delete_club(club_id: str, current_user: UserInDB = Depends(get_current
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Club not found")
+    await catalog_cache.bump("clubs", "events")
         
     return {"message": "Club deleted successfully"}
@@ -1,27 +1,121 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse
+from typing import List, Dict, Any, Optional, Literal
+from datetime import datetime
 from app.db.mongodb import get_database
-from app.models.event import EventInDB, EventBase
+from app.models.event import EventInDB, EventBase, EventBulkPatch, EventBulkFilter, EVENT_FIELDS
 from app.deps import get_current_user
 from app.models.user import UserInDB, UserRole
+from app.services.jobs import job_runner
+from app.core.compression import catalog_cache
+from app.services.media import thumbnail_for
 from bson import ObjectId
 
 router = APIRouter(prefix="/events", tags=["events"])
 
+BULK_PATCH_LIMIT = 1000
+CALENDAR_LIMIT = 500
+
+# List views never render these, so they are left out of feed/calendar reads
+LIST_PROJECTION = {"description": 0, "pendingChanges": 0, "changeRequestedBy": 0, "changeRequestedAt": 0}
+
+# Fields each role may change through PATCH (single and bulk)
+ADMIN_PATCH_KEYS = {"isPinned", "isHidden", "registrationsOpen", "name", "description", "venue", "startDate", "startTime", "endDate", "endTime", "fee", "groupSizeMin", "groupSizeMax"}
+# Coordinators can toggle visibility and registrations, but NOT PIN
+COORDINATOR_PATCH_KEYS = ADMIN_PATCH_KEYS - {"isPinned"}
+# Older events may lack isHidden/isPinned; null matches a missing field, so
+# these agree with /events/search's {"$ne": True} and stay on event_feed
+VISIBLE = {"$in": [False, None]}
+ANY_PIN = {"$in": [True, False, None]}
+# Changing these moves the time window copied onto registrations
+SCHEDULE_KEYS = {"startDate", "startTime", "endDate", "endTime"}
+
+def is_event_coordinator(event: Dict[str, Any], user_id: str) -> bool:
+    for c in event.get("studentCoordinators", []) + event.get("facultyCoordinators", []):
+        if c.get("_id") == user_id:
+            return True
+    return False
+
+def get_patch_allowed_keys(current_user: UserInDB, event: Dict[str, Any]) -> set:
+    # 1. Admin / Super Coordinator: Can Update Everything
+    if current_user.role in [UserRole.ADMIN, UserRole.SUPER_COORDINATOR]:
+        return ADMIN_PATCH_KEYS
+
+    # 2. Coordinator: Can Update specifics IF assigned
+    if current_user.role == UserRole.COORDINATOR:
+        if is_event_coordinator(event, str(current_user.id)):
+            return COORDINATOR_PATCH_KEYS
+        raise HTTPException(status_code=403, detail="Not authorized to edit this event")
+
+    raise HTTPException(status_code=403, detail="Not authorized")
+
+def with_poster_thumbnail(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # Catalog cards load the small WebP variant of uploaded posters
+    doc["posterThumbnail"] = thumbnail_for(doc.get("poster"))
+    return doc
+
+async def populate_clubs(db, events: List[Dict[str, Any]]):
+    # Resolve club IDs for all events with a single query
+    all_ids = {ObjectId(cid) for event in events for cid in event.get("clubs") or [] if isinstance(cid, (str, ObjectId)) and ObjectId.is_valid(cid)}
+    if not all_ids:
+        return
+    clubs = await db.clubs.find({"_id": {"$in": list(all_ids)}}, {"name": 1}).to_list(None)
+    names = {c["_id"]: c.get("name", "Unknown") for c in clubs}
+
+    for event in events:
+        club_ids = [ObjectId(cid) for cid in event.get("clubs") or [] if isinstance(cid, (str, ObjectId)) and ObjectId.is_valid(cid)]
+        if club_ids:
+            # Replace club IDs with club objects (containing name)
+            event["clubs"] = [{"_id": str(cid), "name": names[cid]} for cid in club_ids if cid in names]
+
 @router.get("/", response_model=List[EventInDB])
-async def read_events():
+async def read_events(request: Request, fields: Optional[str] = None):
+    selected = EVENT_FIELDS.parse(fields)
+
+    async def build():
+        db = await get_database()
+        events = await db.events.find({}, EVENT_FIELDS.projection(selected)).to_list(1000)
+        
+        # Populate club names
+        if EVENT_FIELDS.wants(selected, "clubs"):
+            await populate_clubs(db, events)
+        
+        models = [EventInDB(**event) for event in events]
+        return models if selected is None else EVENT_FIELDS.dump(models, selected)
+
+    # Public catalog: serialized and compressed once per change
+    key = "list" if selected is None else "list:" + ",".join(sorted(selected))
+    return await catalog_cache.respond(request, "events", key, build)
+
+@router.get("/search", response_model=List[EventInDB])
+async def search_events(
+    q: Optional[str] = None,
+    club: Optional[str] = None,
+    dateFrom: Optional[datetime] = None,
+    dateTo: Optional[datetime] = None,
+    fee: Optional[Literal["free", "paid"]] = None,
+    registrationsOpen: Optional[bool] = Query(None, alias="open"),
+    limit: int = Query(20, ge=1, le=100),
+    skip: int = Query(0, ge=0),
+):
     db = await get_database()
-    events = await db.events.find().to_list(1000)
-    
-    # Populate club names
-    for event in events:
-        if "clubs" in event and event["clubs"]:
-            club_ids = [ObjectId(cid) for cid in event["clubs"] if isinstance(cid, (str, ObjectId))]
-            if club_ids:
-                clubs = await db.clubs.find({"_id": {"$in": club_ids}}).to_list(len(club_ids))
-                # Replace club IDs with club objects (containing name)
-                event["clubs"] = [{"_id": str(c["_id"]), "name": c.get("name", "Unknown")} for c in clubs]
-    
+
+    # Reuse the bulk filter so both endpoints interpret club/date the same way
+    query = EventBulkFilter(club=club, startFrom=dateFrom, startTo=dateTo, registrationsOpen=registrationsOpen).to_query()
+    query["isHidden"] = {"$ne": True}
+    if fee == "free":
+        query["fee"] = {"$lte": 0}
+    elif fee == "paid":
+        query["fee"] = {"$gt": 0}
+
+    if q and q.strip():
+        query["$text"] = {"$search": q.strip()}
+        cursor = db.events.find(query, {"score": {"$meta": "textScore"}}).sort([("score", {"$meta": "textScore"})])
+    else:
+        cursor = db.events.find(query).sort([("startDate", 1)])
+
+    events = await cursor.skip(skip).limit(limit).to_list(limit)
+    await populate_clubs(db, events)
     return [EventInDB(**event) for event in events]
 
 @router.post("/", response_model=EventInDB)
@@ -31,12 +125,140 @@ async def create_event(event: EventBase, current_user: UserInDB = Depends(get_cu
         raise HTTPException(status_code=403, detail="Not authorized")
     
     db = await get_database()
-    result = await db.events.insert_one(event.model_dump())
+    result = await db.events.insert_one(with_poster_thumbnail(event.model_dump()))
+    await catalog_cache.bump("events")
     created_event = await db.events.find_one({"_id": result.inserted_id})
     return EventInDB(**created_event)
 
+@router.get("/feed", response_model=List[EventInDB])
+async def read_event_feed(
+    request: Request,
+    upcoming: bool = False,
+    limit: int = Query(50, ge=1, le=200),
+    skip: int = Query(0, ge=0),
+):
+    async def build():
+        db = await get_database()
+
+        # isPinned is listed explicitly so the planner walks event_feed in order
+        query: Dict[str, Any] = {"isHidden": VISIBLE, "isPinned": ANY_PIN}
+        if upcoming:
+            query["startDate"] = {"$gte": datetime.utcnow()}
+
+        events = await db.events.find(query, LIST_PROJECTION).sort([("isPinned", -1), ("startDate", 1)]).skip(skip).limit(limit).to_list(limit)
+        await populate_clubs(db, events)
+        return [EventInDB(**event) for event in events]
+
+    # "upcoming" depends on the clock, so only the full feed is cached
+    if upcoming:
+        return await build()
+    return await catalog_cache.respond(request, "events", f"feed:{skip}:{limit}", build)
+
+@router.get("/calendar", response_model=List[EventInDB])
+async def read_event_calendar(
+    window_from: datetime = Query(..., alias="from"),
+    window_to: datetime = Query(..., alias="to"),
+):
+    if window_to < window_from:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+
+    db = await get_database()
+
+    # An event overlaps [from, to] if it starts before the window ends and
+    # ends after it starts. Single-day events may have no endDate.
+    query = {
+        "isHidden": VISIBLE,
+        "isPinned": ANY_PIN,
+        "startDate": {"$lte": window_to},
+        "$or": [
+            {"endDate": {"$gte": window_from}},
+            {"endDate": None, "startDate": {"$gte": window_from}},
+        ],
+    }
+
+    events = await db.events.find(query, LIST_PROJECTION).sort([("startDate", 1)]).to_list(CALENDAR_LIMIT)
+    await populate_clubs(db, events)
+    return [EventInDB(**event) for event in events]
+
+@router.patch("/bulk")
+async def bulk_patch_events(payload: EventBulkPatch, current_user: UserInDB = Depends(get_current_user)):
+    if current_user.role not in [UserRole.ADMIN, UserRole.SUPER_COORDINATOR, UserRole.COORDINATOR]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    if "isPinned" in payload.updates and current_user.role == UserRole.COORDINATOR:
+        raise HTTPException(status_code=403, detail="You are not authorized to Pin events.")
+
+    if payload.eventIds is None and payload.filter is None:
+        raise HTTPException(status_code=400, detail="Provide eventIds or a filter")
+
+    db = await get_database()
+
+    # Build the selection from explicit IDs and/or the filter
+    query: Dict[str, Any] = {}
+    invalid_ids = []
+    if payload.eventIds is not None:
+        oids = []
+        for eid in payload.eventIds:
+            if ObjectId.is_valid(eid):
+                oids.append(ObjectId(eid))
+            else:
+                invalid_ids.append(eid)
+        query["_id"] = {"$in": oids}
+    if payload.filter is not None:
+        query.update(payload.filter.to_query())
+
+    # Only the fields needed for RBAC and change detection
+    projection = {"studentCoordinators": 1, "facultyCoordinators": 1}
+    projection.update({k: 1 for k in payload.updates if k in ADMIN_PATCH_KEYS})
+    events = await db.events.find(query, projection).to_list(BULK_PATCH_LIMIT + 1)
+    if len(events) > BULK_PATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Selection matches more than {BULK_PATCH_LIMIT} events")
+
+    results = [{"eventId": eid, "status": "not_found", "detail": "Invalid ID"} for eid in invalid_ids]
+    if payload.eventIds is not None:
+        found = {str(e["_id"]) for e in events}
+        detail = "Event not found" if payload.filter is None else "Event not found or excluded by filter"
+        results.extend({"eventId": eid, "status": "not_found", "detail": detail} for eid in payload.eventIds if ObjectId.is_valid(eid) and eid not in found)
+
+    # Role rules are per event, but the allowed key set is the same for every
+    # event a user may edit, so all permitted changes go into one update_many.
+    clean_updates = None
+    to_update = []
+    for event in events:
+        event_id = str(event["_id"])
+        try:
+            allowed_keys = get_patch_allowed_keys(current_user, event)
+        except HTTPException as e:
+            results.append({"eventId": event_id, "status": "forbidden", "detail": e.detail})
+            continue
+
+        if clean_updates is None:
+            clean_updates = {k: v for k, v in payload.updates.items() if k in allowed_keys}
+            if not clean_updates:
+                raise HTTPException(status_code=400, detail="No valid updates provided")
+
+        if all(event.get(k) == v for k, v in clean_updates.items()):
+            results.append({"eventId": event_id, "status": "unchanged"})
+        else:
+            to_update.append(event["_id"])
+            results.append({"eventId": event_id, "status": "updated"})
+
+    if to_update:
+        await db.events.update_many({"_id": {"$in": to_update}}, {"$set": clean_updates})
+        await catalog_cache.bump("events")
+        if SCHEDULE_KEYS & clean_updates.keys():
+            for event_id in to_update:
+                await job_runner.enqueue("refresh_registration_windows", {"eventId": str(event_id)})
+
+    summary = {}
+    for r in results:
+        summary[r["status"]] = summary.get(r["status"], 0) + 1
+
+    return {"success": True, "summary": summary, "data": results}
+
 @router.get("/{event_id}", response_model=EventInDB)
-async def read_event(event_id: str):
+async def read_event(event_id: str, fields: Optional[str] = None):
+    selected = EVENT_FIELDS.parse(fields)
     db = await get_database()
     # Need to handle ObjectId conversion if storing as ObjectId, assuming string for now based on Pydantic models
     # But usually Mongo uses ObjectId. Pydantic models have _id as string alias but input might need conversion.
@@ -49,18 +271,16 @@ async def read_event(event_id: str):
     except:
          raise HTTPException(status_code=404, detail="Event not found")
 
-    event = await db.events.find_one({"_id": oid})
+    event = await db.events.find_one({"_id": oid}, EVENT_FIELDS.projection(selected))
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
     # Populate clubs
-    if "clubs" in event and event["clubs"]:
-        club_ids = [ObjectId(cid) for cid in event["clubs"] if isinstance(cid, (str, ObjectId))]
-        if club_ids:
-            clubs = await db.clubs.find({"_id": {"$in": club_ids}}).to_list(len(club_ids))
-            # Replace club IDs with club objects (containing name)
-            event["clubs"] = [{"_id": str(c["_id"]), "name": c.get("name", "Unknown")} for c in clubs]
+    if EVENT_FIELDS.wants(selected, "clubs"):
+        await populate_clubs(db, [event])
 
+    if selected is not None:
+        return JSONResponse(EVENT_FIELDS.dump([EventInDB(**event)], selected)[0])
     return EventInDB(**event)
 
 @router.put("/{event_id}", response_model=EventInDB)
@@ -103,11 +323,14 @@ async def update_event(event_id: str, event_update: EventBase, current_user: Use
     # Update
     result = await db.events.update_one(
         {"_id": oid},
-        {"$set": event_update.model_dump()}
+        {"$set": with_poster_thumbnail(event_update.model_dump())}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    await catalog_cache.bump("events")
+    if result.modified_count:
+        await job_runner.enqueue("refresh_registration_windows", {"eventId": event_id})
         
     updated_event = await db.events.find_one({"_id": oid})
     return EventInDB(**updated_event)
@@ -152,6 +375,10 @@ async def delete_event(event_id: str, current_user: UserInDB = Depends(get_curre
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Event not found")
+    await catalog_cache.bump("events")
+    
+    # Registrations and invitations for the event are removed in the background
+    await job_runner.enqueue("cascade_event_delete", {"eventId": event_id})
         
     return {"success": True, "message": "Event deleted"}
 
@@ -170,38 +397,7 @@ async def patch_event(event_id: str, updates: Dict[str, Any], current_user: User
         raise HTTPException(status_code=404, detail="Event not found")
 
     # --- RBAC Logic ---
-    allowed_keys = set()
-    
-    # 1. Admin / Super Coordinator: Can Update Everything
-    if current_user.role in [UserRole.ADMIN, UserRole.SUPER_COORDINATOR]:
-        allowed_keys = {"isPinned", "isHidden", "registrationsOpen", "name", "description", "venue", "startDate", "startTime", "endDate", "endTime", "fee", "groupSizeMin", "groupSizeMax"}
-    
-    # 2. Coordinator: Can Update specifics IF assigned
-    elif current_user.role == UserRole.COORDINATOR:
-        # Check assignment
-        is_assigned = False
-        user_id = str(current_user.id)
-        
-        # Check student coords
-        for c in existing_event.get("studentCoordinators", []):
-            if c.get("_id") == user_id:
-                is_assigned = True
-                break
-        
-        # Check faculty coords
-        if not is_assigned:
-            for c in existing_event.get("facultyCoordinators", []):
-                if c.get("_id") == user_id:
-                    is_assigned = True
-                    break
-        
-        if is_assigned:
-            # Coordinators can toggle visibility and registrations, but NOT PIN
-            allowed_keys = {"isHidden", "registrationsOpen", "name", "description", "venue", "startDate", "startTime", "endDate", "endTime", "fee", "groupSizeMin", "groupSizeMax"}
-        else:
-            raise HTTPException(status_code=403, detail="Not authorized to edit this event")
-    else:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    allowed_keys = get_patch_allowed_keys(current_user, existing_event)
 
     # Filter updates based on allowed keys
     clean_updates = {k: v for k, v in updates.items() if k in allowed_keys}
@@ -218,6 +414,9 @@ async def patch_event(event_id: str, updates: Dict[str, Any], current_user: User
         {"_id": oid},
         {"$set": clean_updates}
     )
+    await catalog_cache.bump("events")
+    if SCHEDULE_KEYS & clean_updates.keys():
+        await job_runner.enqueue("refresh_registration_windows", {"eventId": event_id})
     
     updated_event = await db.events.find_one({"_id": oid})
     return EventInDB(**updated_event)
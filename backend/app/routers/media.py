@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, Response
+from app.db.mongodb import get_database
+from app.deps import get_current_user
+from app.core.config import get_settings
+from app.models.user import UserInDB, UserRole
+from app.services.media import MEDIA_KEY_RE, CONTENT_TYPES, get_media_store, store_image
+
+router = APIRouter(prefix="/media", tags=["media"])
+settings = get_settings()
+
+UPLOAD_ROLES = [UserRole.ADMIN, UserRole.SUPER_COORDINATOR, UserRole.COORDINATOR, UserRole.MERCH_COORDINATOR]
+# Files never change once written, so clients and CDNs may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@router.post("/upload")
+async def upload_image(file: UploadFile = File(...), current_user: UserInDB = Depends(get_current_user)):
+    if current_user.role not in UPLOAD_ROLES:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    data = await file.read(settings.MEDIA_MAX_UPLOAD_BYTES + 1)
+    if len(data) > settings.MEDIA_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image is too large")
+
+    db = await get_database()
+    try:
+        doc = await store_image(db, data, uploaded_by=current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Use `url` as the poster/image; the catalog picks up the thumbnail
+    return {
+        "id": doc["_id"],
+        "url": doc["url"],
+        "thumbnail": doc["variants"].get("thumb"),
+        "variants": doc["variants"],
+    }
+
+@router.get("/{digest}/{name}")
+async def read_media(digest: str, name: str, request: Request):
+    key = f"{digest}/{name}"
+    store = get_media_store()
+    if not MEDIA_KEY_RE.match(key) or not store.exists(key):
+        raise HTTPException(status_code=404, detail="Not found")
+
+    # Content-addressed, so the key itself is a strong validator
+    etag = f'"{digest[:32]}-{name}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(store.path(key), media_type=CONTENT_TYPES[name.rsplit(".", 1)[1]], headers=headers)
@@ -1,17 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Optional
 from app.db.mongodb import get_database
-from app.models.merch_item import MerchItemInDB, MerchItemBase
+from app.models.merch_item import MerchItemInDB, MerchItemBase, MerchRestock, MERCH_FIELDS
 from app.deps import get_current_user
+from app.core.compression import catalog_cache
+from app.services.media import thumbnail_for
 from app.models.user import UserInDB, UserRole
 
 router = APIRouter(prefix="/merch", tags=["merch"])
 
+# Stock only moves through orders and /restock ($inc), never by overwrite,
+# so an edit form holding a stale count cannot undo sales
+STOCK_FIELDS = {"stock", "sizeStock"}
+
+def with_image_thumbnail(doc):
+    doc["imageThumbnail"] = thumbnail_for(doc.get("image"))
+    return doc
+
 @router.get("/", response_model=List[MerchItemInDB])
-async def read_merch_items():
-    db = await get_database()
-    items = await db.merch_items.find().to_list(1000)
-    return [MerchItemInDB(**item) for item in items]
+async def read_merch_items(request: Request, fields: Optional[str] = None):
+    selected = MERCH_FIELDS.parse(fields)
+
+    async def build():
+        db = await get_database()
+        items = await db.merch_items.find({}, MERCH_FIELDS.projection(selected)).to_list(1000)
+        models = [MerchItemInDB(**item) for item in items]
+        return models if selected is None else MERCH_FIELDS.dump(models, selected)
+
+    key = "list" if selected is None else "list:" + ",".join(sorted(selected))
+    return await catalog_cache.respond(request, "merch", key, build)
 
 @router.post("/", response_model=MerchItemInDB)
 async def create_merch_item(item: MerchItemBase, current_user: UserInDB = Depends(get_current_user)):
@@ -19,7 +36,8 @@ async def create_merch_item(item: MerchItemBase, current_user: UserInDB = Depend
         raise HTTPException(status_code=403, detail="Not authorized")
     
     db = await get_database()
-    result = await db.merch_items.insert_one(item.model_dump())
+    result = await db.merch_items.insert_one(with_image_thumbnail(item.model_dump()))
+    await catalog_cache.bump("merch")
     created_item = await db.merch_items.find_one({"_id": result.inserted_id})
     return MerchItemInDB(**created_item)
 
@@ -37,15 +55,48 @@ async def update_merch_item(item_id: str, item_update: MerchItemBase, current_us
          
     result = await db.merch_items.update_one(
         {"_id": oid},
-        {"$set": item_update.model_dump()}
+        {"$set": with_image_thumbnail(item_update.model_dump(exclude=STOCK_FIELDS))}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Item not found")
+    await catalog_cache.bump("merch")
         
     updated_item = await db.merch_items.find_one({"_id": oid})
     return MerchItemInDB(**updated_item)
 
+@router.post("/{item_id}/restock", response_model=MerchItemInDB)
+async def restock_merch_item(item_id: str, restock: MerchRestock, current_user: UserInDB = Depends(get_current_user)):
+    if current_user.role not in [UserRole.MERCH_COORDINATOR, UserRole.SUPER_COORDINATOR, UserRole.ADMIN]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    from bson import ObjectId
+    from pymongo import ReturnDocument
+    from app.services.merch_orders import stock_field
+    if not ObjectId.is_valid(item_id):
+        raise HTTPException(status_code=404, detail="Item not found")
+    if restock.size is not None and ("." in restock.size or restock.size.startswith("$") or not restock.size):
+        raise HTTPException(status_code=400, detail="Invalid size name")
+
+    db = await get_database()
+    field = stock_field(restock.size)
+    query = {"_id": ObjectId(item_id)}
+    if restock.quantity < 0:
+        # A correction may not take the count below zero
+        query[field] = {"$gte": -restock.quantity}
+    # Pipeline form so restocking an unlimited item (stock: null) starts a count
+    updated_item = await db.merch_items.find_one_and_update(
+        query,
+        [{"$set": {field: {"$add": [{"$ifNull": [f"${field}", 0]}, restock.quantity]}}}],
+        return_document=ReturnDocument.AFTER,
+    )
+    if updated_item is None:
+        if await db.merch_items.find_one({"_id": ObjectId(item_id)}, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="Not enough stock to remove")
+        raise HTTPException(status_code=404, detail="Item not found")
+    await catalog_cache.bump("merch")
+    return MerchItemInDB(**updated_item)
+
 @router.delete("/{item_id}")
 async def delete_merch_item(item_id: str, current_user: UserInDB = Depends(get_current_user)):
     if current_user.role not in [UserRole.SUPER_COORDINATOR, UserRole.MERCH_COORDINATOR, UserRole.ADMIN]:
@@ -62,5 +113,6 @@ async def delete_merch_item(item_id: str, current_user: UserInDB = Depends(get_c
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Item not found")
+    await catalog_cache.bump("merch")
         
     return {"success": True, "message": "Item deleted"}
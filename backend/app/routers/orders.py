@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from bson import ObjectId
+from app.db.mongodb import get_database
+from app.deps import get_current_user
+from app.core.config import get_settings
+from app.models.merch_order import MerchOrderCreate, MerchOrderInDB, OrderStatus
+from app.models.user import UserInDB, UserRole
+from app.services.jobs import job_runner
+from app.services.merch_orders import place_order, release_order
+
+router = APIRouter(prefix="/merch/orders", tags=["merch"])
+settings = get_settings()
+
+@router.post("/", response_model=MerchOrderInDB)
+async def create_order(payload: MerchOrderCreate, current_user: UserInDB = Depends(get_current_user)):
+    db = await get_database()
+    order = await place_order(db, current_user.id, payload.items)
+    # Release the stock if the order is still unpaid at its deadline
+    await job_runner.enqueue("release_merch_reservations", {"orderId": str(order["_id"])}, delay=settings.MERCH_RESERVATION_MINUTES * 60 + 1)
+    return MerchOrderInDB(**order)
+
+@router.get("/me", response_model=List[MerchOrderInDB])
+async def read_my_orders(current_user: UserInDB = Depends(get_current_user)):
+    db = await get_database()
+    orders = await db.merch_orders.find({"user": current_user.id}).sort("createdAt", -1).to_list(200)
+    return [MerchOrderInDB(**o) for o in orders]
+
+@router.get("/", response_model=List[MerchOrderInDB])
+async def read_orders(status: Optional[OrderStatus] = None, item: Optional[str] = None, current_user: UserInDB = Depends(get_current_user)):
+    if current_user.role not in [UserRole.MERCH_COORDINATOR, UserRole.SUPER_COORDINATOR, UserRole.ADMIN]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    query = {}
+    if status:
+        query["status"] = status.value
+    if item:
+        query["items.item"] = item
+    db = await get_database()
+    orders = await db.merch_orders.find(query).sort("createdAt", -1).to_list(2000)
+    return [MerchOrderInDB(**o) for o in orders]
+
+@router.post("/{order_id}/cancel", response_model=MerchOrderInDB)
+async def cancel_order(order_id: str, current_user: UserInDB = Depends(get_current_user)):
+    if not ObjectId.is_valid(order_id):
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    db = await get_database()
+    # Only an unpaid reservation of the caller's own can be cancelled
+    order = await release_order(db, ObjectId(order_id), "reserved", "cancelled", {"user": current_user.id})
+    if order is None:
+        existing = await db.merch_orders.find_one({"_id": ObjectId(order_id), "user": current_user.id}, {"status": 1})
+        if not existing:
+            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=400, detail=f"Order is already {existing['status']}")
+    return MerchOrderInDB(**order)
@@ -1,36 +1,112 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
-import stripe
+from typing import Optional
+from datetime import datetime
+from bson import ObjectId
+import json
+from functools import lru_cache
 from app.core.config import get_settings
+from app.core.webhooks import verify_signature, WebhookSignatureError
+from app.core.fees import refresh_amount_due
+from app.db.maintenance import id_variants
+from app.services.payment_events import payment_worker
 from app.deps import get_current_user
+from app.db.mongodb import get_database
 from app.models.user import UserInDB
 
 # Initialize Stripe
 # In a real app, strict validation of env vars
 STRIPE_SECRET_KEY = "sk_test_sample" # Replace with valid key or env var
-stripe.api_key = STRIPE_SECRET_KEY
+
+@lru_cache()
+def get_stripe():
+    # The stripe SDK is large; import it when the first payment is created
+    import stripe
+    stripe.api_key = STRIPE_SECRET_KEY
+    return stripe
 
 router = APIRouter(prefix="/payments", tags=["payments"])
+settings = get_settings()
 
 class PaymentIntentRequest(BaseModel):
-    registrationId: str
-    amount: float
+    registrationId: Optional[str] = None
+    orderId: Optional[str] = None  # merch order
+    amount: Optional[float] = None  # ignored; the stored amount is charged
 
 @router.post("/create-intent")
 async def create_payment_intent(request: PaymentIntentRequest, current_user: UserInDB = Depends(get_current_user)):
+    metadata = {'userId': str(current_user.id)}
+    if request.orderId:
+        # Merch orders are charged their stored total while the stock is held
+        if not ObjectId.is_valid(request.orderId):
+            raise HTTPException(status_code=404, detail="Order not found")
+        db = await get_database()
+        order = await db.merch_orders.find_one({"_id": ObjectId(request.orderId), "user": current_user.id})
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if order["status"] != "reserved" or order["expiresAt"] <= datetime.utcnow():
+            raise HTTPException(status_code=400, detail="Order reservation has expired, please order again")
+        amount = order["total"]
+        metadata['orderId'] = request.orderId
+    elif request.registrationId:
+        # Registrations are charged their stored amountDue, and only by the
+        # team that owns them; the webhook checks the amount received
+        if not ObjectId.is_valid(request.registrationId):
+            raise HTTPException(status_code=404, detail="Registration not found")
+        db = await get_database()
+        user_ids = id_variants(current_user.id)
+        query = {
+            "_id": ObjectId(request.registrationId),
+            "$or": [{"creator": {"$in": user_ids}}, {"teamMembers": {"$in": user_ids}}],
+        }
+        registration = await db.registrations.find_one(query, {"amountDue": 1, "paymentStatus": 1})
+        if not registration:
+            raise HTTPException(status_code=404, detail="Registration not found")
+        if registration.get("paymentStatus") == "paid":
+            raise HTTPException(status_code=400, detail="Registration is already paid")
+        if registration.get("amountDue") is None:
+            # Registrations from before amountDue was stored
+            await refresh_amount_due(db, registration["_id"])
+            registration = await db.registrations.find_one(query, {"amountDue": 1})
+        amount = registration.get("amountDue")
+        if not amount or amount <= 0:
+            raise HTTPException(status_code=400, detail="Nothing to pay for this registration")
+        metadata['registrationId'] = request.registrationId
+    else:
+        raise HTTPException(status_code=400, detail="Provide registrationId or orderId")
+
     try:
         # Create a PaymentIntent with the order amount and currency
-        intent = stripe.PaymentIntent.create(
-            amount=int(request.amount * 100), # Amount in paise/cents
+        intent = get_stripe().PaymentIntent.create(
+            amount=int(amount * 100), # Amount in paise/cents
             currency='inr',
             automatic_payment_methods={
                 'enabled': True,
             },
-            metadata={
-                'registrationId': request.registrationId,
-                'userId': str(current_user.id)
-            }
+            metadata=metadata
         )
         return {"clientSecret": intent.client_secret}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/webhook")
+async def payment_webhook(request: Request):
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhooks are not configured")
+
+    payload = await request.body()
+    try:
+        verify_signature(payload, request.headers.get("Stripe-Signature"), settings.STRIPE_WEBHOOK_SECRET, settings.STRIPE_WEBHOOK_TOLERANCE_SECONDS)
+        event = json.loads(payload)
+    except WebhookSignatureError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid signature: {e}")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    if not isinstance(event, dict):
+        raise HTTPException(status_code=400, detail="Invalid payload")
+
+    # Applied asynchronously; a full queue makes the sender retry later
+    if not payment_worker.submit(event):
+        raise HTTPException(status_code=503, detail="Webhook queue is full, retry later")
+
+    return {"received": True}
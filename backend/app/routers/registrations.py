@@ -1,17 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from typing import List, Optional
 from app.db.mongodb import get_database
-from app.models.registration import RegistrationInDB, RegistrationBase, RegistrationCreate
+from app.models.registration import RegistrationInDB, RegistrationBase, RegistrationCreate, InvitationTokenAction, InvitationBatchAction, REGISTRATION_FIELDS
 from app.deps import get_current_user
+from app.db.maintenance import id_variants
+from app.core.fees import billed_team_size, compute_amount_due
+from app.core.schedule import find_clashes, describe_clashes, clash_summary, window_fields
+from app.core.passes import issue_pass
+from app.services.jobs import job_runner
+from app.services.live import live_bus, change_message, registration_delta
+from app.services.analytics import record_registration
+from app.services.invitations import close_invitations, create_invitations, respond_with_token, respond_to_all
+from app.core.config import get_settings
 from app.models.user import UserInDB
 from pydantic import BaseModel
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
 
 router = APIRouter(prefix="/registrations", tags=["registrations"])
+settings = get_settings()
 
 @router.get("/")
-async def read_registrations(current_user: UserInDB = Depends(get_current_user)):
+async def read_registrations(fields: Optional[str] = None, current_user: UserInDB = Depends(get_current_user)):
+    selected = REGISTRATION_FIELDS.parse(fields)
+    projection = REGISTRATION_FIELDS.projection(selected)
     db = await get_database()
     
     print(f"DEBUG: Fetching registrations for user {current_user.email} (ID: {current_user.id}, Role: {current_user.role})")
@@ -35,16 +47,16 @@ async def read_registrations(current_user: UserInDB = Depends(get_current_user))
             ]
         }
         print(f"DEBUG: Query: {query}")
-        registrations = await db.registrations.find(query).to_list(1000)
+        registrations = await db.registrations.find(query, projection).to_list(1000)
     else:
-        registrations = await db.registrations.find().to_list(1000)
+        registrations = await db.registrations.find({}, projection).to_list(1000)
 
     print(f"DEBUG: Found {len(registrations)} registrations")
 
     # Populate Event and User details
     for reg in registrations:
         # Populate Event
-        if "event" in reg:
+        if "event" in reg and REGISTRATION_FIELDS.wants(selected, "event"):
             try:
                 event_id = ObjectId(reg["event"])
                 event = await db.events.find_one({"_id": event_id})
@@ -56,7 +68,7 @@ async def read_registrations(current_user: UserInDB = Depends(get_current_user))
                 print(f"DEBUG: Error populating event: {e}")
         
         # Populate Creator
-        if "creator" in reg:
+        if "creator" in reg and REGISTRATION_FIELDS.wants(selected, "creator"):
              try:
                  creator = await db.users.find_one({"_id": ObjectId(reg["creator"])})
                  if creator:
@@ -65,7 +77,7 @@ async def read_registrations(current_user: UserInDB = Depends(get_current_user))
                  pass
 
         # Populate Team Members
-        if "teamMembers" in reg:
+        if "teamMembers" in reg and REGISTRATION_FIELDS.wants(selected, "teamMembers"):
             try:
                 # Handle mixed types in DB (str or ObjectId)
                 member_ids = []
@@ -82,7 +94,7 @@ async def read_registrations(current_user: UserInDB = Depends(get_current_user))
                 print(f"DEBUG: Error populating team: {e}")
 
         # Populate Invitation User Details
-        if "invitationStatus" in reg:
+        if "invitationStatus" in reg and REGISTRATION_FIELDS.wants(selected, "invitationStatus"):
             for inv in reg["invitationStatus"]:
                 if "userId" in inv:
                     try:
@@ -92,7 +104,10 @@ async def read_registrations(current_user: UserInDB = Depends(get_current_user))
                     except:
                         pass
 
-    return [RegistrationInDB(**reg) for reg in registrations]
+    models = [RegistrationInDB(**reg) for reg in registrations]
+    if selected is not None:
+        return REGISTRATION_FIELDS.dump(models, selected)
+    return models
 
 @router.post("/", response_model=RegistrationInDB)
 async def create_registration(registration: RegistrationCreate, current_user: UserInDB = Depends(get_current_user)):
@@ -131,18 +146,27 @@ async def create_registration(registration: RegistrationCreate, current_user: Us
         uid = user["_id"]
         if uid not in team_member_ids:
             team_member_ids.append(uid)
-            # DIRECT ACCEPT - No Invitations
-            invitations.append({
-                "userId": uid,
-                "status": "accepted", 
-                "token": None,
-                "tokenExpires": None
-            })
+            if settings.TEAM_INVITATIONS_ENABLED:
+                # Member joins the team once they accept the emailed invitation
+                invitations.append({
+                    "userId": uid,
+                    "status": "pending",
+                    "token": None,
+                    "tokenExpires": datetime.utcnow() + timedelta(hours=settings.INVITATION_EXPIRE_HOURS)
+                })
+            else:
+                # DIRECT ACCEPT - No Invitations
+                invitations.append({
+                    "userId": uid,
+                    "status": "accepted", 
+                    "token": None,
+                    "tokenExpires": None
+                })
 
     # 3. New Validation: Check if ANY team member (including creator) is already registered for this event
     # We query for any registration for this event where teamMembers contains ANY of our new group
     existing_reg = await db.registrations.find_one({
-        "event": registration.event,
+        "event": {"$in": id_variants(registration.event)},
         "$or": [
             {"teamMembers": {"$in": team_member_ids}},
             {"creator": {"$in": team_member_ids}}
@@ -162,20 +186,46 @@ async def create_registration(registration: RegistrationCreate, current_user: Us
             detail=f"The following users are already registered for this event: {conflict_names}"
         )
 
-    # 3. Create Registration Document
-    # Check if event is free
-    is_free = event.get("fee", 0) == 0
+    # 4. Schedule clashes with events the team is already registered for
+    if settings.SCHEDULE_CLASH_CHECK_ENABLED and not registration.allowScheduleClash:
+        clashes = await find_clashes(db, team_member_ids, event)
+        if clashes:
+            described = await describe_clashes(db, clashes, team_member_ids)
+            raise HTTPException(
+                status_code=409,
+                detail=f"Schedule clash: {clash_summary(described)}. Set allowScheduleClash to register anyway."
+            )
+
+    # 5. Create Registration Document
+    invited_ids = [inv["userId"] for inv in invitations if inv["status"] == "pending"]
     
     reg_dict = {
-        "event": registration.event,
+        "event": ObjectId(registration.event),
         "creator": current_user.id,
-        "teamMembers": team_member_ids,
+        "teamMembers": [uid for uid in team_member_ids if uid not in invited_ids],
         "invitationStatus": invitations,
-        "paymentStatus": "paid" if is_free else "pending",
-        "paymentId": "FREE" if is_free else None
+        **window_fields(event)
     }
+    # Amount due follows the event's fee model for the team being formed
+    amount_due = compute_amount_due(event, billed_team_size(reg_dict))
+    is_free = amount_due == 0
+    reg_dict.update({
+        "paymentStatus": "paid" if is_free else "pending",
+        "paymentId": "FREE" if is_free else None,
+        "amountDue": amount_due,
+    })
 
     result = await db.registrations.insert_one(reg_dict)
+    live_bus.publish(change_message("registration.created", reg_dict, registration_delta(reg_dict)))
+    await record_registration(db, reg_dict, event, current_user.model_dump(mode="json"))
+    
+    if invited_ids:
+        invitation_ids = await create_invitations(db, result.inserted_id, reg_dict["event"], current_user.id, invited_ids)
+        for invitation_id in invitation_ids:
+            await job_runner.enqueue("send_invitation", {"invitationId": str(invitation_id)})
+        # Unanswered invitations stop counting towards the fee once they lapse
+        await job_runner.enqueue("expire_invitations", {"registrationId": str(result.inserted_id)}, delay=settings.INVITATION_EXPIRE_HOURS * 3600 + 1)
+    
     created_reg = await db.registrations.find_one({"_id": result.inserted_id})
     return RegistrationInDB(**created_reg)
 
@@ -186,6 +236,12 @@ class InvitationAction(BaseModel):
 
 @router.post("/accept")
 async def accept_invitation(payload: InvitationAction, current_user: UserInDB = Depends(get_current_user)):
+    # Legacy flow from before emailed invitations. With invitations enabled
+    # it would bypass the token, the event and schedule checks and never add
+    # the member to teamMembers, so it is closed in favour of
+    # /invitations/respond and /invitations/respond-all.
+    if settings.TEAM_INVITATIONS_ENABLED:
+        raise HTTPException(status_code=410, detail="Use /registrations/invitations/respond with the invitation token")
     db = await get_database()
     print(f"DEBUG: Processing invitation action {payload.action} for reg {payload.registrationId} by user {current_user.id}")
 
@@ -219,6 +275,46 @@ async def accept_invitation(payload: InvitationAction, current_user: UserInDB =
 
     return {"success": True}
 
+@router.post("/invitations/respond")
+async def respond_to_invitation(payload: InvitationTokenAction, current_user: UserInDB = Depends(get_current_user)):
+    db = await get_database()
+    invitation = await respond_with_token(db, payload.token, current_user.id, payload.action, payload.allowScheduleClash)
+    await job_runner.enqueue("refresh_amount_due", {"registrationId": str(invitation["registration"])})
+    return {"success": True, "registrationId": str(invitation["registration"]), "status": invitation["status"]}
+
+@router.post("/invitations/respond-all")
+async def respond_to_all_invitations(payload: InvitationBatchAction, current_user: UserInDB = Depends(get_current_user)):
+    db = await get_database()
+    answered, conflicts = await respond_to_all(db, current_user.id, payload.action, payload.allowScheduleClash)
+    for reg_id in {inv["registration"] for inv in answered}:
+        await job_runner.enqueue("refresh_amount_due", {"registrationId": str(reg_id)})
+    return {
+        "success": True,
+        "count": len(answered),
+        "registrationIds": [str(inv["registration"]) for inv in answered],
+        # Left pending: already registered for the event, or a schedule clash
+        "conflicts": [
+            {"registrationId": str(inv["registration"]), "eventId": str(inv["event"]), "reason": inv["conflict"]}
+            for inv in conflicts
+        ],
+    }
+
+@router.get("/{registration_id}/pass")
+async def read_registration_pass(registration_id: str, current_user: UserInDB = Depends(get_current_user)):
+    # Venue pass (QR payload) for the current user's seat in a paid registration
+    if not ObjectId.is_valid(registration_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    db = await get_database()
+    reg = await db.registrations.find_one(
+        {"_id": ObjectId(registration_id), "teamMembers": {"$in": id_variants(current_user.id)}},
+        {"event": 1, "paymentStatus": 1}
+    )
+    if not reg:
+        raise HTTPException(status_code=404, detail="Not found")
+    if reg.get("paymentStatus") != "paid":
+        raise HTTPException(status_code=400, detail="Passes are issued once the registration is paid")
+    return {"pass": issue_pass(reg["_id"], current_user.id, reg["event"]), "registrationId": registration_id, "eventId": str(reg["event"])}
+
 @router.delete("/{registration_id}")
 async def delete_registration(registration_id: str, current_user: UserInDB = Depends(get_current_user)):
     db = await get_database()
@@ -235,6 +331,9 @@ async def delete_registration(registration_id: str, current_user: UserInDB = Dep
         print("DEBUG: User is creator, deleting entire registration")
         result = await db.registrations.delete_one({"_id": ObjectId(registration_id)})
         print(f"DEBUG: Delete result: {result.deleted_count}")
+        if result.deleted_count:
+            live_bus.publish(change_message("registration.deleted", reg, registration_delta(reg, -1)))
+            await close_invitations(db, reg["_id"], "expired")
     else:
         print("DEBUG: User is team member, removing from team")
         # Remove self from teamMembers and invitationStatus
@@ -242,11 +341,14 @@ async def delete_registration(registration_id: str, current_user: UserInDB = Dep
             {"_id": ObjectId(registration_id)},
             {
                 "$pull": {
-                    "teamMembers": current_user.id,
-                    "invitationStatus": {"userId": current_user.id}
+                    "teamMembers": {"$in": id_variants(current_user.id)},
+                    "invitationStatus": {"userId": {"$in": id_variants(current_user.id)}}
                 }
             }
         )
         print(f"DEBUG: Update result: {result.modified_count}")
+        if result.modified_count:
+            await close_invitations(db, reg["_id"], "declined", current_user.id)
+            await job_runner.enqueue("refresh_amount_due", {"registrationId": registration_id})
         
     return {"success": True}
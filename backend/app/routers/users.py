@@ -1,25 +1,65 @@
-from fastapi import APIRouter, Depends
-from typing import List
+from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi.responses import JSONResponse
+from typing import List, Optional
 from app.deps import get_current_user
-from app.models.user import UserInDB, UserCreate
+from app.models.user import UserInDB, UserCreate, USER_FIELDS
+from app.core.user_search import SEARCH_KEYS_FIELD, SEARCH_SOURCE_FIELDS, search_keys, with_search_keys
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=UserInDB, response_model_by_alias=True)
-async def read_users_me(current_user: UserInDB = Depends(get_current_user)):
+async def read_users_me(fields: Optional[str] = None, current_user: UserInDB = Depends(get_current_user)):
+    selected = USER_FIELDS.parse(fields)
+    if selected is not None:
+        return JSONResponse(USER_FIELDS.dump([current_user], selected)[0])
     return current_user
 
 @router.get("/", response_model=List[UserInDB])
-async def read_users(current_user: UserInDB = Depends(get_current_user)):
+async def read_users(fields: Optional[str] = None, skip: int = 0, limit: int = 2000, current_user: UserInDB = Depends(get_current_user)):
     # Simple role check
     if current_user.role not in ['admin', 'super_coordinator', 'coordinator']:
          from fastapi import HTTPException
          raise HTTPException(status_code=403, detail="Not authorized")
     
+    selected = USER_FIELDS.parse(fields)
+    
     from app.db.mongodb import get_database
     db = await get_database()
-    users = await db.users.find().to_list(2000) # Limit 2000
-    return [UserInDB(**u) for u in users]
+    # Default projection leaves the password hash in the database
+    # Paged by _id so the admin list can load a page at a time
+    limit = max(1, min(limit, 2000))
+    users = await db.users.find({}, USER_FIELDS.projection(selected)).sort("_id", 1).skip(max(0, skip)).limit(limit).to_list(limit)
+    models = [UserInDB(**u) for u in users]
+    if selected is not None:
+        return JSONResponse(USER_FIELDS.dump(models, selected))
+    return models
+
+@router.get("/search")
+async def search_users(q: str, limit: int = 10, current_user: UserInDB = Depends(get_current_user)):
+    # Prefix typeahead for picking teammates and for the admin user list;
+    # see app/core/user_search.py
+    from fastapi import HTTPException
+    from app.core.user_search import ALL_KINDS, MAX_RESULTS, MIN_QUERY_LENGTH, MIN_STUDENT_QUERY_LENGTH, STUDENT_KINDS, search_filter
+
+    # Staff get the full search; everyone else (students and the narrower
+    # coordinator roles) only enough to pick a teammate they already know
+    staff = current_user.role in ['admin', 'super_coordinator', 'coordinator']
+    min_length = MIN_QUERY_LENGTH if staff else MIN_STUDENT_QUERY_LENGTH
+    if len(q.strip()) < min_length:
+        raise HTTPException(status_code=400, detail=f"Query must be at least {min_length} characters")
+    limit = max(1, min(limit, MAX_RESULTS))
+
+    projection = {"name": 1, "email": 1}
+    if staff:
+        projection.update({"registrationNumber": 1, "role": 1, "phoneNumber": 1, "isVITian": 1})
+
+    from app.db.mongodb import get_database
+    db = await get_database()
+    query = search_filter(q, ALL_KINDS if staff else STUDENT_KINDS)
+    users = await db.users.find(query, projection).limit(limit).to_list(limit)
+    for u in users:
+        u["_id"] = str(u["_id"])
+    return {"success": True, "data": users}
 
 @router.post("/admin/create", response_model=UserInDB)
 async def create_user_admin(user: UserCreate, current_user: UserInDB = Depends(get_current_user)):
@@ -45,6 +85,7 @@ async def create_user_admin(user: UserCreate, current_user: UserInDB = Depends(g
     hashed_password = get_password_hash(user.password)
     user_dict = user.model_dump()
     user_dict["password"] = hashed_password
+    with_search_keys(user_dict)
     
     # If role is not specified in payload, it defaults to student in schema usually, 
     # but here we respect what's passed in UserCreate or extend the schema if needed.
@@ -55,6 +96,26 @@ async def create_user_admin(user: UserCreate, current_user: UserInDB = Depends(g
     created_user = await db.users.find_one({"_id": result.inserted_id})
     return UserInDB(**created_user)
 
+@router.post("/admin/import")
+async def import_users_admin(file: UploadFile = File(...), current_user: UserInDB = Depends(get_current_user)):
+    # Same permission as single-user creation
+    if current_user.role not in ['super_coordinator', 'admin']:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    from app.db.mongodb import get_database
+    from app.services.user_import import parse_rows, import_users
+    from fastapi import HTTPException
+
+    content = await file.read()
+    try:
+        rows = parse_rows(content, file.filename or "", file.content_type or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse import file: {e}")
+
+    db = await get_database()
+    return await import_users(db, rows)
+
 @router.delete("/{user_id}")
 async def delete_user(user_id: str, current_user: UserInDB = Depends(get_current_user)):
     # Only super_coordinator or admin can delete users
@@ -87,6 +148,10 @@ async def delete_user(user_id: str, current_user: UserInDB = Depends(get_current
          raise HTTPException(status_code=403, detail="Cannot delete an Admin")
 
     await db.users.delete_one({"_id": oid})
+    
+    # Detach the user from their registrations in the background
+    from app.services.jobs import job_runner
+    await job_runner.enqueue("cascade_user_delete", {"userId": user_id})
     return {"success": True}
 
 @router.put("/{user_id}", response_model=UserInDB)
@@ -122,6 +187,9 @@ async def update_user(user_id: str, updates: dict, current_user: UserInDB = Depe
     if not clean_updates:
         raise HTTPException(status_code=400, detail="No valid updates")
 
+    if clean_updates.keys() & set(SEARCH_SOURCE_FIELDS):
+        clean_updates[SEARCH_KEYS_FIELD] = search_keys({**target_user, **clean_updates})
+
     await db.users.update_one({"_id": oid}, {"$set": clean_updates})
     updated = await db.users.find_one({"_id": oid})
     return UserInDB(**updated)
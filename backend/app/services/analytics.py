@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.core.metrics import metrics
+
+# Registration velocity is kept pre-aggregated: one document per hour per
+# dimension value, incremented when a registration is created. Reading a
+# series is then a range scan over at most one document per hour, however
+# many registrations there are. Buckets count registrations created (and
+# their team sizes); later deletions do not rewrite history.
+#
+# Dimensions: the event, each of its clubs, the creator's school and whether
+# the creator is a VITian, plus a campus-wide "all" series.
+
+BUCKETS_COLLECTION = "registration_buckets"
+DIMENSIONS = ("all", "event", "club", "school", "vitian")
+
+def bucket_hour(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+def dimension_keys(event: Optional[Dict[str, Any]], creator: Optional[Dict[str, Any]], event_id: Any = None) -> Dict[str, List[str]]:
+    keys: Dict[str, List[str]] = {"all": ["all"]}
+    if event_id is not None or event is not None:
+        keys["event"] = [str(event_id if event_id is not None else event["_id"])]
+    if event is not None:
+        keys["club"] = [str(c.get("_id") if isinstance(c, dict) else c) for c in event.get("clubs", []) if c]
+    if creator is not None:
+        keys["school"] = [str(creator.get("school") or "unknown")]
+        keys["vitian"] = ["vitian" if creator.get("isVITian") else "non_vitian"]
+    return keys
+
+def bucket_increments(at: datetime, keys: Dict[str, List[str]], team_size: int, counts: Dict[str, Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+    # Adds one registration to the buckets it falls into; `counts` lets a
+    # batch accumulate before writing
+    counts = counts if counts is not None else {}
+    hour = bucket_hour(at)
+    for dim, values in keys.items():
+        for key in values:
+            bucket_id = f"{dim}|{key}|{hour:%Y%m%d%H}"
+            bucket = counts.setdefault(bucket_id, {"dim": dim, "key": key, "hour": hour, "registrations": 0, "participants": 0})
+            bucket["registrations"] += 1
+            bucket["participants"] += team_size
+    return counts
+
+def bucket_ops(counts: Dict[str, Dict[str, Any]]) -> List[UpdateOne]:
+    return [
+        UpdateOne(
+            {"_id": bucket_id},
+            {"$setOnInsert": {"dim": b["dim"], "key": b["key"], "hour": b["hour"]},
+             "$inc": {"registrations": b["registrations"], "participants": b["participants"]}},
+            upsert=True,
+        )
+        for bucket_id, b in counts.items()
+    ]
+
+async def record_registration(db, registration: Dict[str, Any], event: Dict[str, Any], creator: Dict[str, Any]):
+    # Analytics must never fail a registration
+    try:
+        keys = dimension_keys(event, creator, registration.get("event"))
+        counts = bucket_increments(registration["_id"].generation_time, keys, len(registration.get("teamMembers", [])) or 1)
+        await db[BUCKETS_COLLECTION].bulk_write(bucket_ops(counts), ordered=False)
+    except Exception as e:
+        metrics.incr("analytics.recordErrors")
+        print(f"WARNING: Could not record registration analytics: {e}")
+
+async def read_series(db, dim: str, key: Optional[str], start: datetime, end: datetime, granularity: str = "hour") -> Dict[str, List[Dict[str, Any]]]:
+    # One series per key of the dimension (or just `key`), sorted by time
+    query: Dict[str, Any] = {"dim": dim, "hour": {"$gte": bucket_hour(start), "$lt": end}}
+    if key is not None:
+        query["key"] = key
+
+    if granularity == "hour":
+        docs = await db[BUCKETS_COLLECTION].find(query, {"_id": 0, "key": 1, "hour": 1, "registrations": 1, "participants": 1}).sort("hour", 1).to_list(None)
+        rows = [{"key": d["key"], "t": d["hour"], "registrations": d["registrations"], "participants": d["participants"]} for d in docs]
+    else:
+        pipeline = [
+            {"$match": query},
+            {"$group": {
+                "_id": {"key": "$key", "t": {"$dateTrunc": {"date": "$hour", "unit": "day"}}},
+                "registrations": {"$sum": "$registrations"},
+                "participants": {"$sum": "$participants"},
+            }},
+            {"$sort": {"_id.t": 1}},
+        ]
+        rows = [{"key": r["_id"]["key"], "t": r["_id"]["t"], "registrations": r["registrations"], "participants": r["participants"]}
+                async for r in db[BUCKETS_COLLECTION].aggregate(pipeline)]
+
+    series: Dict[str, List[Dict[str, Any]]] = {}
+    for row in rows:
+        series.setdefault(row.pop("key"), []).append(row)
+    return series
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Buckets are naive UTC; an offset such as +05:30 is converted, not dropped
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def default_range(start: Optional[datetime], end: Optional[datetime], days: int = 7):
+    end = as_utc(end) or datetime.utcnow() + timedelta(hours=1)
+    start = as_utc(start) or end - timedelta(days=days)
+    return start, end
@@ -0,0 +1,57 @@
+from bson import ObjectId
+
+from app.core.config import get_settings
+from app.core.fees import refresh_amount_due
+from app.core.schedule import refresh_registration_windows
+from app.db.maintenance import to_object_id
+from app.services.cascade import cascade_event_delete, cascade_user_delete
+from app.services.invitations import create_invitation_token, expire_invitations
+from app.services.jobs import job_runner
+from app.services.merch_orders import release_expired
+
+settings = get_settings()
+
+# Handlers for deferred work. Importing this module registers them with the
+# job runner; routers only need job_runner.enqueue(<name>, payload).
+
+@job_runner.job("refresh_amount_due", concurrency=2)
+async def refresh_amount_due_job(db, payload):
+    await refresh_amount_due(db, ObjectId(payload["registrationId"]))
+
+@job_runner.job("send_invitation", concurrency=4)
+async def send_invitation_job(db, payload):
+    invitation = await db.invitations.find_one({"_id": ObjectId(payload["invitationId"]), "status": "pending"})
+    if not invitation:
+        return
+    user = await db.users.find_one({"_id": to_object_id(invitation["userId"])}, {"email": 1})
+    if not user:
+        return
+    token = create_invitation_token(invitation["_id"], invitation["expiresAt"])
+    link = f"{settings.FRONTEND_URL}/invitations/accept?token={token}"
+    # No mail transport is configured yet; the link is logged for delivery
+    print(f"INFO: Team invitation for {user['email']}: {link}")
+
+@job_runner.job("expire_invitations")
+async def expire_invitations_job(db, payload):
+    # Scheduled for each registration's invitation deadline; sweeps every
+    # lapsed invitation, like release_merch_reservations
+    for registration_id in await expire_invitations(db):
+        await refresh_amount_due(db, registration_id)
+
+@job_runner.job("cascade_event_delete")
+async def cascade_event_delete_job(db, payload):
+    await cascade_event_delete(db, payload["eventId"])
+
+@job_runner.job("cascade_user_delete")
+async def cascade_user_delete_job(db, payload):
+    await cascade_user_delete(db, payload["userId"])
+
+@job_runner.job("release_merch_reservations")
+async def release_merch_reservations_job(db, payload):
+    # Scheduled for each order's deadline; sweeps every overdue reservation
+    # so one lost job never strands stock
+    await release_expired(db)
+
+@job_runner.job("refresh_registration_windows", concurrency=2)
+async def refresh_registration_windows_job(db, payload):
+    await refresh_registration_windows(db, payload["eventId"])
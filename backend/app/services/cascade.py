@@ -0,0 +1,96 @@
+from typing import Any, Dict, List
+
+from pymongo import DeleteOne, UpdateOne
+
+from app.core.fees import FEE_FIELDS, billed_team_size, compute_amount_due
+from app.core.metrics import metrics
+from app.db.maintenance import id_variants, to_object_id
+from app.services.live import batch_delete_message, change_message, live_bus, registration_delta
+
+# Cleanup of registrations that reference deleted events or users. Runs as a
+# background job after the delete, a batch at a time, so removing a popular
+# event does not hold the request open while thousands of rows go. Deletes
+# are published to the live dashboards like the request paths do.
+
+BATCH_SIZE = 500
+
+async def cascade_event_delete(db, event_id: Any) -> int:
+    event_refs = id_variants(event_id)
+    deleted = 0
+    while True:
+        batch = await db.registrations.find(
+            {"event": {"$in": event_refs}}, {"paymentStatus": 1, "amountDue": 1}
+        ).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+        if not batch:
+            break
+        result = await db.registrations.delete_many({"_id": {"$in": [r["_id"] for r in batch]}})
+        deleted += result.deleted_count
+        live_bus.publish(batch_delete_message(event_id, batch))
+
+    await db.invitations.delete_many({"event": {"$in": event_refs}})
+    metrics.incr("cascade.registrationsDeleted", deleted)
+    return deleted
+
+def detach_user_ops(reg: Dict[str, Any], user_refs: List[Any], event: Dict[str, Any] = None) -> Any:
+    # Removes the user from one registration. A registration left without
+    # members is deleted; one that lost its creator is handed to the next
+    # member. Pending dues are recomputed for the smaller team.
+    members = [m for m in reg.get("teamMembers", []) if m not in user_refs]
+    if not members:
+        return DeleteOne({"_id": reg["_id"]})
+
+    update: Dict[str, Any] = {
+        "$pull": {
+            "teamMembers": {"$in": user_refs},
+            "invitationStatus": {"userId": {"$in": user_refs}},
+        }
+    }
+    sets = {}
+    if reg.get("creator") in user_refs:
+        sets["creator"] = members[0]
+    if event is not None and reg.get("paymentStatus") != "paid":
+        remaining = {
+            "teamMembers": members,
+            "invitationStatus": [inv for inv in reg.get("invitationStatus", []) if inv.get("userId") not in user_refs],
+        }
+        sets["amountDue"] = compute_amount_due(event, billed_team_size(remaining))
+    if sets:
+        update["$set"] = sets
+    return UpdateOne({"_id": reg["_id"]}, update)
+
+async def detach_user_from_registrations(db, regs: List[Dict[str, Any]], user_refs: List[Any]) -> int:
+    event_ids = list({to_object_id(r.get("event")) for r in regs if r.get("event")})
+    events = await db.events.find({"_id": {"$in": event_ids}}, FEE_FIELDS).to_list(None)
+    events_by_id = {e["_id"]: e for e in events}
+
+    ops = [detach_user_ops(r, user_refs, events_by_id.get(to_object_id(r.get("event")))) for r in regs]
+    if ops:
+        await db.registrations.bulk_write(ops, ordered=False)
+    for reg, op in zip(regs, ops):
+        if isinstance(op, DeleteOne):
+            live_bus.publish(change_message("registration.deleted", reg, registration_delta(reg, -1)))
+    return len(ops)
+
+async def cascade_user_delete(db, user_id: Any) -> int:
+    user_refs = id_variants(user_id)
+    query = {"$or": [
+        {"creator": {"$in": user_refs}},
+        {"teamMembers": {"$in": user_refs}},
+        {"invitationStatus.userId": {"$in": user_refs}},
+    ]}
+    projection = {"event": 1, "creator": 1, "teamMembers": 1, "invitationStatus": 1, "paymentStatus": 1, "amountDue": 1}
+
+    touched = 0
+    last_id = None
+    while True:
+        batch_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+        regs = await db.registrations.find(batch_query, projection).sort("_id", 1).limit(BATCH_SIZE).to_list(BATCH_SIZE)
+        if not regs:
+            break
+        touched += await detach_user_from_registrations(db, regs, user_refs)
+        last_id = regs[-1]["_id"]
+
+    await db.invitations.delete_many({"userId": {"$in": user_refs}})
+    await db.refresh_tokens.delete_many({"userId": {"$in": user_refs}})
+    metrics.incr("cascade.registrationsDetached", touched)
+    return touched
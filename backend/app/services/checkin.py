@@ -0,0 +1,137 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import BulkWriteError, ConnectionFailure
+
+from app.core.metrics import metrics
+from app.core.passes import PassClaims
+from app.db.mongodb import get_database
+from app.services.analytics import as_utc
+
+# Gate scans are answered from the pass signature alone and written here in
+# batches with insert_many, so a queue of people at the gate never waits on
+# one insert per scan. The unique (registration, user) index makes the
+# first scan win; later ones for the same attendee are dropped as
+# duplicates, whichever worker or device they came from.
+
+CHECKINS_COLLECTION = "checkins"
+DUPLICATE_KEY = 11000
+
+def checkin_doc(claims: PassClaims, scanned_by: Any, scanned_at: Optional[datetime], device_id: Optional[str], source: str) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        "registration": claims.registration,
+        "user": claims.user,
+        "event": claims.event,
+        # Stored as naive UTC; an offline device's local offset is converted
+        "scannedAt": as_utc(scanned_at) or now,
+        "receivedAt": now,
+        "scannedBy": scanned_by,
+        "deviceId": device_id,
+        "source": source,
+    }
+
+async def insert_checkins(db, docs: List[Dict[str, Any]]) -> List[bool]:
+    # Returns, per document, whether it was new (False = already checked in)
+    if not docs:
+        return []
+    inserted = [True] * len(docs)
+    try:
+        await db[CHECKINS_COLLECTION].insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for err in e.details.get("writeErrors", []):
+            if err.get("code") != DUPLICATE_KEY:
+                raise
+            inserted[err["index"]] = False
+    return inserted
+
+class CheckinWriter:
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.1, max_queue: int = 20000,
+                 max_retries: int = 5, retry_base_delay: float = 0.5, seen_cache_size: int = 200000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.seen_cache_size = seen_cache_size
+        self.queue: Optional[asyncio.Queue] = None
+        # Attendees already scanned through this process, so a second scan
+        # is reported as such without a database read
+        self._seen: "OrderedDict[Tuple[Any, Any], None]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        metrics.gauge("checkin.queueDepth", lambda: self.queue.qsize() if self.queue else 0)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        await self.queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def seen(self, claims: PassClaims) -> bool:
+        return (claims.registration, claims.user) in self._seen
+
+    def remember(self, claims: PassClaims):
+        self._seen[(claims.registration, claims.user)] = None
+        if len(self._seen) > self.seen_cache_size:
+            self._seen.popitem(last=False)
+
+    def submit(self, doc: Dict[str, Any]) -> bool:
+        # False when the queue is full; the scanner should retry or keep the
+        # scan for its next bulk sync
+        try:
+            self.queue.put_nowait(doc)
+        except asyncio.QueueFull:
+            metrics.incr("checkin.rejectedQueueFull")
+            return False
+        return True
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._insert_with_retry(batch)
+            except Exception as e:
+                print(f"ERROR: Dropping {len(batch)} check-ins after retries: {e}")
+                for doc in batch:
+                    self._seen.pop((doc["registration"], doc["user"]), None)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _insert_with_retry(self, batch: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                db = await get_database()
+                inserted = await insert_checkins(db, batch)
+                metrics.incr("checkin.recorded", sum(inserted))
+                metrics.incr("checkin.duplicates", len(inserted) - sum(inserted))
+                return
+            except ConnectionFailure as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_base_delay * (2 ** attempt)
+                print(f"WARNING: Check-in batch failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+checkin_writer = CheckinWriter()
@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+from jose import JWTError, jwt
+from pymongo import ReturnDocument, UpdateOne
+
+from app.core.config import get_settings
+from app.core.schedule import clash_summary, describe_clashes, find_clashes_in_window
+from app.db.maintenance import id_variants
+
+# Team invitations live in their own collection so a TTL index can expire
+# pending ones; the registration keeps the member-facing invitationStatus.
+# Tokens are signed JWTs naming the invitation, so accepting one is a lookup
+# by _id and a conditional update - no scan, and it only succeeds once.
+
+settings = get_settings()
+TOKEN_TYPE = "team_invite"
+
+def create_invitation_token(invitation_id: Any, expires_at: datetime) -> str:
+    return jwt.encode({"typ": TOKEN_TYPE, "inv": str(invitation_id), "exp": expires_at}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_invitation_token(token: str) -> ObjectId:
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid or expired invitation")
+    if payload.get("typ") != TOKEN_TYPE or not ObjectId.is_valid(payload.get("inv", "")):
+        raise HTTPException(status_code=400, detail="Invalid or expired invitation")
+    return ObjectId(payload["inv"])
+
+async def create_invitations(db, registration_id: Any, event_id: Any, inviter_id: Any, user_ids: List[Any]) -> List[Any]:
+    if not user_ids:
+        return []
+    now = datetime.utcnow()
+    docs = [{
+        "registration": registration_id,
+        "event": event_id,
+        "userId": uid,
+        "invitedBy": inviter_id,
+        "status": "pending",
+        "createdAt": now,
+        "expiresAt": now + timedelta(hours=settings.INVITATION_EXPIRE_HOURS),
+    } for uid in user_ids]
+    result = await db.invitations.insert_many(docs)
+    return result.inserted_ids
+
+def _registration_update(invitation: Dict[str, Any], status: str) -> UpdateOne:
+    update: Dict[str, Any] = {"$set": {"invitationStatus.$.status": status, "invitationStatus.$.tokenExpires": None}}
+    if status == "accepted":
+        update["$addToSet"] = {"teamMembers": invitation["userId"]}
+    return UpdateOne(
+        {"_id": invitation["registration"], "invitationStatus.userId": {"$in": id_variants(invitation["userId"])}},
+        update,
+    )
+
+async def respond_with_token(db, token: str, user_id: Any, action: str, allow_schedule_clash: bool = False) -> Dict[str, Any]:
+    invitation_id = decode_invitation_token(token)
+    status = "accepted" if action == "accept" else "declined"
+
+    if status == "accepted":
+        invitation = await db.invitations.find_one({"_id": invitation_id}, {"registration": 1, "event": 1})
+        if invitation and await db.registrations.find_one({
+            "_id": {"$ne": invitation["registration"]},
+            "event": {"$in": id_variants(invitation["event"])},
+            "teamMembers": {"$in": id_variants(user_id)},
+        }, {"_id": 1}):
+            raise HTTPException(status_code=400, detail="You are already registered for this event")
+        # The team creator's override does not cover the invitee
+        if invitation and settings.SCHEDULE_CLASH_CHECK_ENABLED and not allow_schedule_clash:
+            reg = await db.registrations.find_one({"_id": invitation["registration"]}, {"startsAt": 1, "endsAt": 1})
+            clashes = await find_clashes_in_window(db, [user_id], reg and reg.get("startsAt"), reg and reg.get("endsAt"), invitation["event"])
+            if clashes:
+                described = await describe_clashes(db, clashes, [user_id])
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Schedule clash: {clash_summary(described)}. Set allowScheduleClash to accept anyway."
+                )
+
+    # Single use: only a pending, unexpired invitation for this user flips.
+    # Removing expiresAt also takes it out of the TTL index.
+    invitation = await db.invitations.find_one_and_update(
+        {"_id": invitation_id, "userId": {"$in": id_variants(user_id)}, "status": "pending", "expiresAt": {"$gt": datetime.utcnow()}},
+        {"$set": {"status": status, "respondedAt": datetime.utcnow()}, "$unset": {"expiresAt": ""}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if invitation is None:
+        raise HTTPException(status_code=400, detail="Invitation is invalid, expired or already used")
+
+    await db.registrations.bulk_write([_registration_update(invitation, status)])
+    return invitation
+
+async def close_invitations(db, registration_id: Any, status: str, user_id: Any = None):
+    # Pending invitations of a deleted registration (or of a member who left)
+    # can no longer be used; expiresAt stays so the TTL index still removes them
+    query: Dict[str, Any] = {"registration": registration_id, "status": "pending"}
+    if user_id is not None:
+        query["userId"] = {"$in": id_variants(user_id)}
+    await db.invitations.update_many(query, {"$set": {"status": status, "respondedAt": datetime.utcnow()}})
+
+async def expire_invitations(db) -> List[Any]:
+    # Marks lapsed pending entries on registrations as expired (the TTL index
+    # removes the invitation documents themselves) and returns the
+    # registrations touched, whose amounts then need refreshing
+    now = datetime.utcnow()
+    overdue = {"status": "pending", "tokenExpires": {"$lte": now}}
+    regs = await db.registrations.find({"invitationStatus": {"$elemMatch": overdue}}, {"_id": 1}).to_list(None)
+    ids = [r["_id"] for r in regs]
+    if ids:
+        await db.registrations.update_many(
+            {"_id": {"$in": ids}},
+            {"$set": {"invitationStatus.$[inv].status": "expired", "invitationStatus.$[inv].tokenExpires": None}},
+            array_filters=[{"inv.status": "pending", "inv.tokenExpires": {"$lte": now}}],
+        )
+    return ids
+
+async def _split_event_conflicts(db, user_id: Any, pending: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # Same rule as respond_with_token: one registration per event. Events the
+    # user already holds a place in are refused, and of several invitations
+    # for the same event only the first is accepted.
+    taken = await db.registrations.find({
+        "_id": {"$nin": [inv["registration"] for inv in pending]},
+        "event": {"$in": [ref for inv in pending for ref in id_variants(inv["event"])]},
+        "teamMembers": {"$in": id_variants(user_id)},
+    }, {"event": 1}).to_list(None)
+    events = {str(r["event"]) for r in taken}
+
+    accepted, conflicts = [], []
+    for inv in pending:
+        if str(inv["event"]) in events:
+            inv["conflict"] = "already_registered"
+            conflicts.append(inv)
+        else:
+            events.add(str(inv["event"]))
+            accepted.append(inv)
+    return accepted, conflicts
+
+async def _split_schedule_clashes(db, user_id: Any, pending: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # Refuses invitations whose event overlaps one the user is registered
+    # for, or one accepted earlier in the same batch
+    regs = await db.registrations.find({"_id": {"$in": [inv["registration"] for inv in pending]}}, {"startsAt": 1, "endsAt": 1}).to_list(None)
+    windows = {r["_id"]: (r.get("startsAt"), r.get("endsAt")) for r in regs}
+
+    accepted, conflicts, taken = [], [], []
+    for inv in pending:
+        start, end = windows.get(inv["registration"], (None, None))
+        overlaps = start is not None and any(s < end and start < e for s, e in taken)
+        if overlaps or await find_clashes_in_window(db, [user_id], start, end, inv["event"]):
+            inv["conflict"] = "schedule_clash"
+            conflicts.append(inv)
+            continue
+        if start is not None:
+            taken.append((start, end))
+        accepted.append(inv)
+    return accepted, conflicts
+
+async def respond_to_all(db, user_id: Any, action: str, allow_schedule_clash: bool = False) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # Returns (answered, conflicts); conflicting invitations stay pending so
+    # they can still be declined
+    status = "accepted" if action == "accept" else "declined"
+    pending = await db.invitations.find(
+        {"userId": {"$in": id_variants(user_id)}, "status": "pending", "expiresAt": {"$gt": datetime.utcnow()}},
+        {"registration": 1, "event": 1, "userId": 1},
+    ).to_list(None)
+    conflicts = []
+    if pending and status == "accepted":
+        pending, conflicts = await _split_event_conflicts(db, user_id, pending)
+        if pending and settings.SCHEDULE_CLASH_CHECK_ENABLED and not allow_schedule_clash:
+            pending, clashing = await _split_schedule_clashes(db, user_id, pending)
+            conflicts += clashing
+    if not pending:
+        return [], conflicts
+
+    ids = [inv["_id"] for inv in pending]
+    await db.invitations.update_many(
+        {"_id": {"$in": ids}, "status": "pending"},
+        {"$set": {"status": status, "respondedAt": datetime.utcnow()}, "$unset": {"expiresAt": ""}},
+    )
+    await db.registrations.bulk_write([_registration_update(inv, status) for inv in pending], ordered=False)
+    return pending, conflicts
@@ -0,0 +1,186 @@
+import asyncio
+import os
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+from pymongo import ReturnDocument
+
+from app.core.metrics import metrics
+from app.db.mongodb import get_database
+
+# Deferred side effects run here instead of on the request path. Jobs are
+# persisted in the `jobs` collection before they are dispatched, so anything
+# not finished when the process stops is picked up again on the next start
+# (by this or any other worker - claiming is an atomic find_one_and_update).
+
+JOBS_COLLECTION = "jobs"
+
+JobHandler = Callable[[Any, Dict[str, Any]], Awaitable[None]]
+
+@dataclass
+class JobType:
+    name: str
+    handler: JobHandler
+    concurrency: int = 1
+    max_attempts: int = 5
+    backoff: float = 2.0
+    max_queued: int = 1000
+
+class JobRunner:
+    def __init__(self, poll_interval: float = 2.0, drain_timeout: float = 10.0, lease_timeout: float = 600.0):
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.lease_timeout = lease_timeout
+        self.types: Dict[str, JobType] = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._dispatched: Set[Any] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+
+    def job(self, name: str, concurrency: int = 1, max_attempts: int = 5, backoff: float = 2.0, max_queued: int = 1000):
+        def decorator(handler: JobHandler) -> JobHandler:
+            self.types[name] = JobType(name, handler, concurrency, max_attempts, backoff, max_queued)
+            return handler
+        return decorator
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any], delay: float = 0) -> Any:
+        db = await get_database()
+        now = datetime.utcnow()
+        doc = {
+            "type": job_type,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "runAt": now + timedelta(seconds=delay),
+            "createdAt": now,
+        }
+        result = await db[JOBS_COLLECTION].insert_one(doc)
+        metrics.incr(f"jobs.{job_type}.enqueued")
+
+        # Fast path: hand the job straight to a local worker. If the queue is
+        # full (or delayed) the poller dispatches it from Mongo later.
+        queue = self._queues.get(job_type)
+        if self._running and queue is not None and not delay:
+            try:
+                queue.put_nowait(result.inserted_id)
+                self._dispatched.add(result.inserted_id)
+            except asyncio.QueueFull:
+                pass
+        return result.inserted_id
+
+    async def start(self):
+        db = await get_database()
+        # Jobs this process owned when it last stopped never finished
+        await db[JOBS_COLLECTION].update_many(
+            {"status": "running", "owner": self.owner},
+            {"$set": {"status": "queued"}, "$unset": {"owner": ""}},
+        )
+
+        self._running = True
+        for job_type in self.types.values():
+            queue = self._queues[job_type.name] = asyncio.Queue(maxsize=job_type.max_queued)
+            metrics.gauge(f"jobs.{job_type.name}.queueDepth", queue.qsize)
+            for _ in range(job_type.concurrency):
+                self._tasks.append(asyncio.create_task(self._worker(job_type)))
+        self._tasks.append(asyncio.create_task(self._poll()))
+
+    async def stop(self):
+        self._running = False
+        # Drain what is already dispatched locally, then stop; anything left
+        # stays queued in Mongo for the next start
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues.values())), self.drain_timeout)
+        except asyncio.TimeoutError:
+            print("WARNING: Job runner drain timed out, remaining jobs stay queued")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _poll(self):
+        while self._running:
+            try:
+                await self._dispatch_due()
+            except Exception as e:
+                print(f"WARNING: Job poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _dispatch_due(self):
+        db = await get_database()
+        # Jobs left running by a worker that died (e.g. a replaced container)
+        await db[JOBS_COLLECTION].update_many(
+            {"status": "running", "startedAt": {"$lt": datetime.utcnow() - timedelta(seconds=self.lease_timeout)}},
+            {"$set": {"status": "queued"}, "$unset": {"owner": ""}},
+        )
+        for name, queue in self._queues.items():
+            free = queue.maxsize - queue.qsize()
+            if free <= 0:
+                continue
+            due = await db[JOBS_COLLECTION].find(
+                {"type": name, "status": "queued", "runAt": {"$lte": datetime.utcnow()}, "_id": {"$nin": list(self._dispatched)}},
+                {"_id": 1},
+            ).sort("runAt", 1).limit(free).to_list(free)
+            for doc in due:
+                queue.put_nowait(doc["_id"])
+                self._dispatched.add(doc["_id"])
+
+    async def _worker(self, job_type: JobType):
+        queue = self._queues[job_type.name]
+        while True:
+            job_id = await queue.get()
+            try:
+                await self._run_one(job_type, job_id)
+            except Exception as e:
+                print(f"ERROR: Job runner failed on {job_type.name} {job_id}: {e}")
+            finally:
+                self._dispatched.discard(job_id)
+                queue.task_done()
+
+    async def _run_one(self, job_type: JobType, job_id: Any):
+        db = await get_database()
+        jobs = db[JOBS_COLLECTION]
+        job = await jobs.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "owner": self.owner, "startedAt": datetime.utcnow()}, "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            # Claimed by another worker in the meantime
+            return
+
+        started = time.perf_counter()
+        try:
+            await job_type.handler(db, job.get("payload") or {})
+        except Exception as e:
+            metrics.incr(f"jobs.{job_type.name}.errors")
+            if job["attempts"] >= job_type.max_attempts:
+                print(f"ERROR: Job {job_type.name} {job_id} failed permanently: {e}")
+                await jobs.update_one({"_id": job_id}, {"$set": {"status": "failed", "error": str(e), "finishedAt": datetime.utcnow()}})
+                metrics.incr(f"jobs.{job_type.name}.failed")
+            else:
+                delay = job_type.backoff * (2 ** (job["attempts"] - 1))
+                await jobs.update_one(
+                    {"_id": job_id},
+                    {"$set": {"status": "queued", "error": str(e), "runAt": datetime.utcnow() + timedelta(seconds=delay)}, "$unset": {"owner": ""}},
+                )
+            return
+
+        finished = datetime.utcnow()
+        await jobs.update_one({"_id": job_id}, {"$set": {"status": "done", "finishedAt": finished}, "$unset": {"owner": ""}})
+        metrics.incr(f"jobs.{job_type.name}.done")
+        metrics.observe(f"jobs.{job_type.name}.runTime", time.perf_counter() - started)
+        metrics.observe(f"jobs.{job_type.name}.latency", (finished - job["createdAt"]).total_seconds())
+
+    async def stats(self) -> Dict[str, Dict[str, int]]:
+        db = await get_database()
+        pipeline = [{"$group": {"_id": {"type": "$type", "status": "$status"}, "count": {"$sum": 1}}}]
+        result: Dict[str, Dict[str, int]] = {}
+        async for row in db[JOBS_COLLECTION].aggregate(pipeline):
+            result.setdefault(row["_id"]["type"], {})[row["_id"]["status"]] = row["count"]
+        return result
+
+job_runner = JobRunner()
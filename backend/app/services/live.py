@@ -0,0 +1,171 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set
+
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.db.mongodb import db as mongo, get_database
+
+# Pushes registration and payment count changes to open admin dashboards.
+# Each change is turned into one small delta message and fanned out to the
+# subscribers' queues, instead of every dashboard re-running the stats
+# aggregations on a timer.
+#
+# Source of changes:
+# - "local": the registration and payment write paths call publish(). Only
+#   writes handled by this worker process are seen.
+# - "changestream": a change stream on `registrations` (needs a replica set)
+#   feeds every worker with every write; publish() calls are then ignored.
+#   Deleted registrations carry their counts only when the collection has
+#   changeStreamPreAndPostImages enabled (ensure_indexes turns it on where
+#   the server supports it); otherwise dashboards get "resync".
+# - "auto" (default): change stream when connected to a replica set.
+
+settings = get_settings()
+
+def registration_delta(reg: Dict[str, Any], sign: int = 1) -> Dict[str, float]:
+    paid = reg.get("paymentStatus") == "paid"
+    amount = reg.get("amountDue") or 0
+    return {
+        "registered": sign,
+        "paid": sign if paid else 0,
+        "unpaid": 0 if paid else sign,
+        "amountCollected": sign * amount if paid else 0,
+        "outstandingDues": 0 if paid else sign * amount,
+    }
+
+def payment_delta(reg: Dict[str, Any]) -> Dict[str, float]:
+    amount = reg.get("amountDue") or 0
+    return {"registered": 0, "paid": 1, "unpaid": -1, "amountCollected": amount, "outstandingDues": -amount}
+
+def change_message(kind: str, reg: Dict[str, Any], delta: Dict[str, float]) -> Dict[str, Any]:
+    return {"type": kind, "event": str(reg.get("event")), "registration": str(reg.get("_id")), "delta": delta}
+
+def batch_delete_message(event_id: Any, regs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # One summed message for a bulk delete of one event's registrations, so
+    # a large cascade does not overflow every subscriber's queue
+    delta: Dict[str, float] = {}
+    for reg in regs:
+        for key, value in registration_delta(reg, -1).items():
+            delta[key] = delta.get(key, 0) + value
+    return {"type": "registration.deleted", "event": str(event_id), "registration": None, "delta": delta}
+
+class Subscriber:
+    def __init__(self, events: Optional[Set[str]], max_queue: int):
+        # events=None receives everything; otherwise only these event IDs
+        self.events = events
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.resync_pending = False
+
+    def offer(self, message: Dict[str, Any]):
+        if self.events is not None and message.get("event") is not None and message["event"] not in self.events:
+            return
+        if self.resync_pending and message["type"] != "shutdown":
+            # The client reloads everything once it reads the queued resync;
+            # deltas and further resyncs until then are already covered
+            return
+        if message["type"] == "resync":
+            self.resync_pending = True
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A slow client missed updates; drop its backlog and tell it to
+            # reload once rather than buffering without bound
+            metrics.incr("live.subscriberLagged")
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resync_pending = True
+            self.queue.put_nowait({"type": "resync"})
+            if message["type"] == "shutdown":
+                self.queue.put_nowait(message)
+
+    async def get(self) -> Dict[str, Any]:
+        message = await self.queue.get()
+        if message["type"] == "resync":
+            self.resync_pending = False
+        return message
+
+class LiveBus:
+    def __init__(self, max_queue: int = 256, retry_delay: float = 5.0):
+        self.max_queue = max_queue
+        self.retry_delay = retry_delay
+        self.source = "local"
+        self._subscribers: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.source = settings.LIVE_UPDATES_SOURCE
+        if self.source == "auto":
+            hello = await mongo.client.admin.command("hello")
+            self.source = "changestream" if hello.get("setName") else "local"
+        metrics.gauge("live.subscribers", lambda: len(self._subscribers))
+        if self.source == "changestream":
+            self._task = asyncio.create_task(self._watch())
+        print(f"INFO: Live dashboard updates from {self.source} writes")
+
+    async def stop(self):
+        for subscriber in list(self._subscribers):
+            subscriber.offer({"type": "shutdown"})
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def subscribe(self, events: Optional[Set[str]] = None) -> Subscriber:
+        subscriber = Subscriber(events, self.max_queue)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, message: Dict[str, Any]):
+        # Called from write paths; the change stream already covers them
+        if self.source == "local":
+            self._fan_out(message)
+
+    def _fan_out(self, message: Dict[str, Any]):
+        metrics.incr("live.messages")
+        for subscriber in list(self._subscribers):
+            subscriber.offer(message)
+
+    async def _watch(self):
+        pipeline = [{"$match": {"operationType": {"$in": ["insert", "update", "replace", "delete"]}}}]
+        resume_token = None
+        while True:
+            try:
+                db = await get_database()
+                async with db.registrations.watch(
+                    pipeline, full_document="updateLookup", full_document_before_change="whenAvailable", resume_after=resume_token
+                ) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        message = self._from_change(change)
+                        if message is not None:
+                            self._fan_out(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"WARNING: Registration change stream failed ({e}), retrying in {self.retry_delay:.0f}s")
+                # Whatever happened meanwhile is unknown to the dashboards
+                self._fan_out({"type": "resync"})
+                await asyncio.sleep(self.retry_delay)
+
+    def _from_change(self, change: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        op = change["operationType"]
+        if op == "insert":
+            return change_message("registration.created", change["fullDocument"], registration_delta(change["fullDocument"]))
+        if op == "delete":
+            before = change.get("fullDocumentBeforeChange")
+            if before is None:
+                return {"type": "resync"}
+            return change_message("registration.deleted", before, registration_delta(before, -1))
+        if op == "update":
+            updated = change.get("updateDescription", {}).get("updatedFields", {})
+            doc = change.get("fullDocument")
+            if updated.get("paymentStatus") == "paid" and doc is not None:
+                return change_message("payment.paid", doc, payment_delta(doc))
+            return None
+        # A replaced document may have changed anything
+        return {"type": "resync"}
+
+live_bus = LiveBus()
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import importlib.util
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+# Uploaded posters and merch images are stored content-addressed: every file
+# of an upload lives under the sha256 of the original bytes, so URLs never
+# change meaning and can be cached forever. Resized WebP variants are
+# rendered in a process pool because decoding and resampling are CPU bound.
+
+settings = get_settings()
+
+# name -> max width in pixels
+VARIANTS: Dict[str, int] = {"thumb": 480, "medium": 1200}
+WEBP_QUALITY = 80
+
+IMAGE_SIGNATURES: List[Tuple[bytes, str]] = [
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+]
+CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "gif": "image/gif", "webp": "image/webp"}
+
+MEDIA_KEY_RE = re.compile(r"^([0-9a-f]{64})/[a-z]+\.(png|jpg|gif|webp)$")
+
+def sniff_image(data: bytes) -> Optional[str]:
+    # Trust the bytes, not the client's Content-Type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    for signature, ext in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return ext
+    return None
+
+class LocalMediaStore:
+    # Files under MEDIA_ROOT, keyed "<digest>/<name>". Another backend (e.g.
+    # an object store) only needs the same four methods.
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def write(self, key: str, data: bytes):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so readers never see a partial file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def url(self, key: str) -> str:
+        return f"{settings.MEDIA_URL_PREFIX}/{key}"
+
+@lru_cache()
+def get_media_store() -> LocalMediaStore:
+    if settings.MEDIA_BACKEND != "local":
+        raise RuntimeError(f"Unsupported MEDIA_BACKEND: {settings.MEDIA_BACKEND}")
+    return LocalMediaStore(settings.MEDIA_ROOT)
+
+_image_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_image_pool() -> ProcessPoolExecutor:
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(max_workers=settings.MEDIA_WORKERS or os.cpu_count() or 2)
+    return _image_pool
+
+def shutdown_image_pool():
+    global _image_pool
+    if _image_pool is not None:
+        _image_pool.shutdown(wait=False, cancel_futures=True)
+        _image_pool = None
+
+@lru_cache(maxsize=1)
+def has_pillow() -> bool:
+    # Pillow is optional; without it only the original is stored. Checked
+    # without importing it, which costs noticeable startup time
+    return importlib.util.find_spec("PIL") is not None
+
+def render_variants(data: bytes, variants: Dict[str, int]) -> Dict[str, bytes]:
+    # Runs in a worker process
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    rendered = {}
+    for name, max_width in variants.items():
+        variant = image
+        if image.width > max_width:
+            height = max(1, round(image.height * max_width / image.width))
+            variant = image.resize((max_width, height), Image.LANCZOS)
+        out = io.BytesIO()
+        variant.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        rendered[f"{name}.webp"] = out.getvalue()
+    return rendered
+
+async def store_image(db, data: bytes, uploaded_by: Any = None) -> Dict[str, Any]:
+    ext = sniff_image(data)
+    if ext is None:
+        raise ValueError("Unsupported image type, upload PNG, JPEG, GIF or WebP")
+
+    store = get_media_store()
+    digest = hashlib.sha256(data).hexdigest()
+    existing = await db.media.find_one({"_id": digest})
+    if existing and store.exists(f"{digest}/original.{ext}"):
+        # Same bytes uploaded before: nothing to render
+        return existing
+
+    files = {f"original.{ext}": data}
+    if has_pillow():
+        loop = asyncio.get_running_loop()
+        try:
+            files.update(await loop.run_in_executor(_get_image_pool(), render_variants, data, VARIANTS))
+        except Exception as e:
+            # A corrupt or exotic image still gets stored as uploaded
+            print(f"WARNING: Could not render variants for {digest}: {e}")
+
+    await asyncio.to_thread(lambda: [store.write(f"{digest}/{name}", body) for name, body in files.items()])
+
+    doc = {
+        "_id": digest,
+        "contentType": CONTENT_TYPES[ext],
+        "size": len(data),
+        "url": store.url(f"{digest}/original.{ext}"),
+        "variants": {name.split(".")[0]: store.url(f"{digest}/{name}") for name in files if not name.startswith("original.")},
+        "uploadedBy": uploaded_by,
+        "createdAt": datetime.utcnow(),
+    }
+    await db.media.replace_one({"_id": digest}, doc, upsert=True)
+    return doc
+
+def thumbnail_for(url: Optional[str]) -> Optional[str]:
+    # Thumbnail of an uploaded image, derived from its URL. Anything not
+    # uploaded here (external links) has no thumbnail.
+    if not url:
+        return None
+    prefix = settings.MEDIA_URL_PREFIX + "/"
+    match = MEDIA_KEY_RE.match(url[len(prefix):]) if url.startswith(prefix) else None
+    if not match:
+        return None
+    store = get_media_store()
+    key = f"{match.group(1)}/thumb.webp"
+    return store.url(key) if store.exists(key) else None
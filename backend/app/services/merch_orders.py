@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+
+from app.core.compression import catalog_cache
+from app.core.config import get_settings
+from app.core.metrics import metrics
+
+# Stock is only ever changed with a conditional $inc: the filter requires
+# enough units left and the decrement happens in the same single-document
+# write, so concurrent buyers can never take the stock below zero. An order
+# holds its units while `reserved`; if it is not paid by expiresAt the units
+# go back. Every status change is a conditional update too, so a release and
+# a payment racing on the same order cannot both win.
+
+settings = get_settings()
+
+def stock_field(size: Optional[str]) -> str:
+    return f"sizeStock.{size}" if size else "stock"
+
+async def reserve_line(db, item_id: ObjectId, size: Optional[str], quantity: int) -> bool:
+    field = stock_field(size)
+    item = await db.merch_items.find_one_and_update(
+        {"_id": item_id, "salesOpen": True, field: {"$gte": quantity}},
+        {"$inc": {field: -quantity}},
+        projection={field: 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if item is None:
+        metrics.incr("merch.reserveRejected")
+        return False
+    metrics.incr("merch.reserved", quantity)
+    # The cached catalog shows availability; refresh it when something sells out
+    remaining = item["sizeStock"][size] if size else item["stock"]
+    if remaining == 0:
+        await catalog_cache.bump("merch")
+    return True
+
+def release_ops(lines: List[Dict[str, Any]]) -> List[UpdateOne]:
+    return [
+        UpdateOne({"_id": ObjectId(line["item"])}, {"$inc": {stock_field(line.get("size")): line["quantity"]}})
+        for line in lines if line.get("limited", True)
+    ]
+
+async def release_lines(db, lines: List[Dict[str, Any]]):
+    ops = release_ops(lines)
+    if ops:
+        await db.merch_items.bulk_write(ops, ordered=False)
+        metrics.incr("merch.released", sum(line["quantity"] for line in lines if line.get("limited", True)))
+        await catalog_cache.bump("merch")
+
+async def resolve_lines(db, lines: List[Any]) -> List[Dict[str, Any]]:
+    # Merge repeated (item, size) lines and price them from the catalog
+    merged: Dict[Tuple[str, Optional[str]], int] = {}
+    for line in lines:
+        if not ObjectId.is_valid(line.item):
+            raise HTTPException(status_code=404, detail=f"Item {line.item} not found")
+        key = (line.item, line.size)
+        merged[key] = merged.get(key, 0) + line.quantity
+
+    item_ids = list({ObjectId(item_id) for item_id, _ in merged})
+    items = await db.merch_items.find({"_id": {"$in": item_ids}}, {"name": 1, "price": 1, "salesOpen": 1, "stock": 1, "sizeStock": 1}).to_list(None)
+    items_by_id = {str(i["_id"]): i for i in items}
+
+    resolved = []
+    for (item_id, size), quantity in merged.items():
+        item = items_by_id.get(item_id)
+        if item is None:
+            raise HTTPException(status_code=404, detail=f"Item {item_id} not found")
+        if not item.get("salesOpen", True):
+            raise HTTPException(status_code=400, detail=f"Sales are closed for {item['name']}")
+        if quantity > settings.MERCH_MAX_QUANTITY_PER_ITEM:
+            raise HTTPException(status_code=400, detail=f"At most {settings.MERCH_MAX_QUANTITY_PER_ITEM} of {item['name']} per order")
+        sizes = item.get("sizeStock") or {}
+        if sizes and size not in sizes:
+            raise HTTPException(status_code=400, detail=f"Choose a size for {item['name']}: {', '.join(sizes)}")
+        if not sizes and size:
+            raise HTTPException(status_code=400, detail=f"{item['name']} is not sold in sizes")
+        resolved.append({
+            "item": item_id,
+            "size": size,
+            "quantity": quantity,
+            "name": item["name"],
+            "price": item["price"],
+            # Items without a stock count are unlimited and never reserved
+            "limited": bool(sizes) or item.get("stock") is not None,
+        })
+    return resolved
+
+async def place_order(db, user_id: Any, lines: List[Any]) -> Dict[str, Any]:
+    resolved = await resolve_lines(db, lines)
+
+    reserved = []
+    for line in resolved:
+        if line["limited"] and not await reserve_line(db, ObjectId(line["item"]), line["size"], line["quantity"]):
+            # Give back what this order already took
+            await release_lines(db, reserved)
+            size = f" (size {line['size']})" if line["size"] else ""
+            raise HTTPException(status_code=409, detail=f"{line['name']}{size} is out of stock")
+        reserved.append(line)
+
+    now = datetime.utcnow()
+    order = {
+        "user": user_id,
+        "items": resolved,
+        "total": sum(line["price"] * line["quantity"] for line in resolved),
+        "status": "reserved",
+        "createdAt": now,
+        "expiresAt": now + timedelta(minutes=settings.MERCH_RESERVATION_MINUTES),
+    }
+    try:
+        result = await db.merch_orders.insert_one(order)
+    except Exception:
+        await release_lines(db, reserved)
+        raise
+    order["_id"] = result.inserted_id
+    metrics.incr("merch.ordersPlaced")
+    return order
+
+async def release_order(db, order_id: ObjectId, from_status: str, to_status: str, extra: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    # Only the caller whose conditional update flips the status gives the
+    # stock back, so it is returned exactly once
+    query = {"_id": order_id, "status": from_status}
+    if extra:
+        query.update(extra)
+    order = await db.merch_orders.find_one_and_update(
+        query,
+        {"$set": {"status": to_status, "releasedAt": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if order is not None:
+        await release_lines(db, order["items"])
+    return order
+
+async def release_expired(db, limit: int = 500) -> int:
+    expired = await db.merch_orders.find(
+        {"status": "reserved", "expiresAt": {"$lte": datetime.utcnow()}}, {"_id": 1}
+    ).limit(limit).to_list(limit)
+    released = 0
+    for order in expired:
+        if await release_order(db, order["_id"], "reserved", "expired", {"expiresAt": {"$lte": datetime.utcnow()}}):
+            released += 1
+    metrics.incr("merch.ordersExpired", released)
+    return released
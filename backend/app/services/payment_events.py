@@ -0,0 +1,214 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure
+
+from app.core.metrics import metrics
+from app.db.mongodb import get_database
+from app.services.live import live_bus, change_message, payment_delta
+
+# Webhook events are acknowledged as soon as their signature checks out and
+# applied here in batches, so a burst of confirmations after a fee deadline
+# never holds up the HTTP response.
+
+PROCESSED_COLLECTION = "payment_events"
+
+class PaymentEventWorker:
+    def __init__(self, batch_size: int = 100, flush_interval: float = 0.2, max_queue: int = 10000,
+                 max_retries: int = 5, retry_base_delay: float = 0.5, seen_cache_size: int = 50000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.seen_cache_size = seen_cache_size
+        self.queue: Optional[asyncio.Queue] = None
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        metrics.gauge("payments.webhookQueueDepth", lambda: self.depth)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # Let everything already acknowledged reach the database
+        await self.queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def submit(self, event: Dict[str, Any]) -> bool:
+        # Returns False only when the queue is full; duplicates are accepted
+        # (and ignored) so the sender stops retrying them.
+        event_id = event.get("id")
+        if event_id in self._seen:
+            return True
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        self._remember(event_id)
+        return True
+
+    def _remember(self, event_id: Optional[str]):
+        if event_id is None:
+            return
+        self._seen[event_id] = None
+        if len(self._seen) > self.seen_cache_size:
+            self._seen.popitem(last=False)
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._apply_with_retry(batch)
+            except Exception as e:
+                print(f"ERROR: Dropping {len(batch)} payment events after retries: {e}")
+                # Allow a redelivery of the same events to be queued again
+                for event in batch:
+                    self._seen.pop(event.get("id"), None)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _apply_with_retry(self, batch: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._apply(batch)
+            except ConnectionFailure as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.retry_base_delay * (2 ** attempt)
+                print(f"WARNING: Payment batch failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _apply(self, batch: List[Dict[str, Any]]):
+        db = await get_database()
+
+        # Skip events already applied by this or another worker process
+        ids = [e["id"] for e in batch if e.get("id")]
+        done = await db[PROCESSED_COLLECTION].find({"_id": {"$in": ids}}, {"_id": 1}).to_list(None)
+        done_ids = {d["_id"] for d in done}
+
+        ops: Dict[str, List[UpdateOne]] = {}
+        records = []
+        applied = []
+        pending_ids = set()
+        registration_ids = []
+        for event in batch:
+            event_id = event.get("id")
+            if not event_id or event_id in done_ids or event_id in pending_ids:
+                continue
+            pending_ids.add(event_id)
+            applied.append(event)
+            registration_id = self._registration_id(event)
+            if registration_id is not None:
+                registration_ids.append(registration_id)
+
+        # Amounts due, to check each payment covers its registration
+        registrations = {}
+        if registration_ids:
+            docs = await db.registrations.find(
+                {"_id": {"$in": registration_ids}}, {"event": 1, "amountDue": 1, "paymentStatus": 1}
+            ).to_list(None)
+            registrations = {d["_id"]: d for d in docs}
+
+        # Registrations this batch will flip to paid, for the live dashboards
+        newly_paid = []
+        for event in applied:
+            records.append({"_id": event["id"], "type": event.get("type"), "processedAt": datetime.utcnow()})
+            for collection, op in self._to_updates(event, registrations):
+                ops.setdefault(collection, []).append(op)
+                if collection == "registrations":
+                    reg = registrations[self._registration_id(event)]
+                    reg["paymentStatus"] = "paid"  # a second event in the batch is a no-op
+                    if live_bus.source == "local":
+                        newly_paid.append(reg)
+
+        for collection, collection_ops in ops.items():
+            await db[collection].bulk_write(collection_ops, ordered=False)
+        for reg in newly_paid:
+            live_bus.publish(change_message("payment.paid", reg, payment_delta(reg)))
+        metrics.incr("payments.webhookEventsApplied", len(records))
+
+        # Recorded after the updates, which are idempotent, so a crash in
+        # between at worst re-applies the same $set
+        if records:
+            try:
+                await db[PROCESSED_COLLECTION].insert_many(records, ordered=False)
+            except BulkWriteError as e:
+                if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+                    raise
+
+    def _registration_id(self, event: Dict[str, Any]) -> Optional[ObjectId]:
+        if event.get("type") != "payment_intent.succeeded":
+            return None
+        registration_id = event.get("data", {}).get("object", {}).get("metadata", {}).get("registrationId")
+        return ObjectId(registration_id) if registration_id and ObjectId.is_valid(registration_id) else None
+
+    def _to_updates(self, event: Dict[str, Any], registrations: Optional[Dict[ObjectId, Dict[str, Any]]] = None) -> List[Tuple[str, UpdateOne]]:
+        # `registrations` maps the IDs in this batch to their stored
+        # amountDue/paymentStatus
+        if event.get("type") != "payment_intent.succeeded":
+            return []
+
+        intent = event.get("data", {}).get("object", {})
+        metadata = intent.get("metadata", {})
+
+        order_id = metadata.get("orderId")
+        if order_id and ObjectId.is_valid(order_id):
+            paid = {"paymentId": intent.get("id"), "paidAt": datetime.utcnow()}
+            return [
+                # The usual case: paid while the stock is still held
+                ("merch_orders", UpdateOne({"_id": ObjectId(order_id), "status": "reserved"},
+                                           {"$set": {"status": "paid", **paid}, "$unset": {"expiresAt": ""}})),
+                # Paid after the reservation lapsed and the stock was released
+                ("merch_orders", UpdateOne({"_id": ObjectId(order_id), "status": {"$in": ["expired", "cancelled"]}},
+                                           {"$set": {"status": "paid_after_expiry", **paid}})),
+            ]
+
+        registration_id = self._registration_id(event)
+        if registration_id is None:
+            print(f"WARNING: Payment event {event.get('id')} has no valid registrationId or orderId")
+            return []
+
+        registration = (registrations or {}).get(registration_id)
+        if registration is None or registration.get("paymentStatus") == "paid":
+            return []
+        amount_due = registration.get("amountDue")
+        received = intent.get("amount_received") or 0
+        if amount_due is None or received < round(amount_due * 100):
+            print(f"WARNING: Payment event {event.get('id')} received {received} for registration {registration_id} "
+                  f"with amountDue {amount_due}; not marking it paid")
+            return []
+
+        return [("registrations", UpdateOne(
+            {"_id": registration_id, "paymentStatus": {"$ne": "paid"}},
+            {"$set": {"paymentStatus": "paid", "paymentId": intent.get("id")}},
+        ))]
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+payment_worker = PaymentEventWorker()
@@ -0,0 +1,67 @@
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+
+from app.core.config import get_settings
+
+# Refresh tokens are opaque random strings; only their SHA-256 is stored, in
+# `refresh_tokens` with a TTL index on expiresAt. Each use rotates the token
+# within its family, and presenting an already used token revokes the whole
+# family, since that means it was copied.
+
+settings = get_settings()
+
+def _hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _invalid() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+async def issue_refresh_token(db, user: Dict[str, Any], family: Optional[str] = None) -> str:
+    token = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    await db.refresh_tokens.insert_one({
+        "_id": _hash(token),
+        "userId": user["_id"],
+        "email": user["email"],
+        "family": family or uuid.uuid4().hex,
+        "createdAt": now,
+        "expiresAt": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        "usedAt": None,
+        "revoked": False,
+    })
+    return token
+
+async def rotate_refresh_token(db, token: str) -> Dict[str, Any]:
+    now = datetime.utcnow()
+    record = await db.refresh_tokens.find_one_and_update(
+        {"_id": _hash(token), "usedAt": None, "revoked": False, "expiresAt": {"$gt": now}},
+        {"$set": {"usedAt": now}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if record is None:
+        reused = await db.refresh_tokens.find_one({"_id": _hash(token), "usedAt": {"$ne": None}}, {"family": 1})
+        if reused:
+            await db.refresh_tokens.update_many({"family": reused["family"]}, {"$set": {"revoked": True}})
+        raise _invalid()
+
+    user = await db.users.find_one({"_id": record["userId"]}, {"email": 1})
+    if user is None:
+        raise _invalid()
+
+    new_token = await issue_refresh_token(db, user, family=record["family"])
+    return {"email": user["email"], "refresh_token": new_token}
+
+async def revoke_refresh_token(db, token: str):
+    record = await db.refresh_tokens.find_one({"_id": _hash(token)}, {"family": 1})
+    if record:
+        await db.refresh_tokens.update_many({"family": record["family"]}, {"$set": {"revoked": True}})
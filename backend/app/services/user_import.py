@@ -0,0 +1,125 @@
+import asyncio
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+
+from app.core.security import get_password_hash
+from app.core.user_search import with_search_keys
+from app.models.user import UserCreate
+
+INSERT_CHUNK_SIZE = 500
+HASH_CHUNK_SIZE = 64
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    # bcrypt is CPU bound and holds the GIL, so hashing happens in separate
+    # processes. The pool is created on first use and reused across imports.
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2)
+    return _hash_pool
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+def _hash_batch(passwords: List[str]) -> List[str]:
+    return [get_password_hash(p) for p in passwords]
+
+async def hash_passwords(passwords: List[str]) -> List[str]:
+    loop = asyncio.get_running_loop()
+    pool = _get_hash_pool()
+    chunks = [passwords[i:i + HASH_CHUNK_SIZE] for i in range(0, len(passwords), HASH_CHUNK_SIZE)]
+    results = await asyncio.gather(*[loop.run_in_executor(pool, _hash_batch, chunk) for chunk in chunks])
+    return [h for chunk in results for h in chunk]
+
+def parse_rows(content: bytes, filename: str = "", content_type: str = "") -> List[Dict[str, Any]]:
+    text = content.decode("utf-8-sig")
+    is_json = filename.lower().endswith(".json") or "json" in (content_type or "")
+    if not is_json and not filename.lower().endswith(".csv"):
+        is_json = text.lstrip().startswith(("[", "{"))
+
+    if is_json:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("users", [])
+        if not isinstance(data, list):
+            raise ValueError("JSON import must be a list of users or an object with a 'users' list")
+        return data
+
+    reader = csv.DictReader(io.StringIO(text))
+    # Empty CSV cells mean "not provided", not an empty string
+    return [{k.strip(): (v.strip() or None) for k, v in row.items() if k and v is not None} for row in reader]
+
+async def import_users(db, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    report: List[Dict[str, Any]] = [{"row": i + 1, "email": None, "status": None, "detail": None} for i in range(len(rows))]
+
+    # 1. Validate rows and drop duplicates within the file itself
+    candidates = {}
+    for i, raw in enumerate(rows):
+        entry = report[i]
+        if not isinstance(raw, dict):
+            entry.update(status="invalid", detail="Row is not an object")
+            continue
+        entry["email"] = raw.get("email")
+        try:
+            user = UserCreate(**raw)
+        except ValidationError as e:
+            entry.update(status="invalid", detail="; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+        if not user.password:
+            entry.update(status="invalid", detail="password: Field required")
+            continue
+        if user.email in candidates:
+            entry.update(status="duplicate", detail=f"Duplicate of row {candidates[user.email][0] + 1}")
+            continue
+        entry["email"] = user.email
+        candidates[user.email] = (i, user)
+
+    # 2. Dedupe against existing users in a single query
+    if candidates:
+        existing = await db.users.find({"email": {"$in": list(candidates)}}, {"email": 1}).to_list(None)
+        for doc in existing:
+            i, _ = candidates.pop(doc["email"])
+            report[i].update(status="exists", detail="Email already registered")
+
+    # 3. Hash passwords across the process pool
+    pending = list(candidates.values())
+    hashes = await hash_passwords([user.password for _, user in pending])
+
+    # 4. Insert in unordered chunks so one bad document does not stop the rest
+    for start in range(0, len(pending), INSERT_CHUNK_SIZE):
+        chunk = pending[start:start + INSERT_CHUNK_SIZE]
+        docs = []
+        for (i, user), hashed in zip(chunk, hashes[start:start + INSERT_CHUNK_SIZE]):
+            user_dict = user.model_dump()
+            user_dict["password"] = hashed
+            docs.append(with_search_keys(user_dict))
+
+        failed = {}
+        try:
+            await db.users.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                failed[err["index"]] = "Email already registered" if err.get("code") == 11000 else err.get("errmsg", "Insert failed")
+
+        for idx, ((i, _), doc) in enumerate(zip(chunk, docs)):
+            if idx in failed:
+                report[i].update(status="exists" if failed[idx] == "Email already registered" else "failed", detail=failed[idx])
+            else:
+                report[i].update(status="created", id=str(doc["_id"]))
+
+    summary = {}
+    for entry in report:
+        summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+
+    return {"total": len(rows), "summary": summary, "results": report}
@@ -0,0 +1,7 @@
+import os
+
+# Settings are read from the environment at import time; give the required
+# ones throwaway values so modules import without a .env file
+for key, value in (("MONGODB_URL", "mongodb://localhost:27017/test"), ("SECRET_KEY", "test-secret"),
+                   ("GOOGLE_CLIENT_ID", "test"), ("GOOGLE_CLIENT_SECRET", "test")):
+    os.environ.setdefault(key, value)
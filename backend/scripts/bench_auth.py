@@ -0,0 +1,37 @@
+import argparse
+import os
+import time
+from datetime import timedelta
+
+# Micro-benchmark of per-request token verification with and without the
+# decoded-token cache. Needs no database.
+# Usage (from the backend directory):
+#   python -m scripts.bench_auth [--requests 20000] [--tokens 200]
+
+for key, value in (("MONGODB_URL", "mongodb://localhost:27017/test"), ("SECRET_KEY", "bench-secret"),
+                   ("GOOGLE_CLIENT_ID", "bench"), ("GOOGLE_CLIENT_SECRET", "bench")):
+    os.environ.setdefault(key, value)
+
+from app.core.security import create_access_token, decode_access_token, token_cache  # noqa: E402
+
+def run(tokens, requests, use_cache):
+    token_cache.clear()
+    started = time.perf_counter()
+    for i in range(requests):
+        decode_access_token(tokens[i % len(tokens)], use_cache=use_cache)
+    return (time.perf_counter() - started) / requests
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark JWT verification per request")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--tokens", type=int, default=200, help="Distinct active tokens (users)")
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"user{i}@vitstudent.ac.in"}, timedelta(minutes=30)) for i in range(args.tokens)]
+
+    uncached = run(tokens, args.requests, use_cache=False)
+    cached = run(tokens, args.requests, use_cache=True)
+
+    print(f"{args.requests} requests over {args.tokens} tokens")
+    print(f"  jwt.decode every request: {uncached * 1e6:8.1f} us/request")
+    print(f"  with decode cache:        {cached * 1e6:8.1f} us/request ({uncached / cached:.1f}x)")
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import os
+import time
+
+from bson import ObjectId
+
+# Gate throughput: pass verification alone (no database), and optionally
+# batched check-in inserts against the configured database using a throwaway
+# event ID whose check-ins are removed afterwards.
+# Usage (from the backend directory):
+#   python -m scripts.bench_checkin [--scans 20000]
+#   python -m scripts.bench_checkin --db [--batch 500]
+
+for key, value in (("MONGODB_URL", "mongodb://localhost:27017/test"), ("SECRET_KEY", "bench-secret"),
+                   ("GOOGLE_CLIENT_ID", "bench"), ("GOOGLE_CLIENT_SECRET", "bench")):
+    os.environ.setdefault(key, value)
+
+from app.core.passes import issue_pass, verify_pass  # noqa: E402
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, get_database  # noqa: E402
+from app.services.checkin import CHECKINS_COLLECTION, checkin_doc, insert_checkins  # noqa: E402
+
+async def bench_inserts(claims, batch_size):
+    await connect_to_mongo()
+    db = await get_database()
+    event = claims[0].event
+    try:
+        started = time.perf_counter()
+        for i in range(0, len(claims), batch_size):
+            await insert_checkins(db, [checkin_doc(c, None, None, "bench", "live") for c in claims[i:i + batch_size]])
+        elapsed = time.perf_counter() - started
+        # Second pass: every scan is a duplicate
+        dup_started = time.perf_counter()
+        duplicates = 0
+        for i in range(0, len(claims), batch_size):
+            duplicates += (await insert_checkins(db, [checkin_doc(c, None, None, "bench", "live") for c in claims[i:i + batch_size]])).count(False)
+        dup_elapsed = time.perf_counter() - dup_started
+        print(f"  insert_many x{batch_size}:      {len(claims) / elapsed:8.0f} scans/s")
+        print(f"  re-scans (duplicates):  {len(claims) / dup_elapsed:8.0f} scans/s, {duplicates} rejected")
+    finally:
+        await db[CHECKINS_COLLECTION].delete_many({"event": event})
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark venue pass verification and check-in writes")
+    parser.add_argument("--scans", type=int, default=20000)
+    parser.add_argument("--db", action="store_true", help="Also benchmark batched inserts (needs MongoDB)")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    event = ObjectId()
+    passes = [issue_pass(ObjectId(), ObjectId(), event) for _ in range(args.scans)]
+
+    started = time.perf_counter()
+    claims = [verify_pass(p) for p in passes]
+    elapsed = time.perf_counter() - started
+
+    print(f"{args.scans} scans")
+    print(f"  verify_pass:            {args.scans / elapsed:8.0f} scans/s ({elapsed / args.scans * 1e6:.1f} us/scan)")
+    if args.db:
+        asyncio.run(bench_inserts(claims, args.batch))
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import time
+
+from bson import ObjectId
+
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, get_database
+from app.services.merch_orders import reserve_line
+
+# Contention benchmark for merch stock: thousands of concurrent buyers race
+# for one item and the script checks that exactly `stock` units were sold.
+# Runs against the configured database with a throwaway item that is removed
+# afterwards; point MONGODB_URL at a dev database.
+# Usage (from the backend directory):
+#   python -m scripts.bench_merch_stock [--buyers 5000] [--stock 300] [--size M]
+#   python -m scripts.bench_merch_stock --naive   # read-then-write, for comparison
+
+async def naive_reserve(db, item_id, size, quantity):
+    # What not to do: check and decrement in two steps
+    field = f"sizeStock.{size}" if size else "stock"
+    item = await db.merch_items.find_one({"_id": item_id})
+    left = item["sizeStock"][size] if size else item["stock"]
+    if left < quantity:
+        return False
+    await db.merch_items.update_one({"_id": item_id}, {"$set": {field: left - quantity}})
+    return True
+
+async def buyer(db, item_id, size, quantity, naive, start, latencies):
+    await start.wait()
+    started = time.perf_counter()
+    reserve = naive_reserve if naive else reserve_line
+    ok = await reserve(db, item_id, size, quantity)
+    latencies.append(time.perf_counter() - started)
+    return ok
+
+async def main(args):
+    await connect_to_mongo()
+    db = await get_database()
+    item = {"name": f"bench-{ObjectId()}", "price": 1, "salesOpen": True, "stock": None, "sizeStock": {}}
+    if args.size:
+        item["sizeStock"] = {args.size: args.stock}
+    else:
+        item["stock"] = args.stock
+    item_id = (await db.merch_items.insert_one(item)).inserted_id
+
+    try:
+        start = asyncio.Event()
+        latencies = []
+        tasks = [asyncio.create_task(buyer(db, item_id, args.size, args.quantity, args.naive, start, latencies)) for _ in range(args.buyers)]
+        await asyncio.sleep(0)
+        began = time.perf_counter()
+        start.set()
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - began
+
+        final = await db.merch_items.find_one({"_id": item_id})
+        left = final["sizeStock"][args.size] if args.size else final["stock"]
+        sold = sum(results) * args.quantity
+        latencies.sort()
+
+        print(f"{args.buyers} buyers, {args.stock} units, {args.quantity} per buyer ({'naive read-then-write' if args.naive else 'conditional $inc'})")
+        print(f"  successful reservations: {sum(results)} ({sold} units)")
+        print(f"  stock left:              {left}")
+        print(f"  wall time:               {elapsed:.2f}s ({args.buyers / elapsed:.0f} attempts/s)")
+        print(f"  latency p50/p99:         {latencies[len(latencies) // 2] * 1000:.1f} / {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+        expected_sold = min(args.stock // args.quantity, args.buyers) * args.quantity
+        if sold != expected_sold or left != args.stock - sold or left < 0:
+            print(f"  OVERSOLD or lost units: expected {expected_sold} sold and {args.stock - expected_sold} left")
+            return 1
+        print("  OK: no overselling")
+        return 0
+    finally:
+        await db.merch_items.delete_one({"_id": item_id})
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Race concurrent buyers for one merch item")
+    parser.add_argument("--buyers", type=int, default=5000)
+    parser.add_argument("--stock", type=int, default=300)
+    parser.add_argument("--quantity", type=int, default=1, help="Units each buyer reserves")
+    parser.add_argument("--size", help="Reserve from sizeStock[SIZE] instead of stock")
+    parser.add_argument("--naive", action="store_true", help="Use an unsafe read-then-write reservation for comparison")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
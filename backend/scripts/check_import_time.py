@@ -0,0 +1,83 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+# Startup-time budget check. Imports the app in a fresh interpreter with
+# `python -X importtime`, fails if the total exceeds the budget or if a
+# module that should be loaded lazily shows up. tests/test_import_time.py
+# runs the same check under pytest.
+# Usage (from the backend directory):
+#   python -m scripts.check_import_time [--budget-ms 1500]
+
+LAZY_MODULES = ["stripe", "google.oauth2", "google.auth.transport.requests", "passlib.handlers.bcrypt", "PIL.Image"]
+DEFAULT_BUDGET_MS = 1500
+
+Row = Tuple[str, int, int]  # module, self us, cumulative us
+
+def measure(target: str = "app.main") -> List[Row]:
+    env = dict(os.environ)
+    # Settings must load; dummy values are enough for an import
+    for key in ("MONGODB_URL", "SECRET_KEY", "GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET"):
+        env.setdefault(key, "mongodb://localhost:27017/test" if key == "MONGODB_URL" else "importtime")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"], capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr}")
+
+    # Lines look like: "import time:   self [us] |  cumulative | imported package"
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def total_ms(rows: List[Row]) -> float:
+    return sum(self_us for _, self_us, _ in rows) / 1000
+
+def eager_modules(rows: List[Row]) -> List[str]:
+    loaded = {name for name, _, _ in rows}
+    return [m for m in LAZY_MODULES if m in loaded]
+
+def slowest(rows: List[Row], top: int) -> Tuple[List[Row], List[Row]]:
+    # The app's own modules, and third-party packages by their top-level
+    # import (whose cumulative time covers their submodules). The nesting
+    # of -X importtime output only ever shows app.main at the top.
+    stdlib = set(sys.stdlib_module_names)
+    app_rows = [r for r in rows if r[0].split(".")[0] == "app" and r[0] != "app"]
+    third_party = [r for r in rows if "." not in r[0] and r[0] not in stdlib and r[0] != "app" and not r[0].startswith("_")]
+    by_cumulative = lambda rs: sorted(rs, key=lambda r: r[2], reverse=True)[:top]
+    return by_cumulative(app_rows), by_cumulative(third_party)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the app's import time against a budget")
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    try:
+        rows = measure(args.target)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    elapsed = total_ms(rows)
+    print(f"Importing {args.target} took {elapsed:.0f}ms (budget {args.budget_ms:.0f}ms)")
+
+    app_rows, third_party = slowest(rows, args.top)
+    for title, group in (("Slowest app modules:", app_rows), ("Slowest third-party packages:", third_party)):
+        print(title)
+        for name, _, cumulative_us in group:
+            print(f"  {cumulative_us / 1000:8.1f}ms  {name}")
+
+    eager = eager_modules(rows)
+    failed = False
+    if eager:
+        print(f"FAIL: loaded at import time but should be lazy: {', '.join(eager)}")
+        failed = True
+    if elapsed > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
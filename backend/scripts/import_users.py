@@ -0,0 +1,44 @@
+import argparse
+import asyncio
+import json
+import time
+
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, get_database
+from app.services.user_import import parse_rows, import_users, shutdown_hash_pool
+
+# Usage (from the backend directory):
+#   python -m scripts.import_users students.csv [--report report.json]
+
+async def main(path: str, report_path: str = None):
+    with open(path, "rb") as f:
+        rows = parse_rows(f.read(), path)
+
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        started = time.perf_counter()
+        result = await import_users(db, rows)
+        elapsed = time.perf_counter() - started
+    finally:
+        await close_mongo_connection()
+        shutdown_hash_pool()
+
+    print(f"Processed {result['total']} rows in {elapsed:.1f}s ({result['total'] / elapsed * 60 if elapsed else 0:.0f} rows/min)")
+    for status, count in sorted(result["summary"].items()):
+        print(f"  {status}: {count}")
+
+    for entry in result["results"]:
+        if entry["status"] != "created":
+            print(f"Row {entry['row']} ({entry['email']}): {entry['status']} - {entry['detail']}")
+
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Report written to {report_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import users from a CSV or JSON file")
+    parser.add_argument("path")
+    parser.add_argument("--report", help="Write the per-row report as JSON to this file")
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.report))
@@ -0,0 +1,365 @@
+import argparse
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.fees import FEE_FIELDS, billed_team_size, compute_amount_due
+from app.core.schedule import SCHEDULE_FIELDS, window_fields
+from app.core.user_search import SEARCH_KEYS_FIELD, SEARCH_SOURCE_FIELDS, search_keys
+from app.db.maintenance import BatchTask, CHECKPOINT_COLLECTION, run_batched, id_variants, to_object_id
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, get_database
+from app.models.user import UserRole
+from app.services.analytics import BUCKETS_COLLECTION, bucket_increments, bucket_ops, dimension_keys
+from app.services.cascade import detach_user_from_registrations
+
+# Usage (from the backend directory):
+#   python -m scripts.maintenance set-role --role super_coordinator --email alice@vit.ac.in
+#   python -m scripts.maintenance backfill-field --collection events --field isPinned --value false
+#   python -m scripts.maintenance normalize-ids --dry-run
+#   python -m scripts.maintenance orphan-cleanup --delete
+#   python -m scripts.maintenance recompute-amounts --include-paid
+#   python -m scripts.maintenance backfill-schedule
+#   python -m scripts.maintenance rebuild-analytics --restart
+#   python -m scripts.maintenance backfill-search-keys
+#
+# Every task walks its collection in _id order, checkpoints after each batch
+# and resumes from the last checkpoint when re-run with the same arguments.
+
+class SetRoleTask(BatchTask):
+    name = "set-role"
+    collection = "users"
+
+    @property
+    def query(self):
+        query: Dict[str, Any] = {"role": {"$ne": self.params["role"]}}
+        if self.params.get("from_role"):
+            query["role"] = self.params["from_role"]
+        if self.params.get("emails"):
+            query["email"] = {"$in": self.params["emails"]}
+        return query
+
+    @property
+    def projection(self):
+        return {"_id": 1, "email": 1, "role": 1}
+
+    async def process_batch(self, db, docs, dry_run):
+        if dry_run:
+            for d in docs:
+                print(f"  would set {d.get('email')}: {d.get('role')} -> {self.params['role']}")
+            return len(docs)
+        result = await db.users.update_many(
+            {"_id": {"$in": [d["_id"] for d in docs]}},
+            {"$set": {"role": self.params["role"]}},
+        )
+        return result.modified_count
+
+class BackfillFieldTask(BatchTask):
+    name = "backfill-field"
+
+    @property
+    def collection(self):
+        return self.params["collection"]
+
+    @property
+    def query(self):
+        return {self.params["field"]: {"$exists": False}}
+
+    @property
+    def projection(self):
+        return {"_id": 1}
+
+    async def process_batch(self, db, docs, dry_run):
+        if dry_run:
+            return len(docs)
+        result = await db[self.collection].update_many(
+            {"_id": {"$in": [d["_id"] for d in docs]}, self.params["field"]: {"$exists": False}},
+            {"$set": {self.params["field"]: self.params["value"]}},
+        )
+        return result.modified_count
+
+class NormalizeIdsTask(BatchTask):
+    # Registrations historically stored references as a mix of strings and
+    # ObjectIds; this converts all of them to ObjectIds.
+    name = "normalize-ids"
+    collection = "registrations"
+
+    @property
+    def projection(self):
+        return {"event": 1, "creator": 1, "teamMembers": 1, "invitationStatus": 1}
+
+    def normalized(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        updates = {}
+        for field in ("event", "creator"):
+            if field in doc:
+                value = to_object_id(doc[field])
+                if type(value) is not type(doc[field]):
+                    updates[field] = value
+        if "teamMembers" in doc:
+            members = [to_object_id(m) for m in doc["teamMembers"]]
+            if any(type(a) is not type(b) for a, b in zip(members, doc["teamMembers"])):
+                updates["teamMembers"] = members
+        if "invitationStatus" in doc:
+            changed = False
+            invitations = []
+            for inv in doc["invitationStatus"]:
+                inv = dict(inv)
+                if "userId" in inv:
+                    value = to_object_id(inv["userId"])
+                    changed = changed or type(value) is not type(inv["userId"])
+                    inv["userId"] = value
+                invitations.append(inv)
+            if changed:
+                updates["invitationStatus"] = invitations
+        return updates
+
+    async def process_batch(self, db, docs, dry_run):
+        ops = []
+        for doc in docs:
+            updates = self.normalized(doc)
+            if updates:
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": updates}))
+        if ops and not dry_run:
+            await db.registrations.bulk_write(ops, ordered=False)
+        return len(ops)
+
+class OrphanCleanupTask(BatchTask):
+    # Reconciliation scan: registrations whose event is gone, or that
+    # reference users who no longer exist. With --delete they are fixed the
+    # same way the delete cascades do it.
+    name = "orphan-cleanup"
+    collection = "registrations"
+
+    @property
+    def writes(self):
+        return bool(self.params.get("delete"))
+
+    @property
+    def projection(self):
+        return {"event": 1, "creator": 1, "teamMembers": 1, "invitationStatus": 1, "paymentStatus": 1, "amountDue": 1}
+
+    async def process_batch(self, db, docs, dry_run):
+        event_ids = {to_object_id(d.get("event")) for d in docs if d.get("event")}
+        user_ids = set()
+        for d in docs:
+            user_ids.update(to_object_id(u) for u in [d.get("creator"), *d.get("teamMembers", [])] if u)
+        events = await db.events.find({"_id": {"$in": list(event_ids)}}, {"_id": 1}).to_list(None)
+        users = await db.users.find({"_id": {"$in": list(user_ids)}}, {"_id": 1}).to_list(None)
+        live_events = {e["_id"] for e in events}
+        live_users = {u["_id"] for u in users}
+
+        orphan_ids = []
+        to_detach = []
+        missing_refs = set()
+        for d in docs:
+            if to_object_id(d.get("event")) not in live_events:
+                orphan_ids.append(d["_id"])
+                print(f"  {d['_id']}: missing event {d.get('event')}")
+                continue
+            missing = [u for u in [d.get("creator"), *d.get("teamMembers", [])] if u and to_object_id(u) not in live_users]
+            if missing:
+                print(f"  {d['_id']}: missing users {', '.join(map(str, set(missing)))}")
+                to_detach.append(d)
+                missing_refs.update(ref for u in set(map(str, missing)) for ref in id_variants(u))
+
+        if self.params.get("delete") and not dry_run:
+            if orphan_ids:
+                await db.registrations.delete_many({"_id": {"$in": orphan_ids}})
+            # Every ref is a deleted user, so one call can detach them all
+            if to_detach:
+                await detach_user_from_registrations(db, to_detach, list(missing_refs))
+        return len(orphan_ids) + len(to_detach)
+
+class RecomputeAmountsTask(BatchTask):
+    # Backfills/refreshes registrations.amountDue from the event fee model
+    name = "recompute-amounts"
+    collection = "registrations"
+
+    @property
+    def query(self):
+        if self.params.get("include_paid"):
+            return {}
+        # Paid rows keep what was charged, but legacy ones without amountDue
+        # still need it for the revenue reports
+        return {"$or": [{"paymentStatus": {"$ne": "paid"}}, {"amountDue": {"$exists": False}}]}
+
+    @property
+    def projection(self):
+        return {"event": 1, "teamMembers": 1, "invitationStatus": 1, "amountDue": 1}
+
+    async def process_batch(self, db, docs, dry_run):
+        event_ids = list({to_object_id(d.get("event")) for d in docs if d.get("event")})
+        events = await db.events.find({"_id": {"$in": event_ids}}, FEE_FIELDS).to_list(None)
+        events_by_id = {e["_id"]: e for e in events}
+
+        ops = []
+        for d in docs:
+            event = events_by_id.get(to_object_id(d.get("event")))
+            if not event:
+                continue
+            amount = compute_amount_due(event, billed_team_size(d))
+            if d.get("amountDue") != amount:
+                ops.append(UpdateOne({"_id": d["_id"]}, {"$set": {"amountDue": amount}}))
+        if ops and not dry_run:
+            await db.registrations.bulk_write(ops, ordered=False)
+        return len(ops)
+
+class BackfillScheduleTask(BatchTask):
+    # Copies event time windows (startsAt/endsAt) onto registrations that
+    # predate the schedule-clash check
+    name = "backfill-schedule"
+    collection = "registrations"
+
+    @property
+    def query(self):
+        return {"startsAt": {"$exists": False}}
+
+    @property
+    def projection(self):
+        return {"event": 1}
+
+    async def process_batch(self, db, docs, dry_run):
+        event_ids = list({to_object_id(d.get("event")) for d in docs if d.get("event")})
+        events = await db.events.find({"_id": {"$in": event_ids}}, SCHEDULE_FIELDS).to_list(None)
+        events_by_id = {e["_id"]: e for e in events}
+
+        ops = []
+        for d in docs:
+            event = events_by_id.get(to_object_id(d.get("event")))
+            if event:
+                ops.append(UpdateOne({"_id": d["_id"]}, {"$set": window_fields(event)}))
+        if ops and not dry_run:
+            await db.registrations.bulk_write(ops, ordered=False)
+        return len(ops)
+
+class RebuildAnalyticsTask(BatchTask):
+    # Rebuilds the hourly registration buckets from history, bucketing each
+    # registration by its _id creation time. A fresh run clears the buckets
+    # and counts registrations created before it started; newer ones are
+    # counted live by the API. If a run dies mid-batch that batch may be
+    # counted twice on resume - use --restart for an exact rebuild.
+    name = "rebuild-analytics"
+    collection = "registrations"
+    cutoff = None
+
+    @property
+    def query(self):
+        return {"_id": {"$lt": self.cutoff}}
+
+    @property
+    def projection(self):
+        return {"event": 1, "creator": 1, "teamMembers": 1}
+
+    async def prepare(self, db, resuming, dry_run):
+        state = await db[CHECKPOINT_COLLECTION].find_one({"_id": self.checkpoint_key}, {"cutoff": 1})
+        if resuming and state and state.get("cutoff"):
+            self.cutoff = state["cutoff"]
+            return
+        if dry_run:
+            self.cutoff = ObjectId.from_datetime(datetime.utcnow())
+            return
+        # Clear first, then take the cutoff: a registration created between
+        # the two is then counted once, by the live increment, instead of
+        # being wiped with the old buckets and skipped by the rebuild
+        await db[BUCKETS_COLLECTION].delete_many({})
+        self.cutoff = ObjectId.from_datetime(datetime.utcnow())
+        await db[CHECKPOINT_COLLECTION].update_one({"_id": self.checkpoint_key}, {"$set": {"cutoff": self.cutoff}}, upsert=True)
+
+    async def process_batch(self, db, docs, dry_run):
+        event_ids = list({to_object_id(d.get("event")) for d in docs if d.get("event")})
+        user_ids = list({to_object_id(d.get("creator")) for d in docs if d.get("creator")})
+        events = await db.events.find({"_id": {"$in": event_ids}}, {"clubs": 1}).to_list(None)
+        users = await db.users.find({"_id": {"$in": user_ids}}, {"school": 1, "isVITian": 1}).to_list(None)
+        events_by_id = {e["_id"]: e for e in events}
+        users_by_id = {u["_id"]: u for u in users}
+
+        counts = {}
+        for d in docs:
+            keys = dimension_keys(events_by_id.get(to_object_id(d.get("event"))), users_by_id.get(to_object_id(d.get("creator"))), d.get("event"))
+            bucket_increments(d["_id"].generation_time, keys, len(d.get("teamMembers", [])) or 1, counts)
+        if counts and not dry_run:
+            await db[BUCKETS_COLLECTION].bulk_write(bucket_ops(counts), ordered=False)
+        return len(docs)
+
+class BackfillSearchKeysTask(BatchTask):
+    # Adds the typeahead keys to users created before /users/search
+    name = "backfill-search-keys"
+    collection = "users"
+
+    @property
+    def query(self):
+        return {SEARCH_KEYS_FIELD: {"$exists": False}}
+
+    @property
+    def projection(self):
+        return {f: 1 for f in SEARCH_SOURCE_FIELDS}
+
+    async def process_batch(self, db, docs, dry_run):
+        ops = [UpdateOne({"_id": d["_id"]}, {"$set": {SEARCH_KEYS_FIELD: search_keys(d)}}) for d in docs]
+        if ops and not dry_run:
+            await db.users.bulk_write(ops, ordered=False)
+        return len(ops)
+
+TASKS = {
+    SetRoleTask.name: SetRoleTask,
+    BackfillFieldTask.name: BackfillFieldTask,
+    NormalizeIdsTask.name: NormalizeIdsTask,
+    OrphanCleanupTask.name: OrphanCleanupTask,
+    RecomputeAmountsTask.name: RecomputeAmountsTask,
+    BackfillScheduleTask.name: BackfillScheduleTask,
+    RebuildAnalyticsTask.name: RebuildAnalyticsTask,
+    BackfillSearchKeysTask.name: BackfillSearchKeysTask,
+}
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--batch-size", type=int, default=500)
+    common.add_argument("--throttle", type=float, default=0.0, help="Seconds to sleep between batches")
+    common.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    common.add_argument("--restart", action="store_true", help="Ignore any saved checkpoint")
+
+    parser = argparse.ArgumentParser(description="Batched, resumable database maintenance")
+    sub = parser.add_subparsers(dest="task", required=True)
+
+    p = sub.add_parser(SetRoleTask.name, parents=[common], help="Change user roles")
+    p.add_argument("--role", required=True, choices=[r.value for r in UserRole])
+    p.add_argument("--from-role", choices=[r.value for r in UserRole])
+    p.add_argument("--email", action="append", dest="emails", help="Limit to these emails (repeatable)")
+
+    p = sub.add_parser(BackfillFieldTask.name, parents=[common], help="Set a field where it is missing")
+    p.add_argument("--collection", required=True)
+    p.add_argument("--field", required=True)
+    p.add_argument("--value", required=True, type=json.loads, help="JSON value, e.g. false, 0, \"text\"")
+
+    sub.add_parser(NormalizeIdsTask.name, parents=[common], help="Store registration references as ObjectIds")
+
+    p = sub.add_parser(OrphanCleanupTask.name, parents=[common], help="Find registrations referencing deleted events or users")
+    p.add_argument("--delete", action="store_true", help="Delete orphaned registrations and detach missing users instead of only reporting")
+
+    p = sub.add_parser(RecomputeAmountsTask.name, parents=[common], help="Recompute registrations.amountDue from event fees")
+    p.add_argument("--include-paid", action="store_true", help="Also recompute registrations that are already paid")
+
+    sub.add_parser(BackfillScheduleTask.name, parents=[common], help="Copy event time windows onto registrations")
+
+    sub.add_parser(RebuildAnalyticsTask.name, parents=[common], help="Rebuild hourly registration analytics buckets from history")
+
+    sub.add_parser(BackfillSearchKeysTask.name, parents=[common], help="Add typeahead search keys to existing users")
+
+    return parser
+
+async def main(args: argparse.Namespace):
+    params = {k: v for k, v in vars(args).items() if k not in ("task", "batch_size", "throttle", "dry_run", "restart") and v is not None}
+    task = TASKS[args.task](**params)
+
+    await connect_to_mongo()
+    try:
+        db = await get_database()
+        await run_batched(db, task, batch_size=args.batch_size, throttle=args.throttle, dry_run=args.dry_run, restart=args.restart)
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(main(build_parser().parse_args()))
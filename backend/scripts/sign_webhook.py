@@ -0,0 +1,49 @@
+import argparse
+import json
+import time
+import uuid
+
+from app.core.config import get_settings
+from app.core.webhooks import sign_payload
+
+# Builds a signed payment_intent.succeeded event for local testing.
+# Usage (from the backend directory):
+#   python -m scripts.sign_webhook <registrationId> [--send http://localhost:8000/payments/webhook]
+
+def build_event(registration_id: str, event_id: str = None) -> dict:
+    return {
+        "id": event_id or f"evt_local_{uuid.uuid4().hex}",
+        "type": "payment_intent.succeeded",
+        "created": int(time.time()),
+        "data": {
+            "object": {
+                "id": f"pi_local_{uuid.uuid4().hex[:24]}",
+                "object": "payment_intent",
+                "status": "succeeded",
+                "metadata": {"registrationId": registration_id},
+            }
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a signed payment webhook payload")
+    parser.add_argument("registration_id")
+    parser.add_argument("--event-id", help="Reuse an event ID to exercise deduplication")
+    parser.add_argument("--secret", help="Defaults to STRIPE_WEBHOOK_SECRET from settings")
+    parser.add_argument("--send", metavar="URL", help="POST the payload to this URL")
+    args = parser.parse_args()
+
+    secret = args.secret or get_settings().STRIPE_WEBHOOK_SECRET
+    if not secret:
+        parser.error("No secret given and STRIPE_WEBHOOK_SECRET is not set")
+
+    payload = json.dumps(build_event(args.registration_id, args.event_id)).encode()
+    signature = sign_payload(payload, secret)
+
+    if args.send:
+        import httpx
+        response = httpx.post(args.send, content=payload, headers={"Stripe-Signature": signature, "Content-Type": "application/json"})
+        print(response.status_code, response.text)
+    else:
+        print(f"Stripe-Signature: {signature}")
+        print(payload.decode())
@@ -0,0 +1,52 @@
+import pytest
+
+pytest.importorskip("motor")
+
+from bson import ObjectId  # noqa: E402
+
+from app.services.payment_events import PaymentEventWorker  # noqa: E402
+
+worker = PaymentEventWorker()
+
+def intent_event(metadata, amount_received=50000, event_type="payment_intent.succeeded"):
+    return {
+        "id": "evt_1",
+        "type": event_type,
+        "data": {"object": {"id": "pi_1", "amount_received": amount_received, "metadata": metadata}},
+    }
+
+def test_registration_paid_in_full():
+    reg_id = ObjectId()
+    registrations = {reg_id: {"_id": reg_id, "amountDue": 500, "paymentStatus": "pending"}}
+    updates = worker._to_updates(intent_event({"registrationId": str(reg_id)}), registrations)
+    assert len(updates) == 1
+    collection, op = updates[0]
+    assert collection == "registrations"
+    assert op._filter["_id"] == reg_id
+    assert op._doc["$set"] == {"paymentStatus": "paid", "paymentId": "pi_1"}
+
+def test_registration_underpaid_is_skipped():
+    reg_id = ObjectId()
+    registrations = {reg_id: {"_id": reg_id, "amountDue": 500, "paymentStatus": "pending"}}
+    assert worker._to_updates(intent_event({"registrationId": str(reg_id)}, amount_received=100), registrations) == []
+
+def test_registration_unknown_or_already_paid():
+    reg_id = ObjectId()
+    event = intent_event({"registrationId": str(reg_id)})
+    assert worker._to_updates(event, {}) == []
+    assert worker._to_updates(event, {reg_id: {"_id": reg_id, "amountDue": 500, "paymentStatus": "paid"}}) == []
+
+def test_merch_order():
+    order_id = ObjectId()
+    updates = worker._to_updates(intent_event({"orderId": str(order_id)}))
+    assert [c for c, _ in updates] == ["merch_orders", "merch_orders"]
+    reserved, lapsed = (op for _, op in updates)
+    assert reserved._filter == {"_id": order_id, "status": "reserved"}
+    assert reserved._doc["$set"]["status"] == "paid"
+    assert lapsed._doc["$set"]["status"] == "paid_after_expiry"
+
+@pytest.mark.parametrize("event_type", ["payment_intent.created", "payment_intent.payment_failed", "charge.refunded"])
+def test_other_event_types_are_ignored(event_type):
+    reg_id = ObjectId()
+    registrations = {reg_id: {"_id": reg_id, "amountDue": 500, "paymentStatus": "pending"}}
+    assert worker._to_updates(intent_event({"registrationId": str(reg_id)}, event_type=event_type), registrations) == []
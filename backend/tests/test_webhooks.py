@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from app.core.webhooks import WebhookSignatureError, sign_payload, verify_signature
+
+SECRET = "whsec_test"
+PAYLOAD = b'{"id": "evt_1", "type": "payment_intent.succeeded"}'
+
+def test_valid_signature():
+    verify_signature(PAYLOAD, sign_payload(PAYLOAD, SECRET), SECRET)
+
+def test_stale_timestamp():
+    header = sign_payload(PAYLOAD, SECRET, timestamp=int(time.time()) - 3600)
+    with pytest.raises(WebhookSignatureError, match="tolerance"):
+        verify_signature(PAYLOAD, header, SECRET, tolerance=300)
+
+def test_bad_mac():
+    timestamp = int(time.time())
+    with pytest.raises(WebhookSignatureError, match="No matching signature"):
+        verify_signature(PAYLOAD, f"t={timestamp},v1={'0' * 64}", SECRET)
+
+def test_tampered_body():
+    header = sign_payload(PAYLOAD, SECRET)
+    with pytest.raises(WebhookSignatureError):
+        verify_signature(PAYLOAD + b" ", header, SECRET)
+
+def test_missing_or_malformed_header():
+    with pytest.raises(WebhookSignatureError, match="Missing"):
+        verify_signature(PAYLOAD, None, SECRET)
+    with pytest.raises(WebhookSignatureError, match="Malformed"):
+        verify_signature(PAYLOAD, "v1=abc", SECRET)
@@ -1,9 +1,10 @@
 import { useState, useEffect } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 import client from '../../api/client';
+import { liveStream } from '../../lib/liveStream';
 
 export default function CollectionChart() {
-    const [data, setData] = useState([]);
+    const [events, setEvents] = useState<{ _id: string; name: string; amountCollected: number }[]>([]);
     const [loading, setLoading] = useState(true);
 
     useEffect(() => {
@@ -12,18 +13,7 @@ export default function CollectionChart() {
                 // Fetch events to get revenue breakdown
                 const res = await client.get('/admin/events');
                 if (res.data.success) {
-                    const events = res.data.data;
-                    // Sort descending by revenue and take top 5
-                    // @ts-ignore
-                    const sorted = events.sort((a, b) => b.amountCollected - a.amountCollected).slice(0, 5);
-
-                    const chartData = sorted.map((e: any) => ({
-                        name: e.name.length > 15 ? e.name.substring(0, 15) + '...' : e.name,
-                        Revenue: e.amountCollected
-                    }));
-
-                    // @ts-ignore
-                    setData(chartData);
+                    setEvents(res.data.data);
                 }
             } catch (error) {
                 console.error("Failed to fetch chart data", error);
@@ -32,8 +22,27 @@ export default function CollectionChart() {
             }
         }
         fetchData();
+
+        // Payments move revenue between bars; reload on resync
+        return liveStream.subscribe((message) => {
+            if (message.type === 'resync') {
+                fetchData();
+            } else if (message.delta?.amountCollected && message.event) {
+                const amount = message.delta.amountCollected;
+                setEvents(prev => prev.map(e => e._id === message.event ? { ...e, amountCollected: e.amountCollected + amount } : e));
+            }
+        });
     }, []);
 
+    // Sort descending by revenue and take top 5
+    const data = [...events]
+        .sort((a, b) => b.amountCollected - a.amountCollected)
+        .slice(0, 5)
+        .map(e => ({
+            name: e.name.length > 15 ? e.name.substring(0, 15) + '...' : e.name,
+            Revenue: e.amountCollected
+        }));
+
     if (loading) {
         return <div className="h-64 flex items-center justify-center text-gray-500">Loading chart...</div>;
     }
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import { FiUsers, FiDollarSign, FiCheckCircle, FiXCircle } from 'react-icons/fi';
 import client from '../../api/client';
+import { liveStream } from '../../lib/liveStream';
 
 const Dashboard = () => {
     // Extended Stats State
@@ -28,6 +29,22 @@ const Dashboard = () => {
             }
         }
         fetchData();
+
+        // Live deltas instead of polling; reload only when told to resync
+        return liveStream.subscribe((message) => {
+            if (message.type === 'ready' || message.type === 'resync') {
+                fetchData();
+            } else if (message.delta) {
+                const d = message.delta;
+                setStats(prev => ({
+                    ...prev,
+                    totalRevenue: (prev.totalRevenue || 0) + d.amountCollected,
+                    totalRegistrations: prev.totalRegistrations + d.registered,
+                    paidCount: prev.paidCount + d.paid,
+                    unpaidCount: prev.unpaidCount + d.unpaid,
+                }));
+            }
+        });
     }, []);
 
     const statCards = [
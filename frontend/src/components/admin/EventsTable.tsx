@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { FiSearch, FiEdit2, FiTrash2, FiPlus } from 'react-icons/fi';
 import client from '../../api/client';
+import { liveStream } from '../../lib/liveStream';
 
 interface AdminEvent {
     _id: string;
@@ -45,6 +46,21 @@ export default function EventsTable() {
 
     useEffect(() => {
         fetchData();
+        // Apply live count deltas to the matching row; reload on resync
+        return liveStream.subscribe((message) => {
+            if (message.type === 'resync') {
+                fetchData();
+            } else if (message.delta && message.event) {
+                const d = message.delta;
+                setEvents(prev => prev.map(e => e._id === message.event ? {
+                    ...e,
+                    registered: e.registered + d.registered,
+                    paid: e.paid + d.paid,
+                    unpaid: e.unpaid + d.unpaid,
+                    amountCollected: e.amountCollected + d.amountCollected,
+                } : e));
+            }
+        });
     }, []);
 
     const handleToggle = async (id: string, field: string, currentValue: boolean) => {
@@ -0,0 +1,51 @@
+import client from '../api/client';
+
+// Registration/payment count deltas from /admin/stream. All admin widgets on
+// a page share one EventSource; it opens with the first listener and closes
+// with the last. 'ready' and 'resync' mean: reload your numbers.
+
+export interface LiveDelta {
+    registered: number;
+    paid: number;
+    unpaid: number;
+    amountCollected: number;
+    outstandingDues: number;
+}
+
+export interface LiveMessage {
+    type: string;
+    event?: string | null;
+    registration?: string | null;
+    delta?: LiveDelta;
+}
+
+class LiveStream {
+    private listeners: ((message: LiveMessage) => void)[] = [];
+    private source: EventSource | null = null;
+
+    subscribe(listener: (message: LiveMessage) => void) {
+        this.listeners.push(listener);
+        this.open();
+        return () => {
+            this.listeners = this.listeners.filter(l => l !== listener);
+            if (this.listeners.length === 0) {
+                this.source?.close();
+                this.source = null;
+            }
+        };
+    }
+
+    private open() {
+        if (this.source) return;
+        // EventSource cannot send headers, so the token goes in the query
+        const token = localStorage.getItem('token');
+        if (!token) return;
+        this.source = new EventSource(`${client.defaults.baseURL}/admin/stream?access_token=${encodeURIComponent(token)}`);
+        this.source.onmessage = (e) => {
+            const message: LiveMessage = JSON.parse(e.data);
+            this.listeners.forEach(l => l(message));
+        };
+    }
+}
+
+export const liveStream = new LiveStream();
@@ -5,6 +5,9 @@ import { useAuth } from '../context/AuthContext';
 import NotFound from './NotFound';
 import { FiSearch, FiTrash2, FiEdit2, FiX, FiCheck } from 'react-icons/fi';
 
+// The list loads a page at a time; search covers everyone else
+const PAGE_SIZE = 50;
+
 interface User {
     _id: string;
     name: string;
@@ -26,7 +29,10 @@ export default function AdminUsers() {
 
     const [users, setUsers] = useState<User[]>([]);
     const [loading, setLoading] = useState(true);
+    const [hasMore, setHasMore] = useState(false);
     const [searchTerm, setSearchTerm] = useState('');
+    // Server-side prefix matches once at least two characters are typed
+    const [searchResults, setSearchResults] = useState<User[] | null>(null);
 
     // Edit Modal State
     const [editingUser, setEditingUser] = useState<User | null>(null);
@@ -36,10 +42,28 @@ export default function AdminUsers() {
         fetchUsers();
     }, []);
 
-    const fetchUsers = async () => {
+    useEffect(() => {
+        const term = searchTerm.trim();
+        if (term.length < 2) {
+            setSearchResults(null);
+            return;
+        }
+        const timer = setTimeout(async () => {
+            try {
+                const res = await client.get('/users/search', { params: { q: term, limit: 20 } });
+                setSearchResults(res.data.data);
+            } catch (error) {
+                console.error("User search failed", error);
+            }
+        }, 250);
+        return () => clearTimeout(timer);
+    }, [searchTerm]);
+
+    const fetchUsers = async (skip = 0) => {
         try {
-            const res = await client.get('/users/');
-            setUsers(res.data);
+            const res = await client.get('/users/', { params: { skip, limit: PAGE_SIZE } });
+            setUsers(prev => skip === 0 ? res.data : [...prev, ...res.data]);
+            setHasMore(res.data.length === PAGE_SIZE);
         } catch (error) {
             console.error("Failed to fetch users", error);
             toast.error("Failed to load users");
@@ -54,6 +78,7 @@ export default function AdminUsers() {
             await client.delete(`/users/${userId}`);
             toast.success("User deleted");
             setUsers(prev => prev.filter(u => u._id !== userId));
+            setSearchResults(prev => prev && prev.filter(u => u._id !== userId));
         } catch (error: any) {
             toast.error(error.response?.data?.detail || "Delete failed");
         }
@@ -69,6 +94,7 @@ export default function AdminUsers() {
         try {
             const res = await client.put(`/users/${editingUser._id}`, editForm);
             setUsers(prev => prev.map(u => u._id === editingUser._id ? res.data : u));
+            setSearchResults(prev => prev && prev.map(u => u._id === editingUser._id ? res.data : u));
             toast.success("User updated");
             setEditingUser(null);
         } catch (error: any) {
@@ -76,11 +102,7 @@ export default function AdminUsers() {
         }
     };
 
-    const filteredUsers = users.filter(u =>
-        u.name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        u.email.toLowerCase().includes(searchTerm.toLowerCase()) ||
-        u.registrationNumber?.toLowerCase().includes(searchTerm.toLowerCase())
-    );
+    const filteredUsers = searchResults ?? users;
 
     if (loading) return <div className="text-center py-10 text-gray-500">Loading users...</div>;
 
@@ -90,7 +112,7 @@ export default function AdminUsers() {
                 <div className="flex items-center gap-4">
                     <h1 className="text-2xl font-bold text-white tracking-tight">Users</h1>
                     <div className="px-3 py-1 bg-[#1F1F21] rounded-full text-xs font-medium text-gray-400">
-                        Total: <span className="text-white ml-1">{users.length}</span>
+                        Loaded: <span className="text-white ml-1">{users.length}{hasMore ? '+' : ''}</span>
                     </div>
                 </div>
 
@@ -153,6 +175,15 @@ export default function AdminUsers() {
                         </div>
                     </div>
                 ))}
+
+                {searchResults === null && hasMore && (
+                    <button
+                        onClick={() => fetchUsers(users.length)}
+                        className="mt-2 py-2.5 rounded-lg bg-[#1F1F21] text-sm text-gray-400 hover:text-white hover:bg-[#2C2C2E] transition-colors"
+                    >
+                        Load more
+                    </button>
+                )}
             </div>
 
             {/* Edit Modal */}
@@ -16,6 +16,8 @@ export default function EventDetails() {
 
     // Team Management State
     const [teamEmails, setTeamEmails] = useState<string[]>([]);
+    const [suggestions, setSuggestions] = useState<{ _id: string; name?: string; email: string }[]>([]);
+    const [suggestFor, setSuggestFor] = useState('');
 
     useEffect(() => {
         async function fetchEventDetails() {
@@ -47,6 +49,24 @@ export default function EventDetails() {
         if (id) fetchEventDetails();
     }, [id, user]);
 
+    // Suggest registered users as a teammate's email is typed
+    useEffect(() => {
+        const term = suggestFor.trim();
+        if (term.length < 4 || (term.includes('@') && term.split('@')[1].includes('.'))) {
+            setSuggestions([]);
+            return;
+        }
+        const timer = setTimeout(async () => {
+            try {
+                const res = await client.get('/users/search', { params: { q: term } });
+                setSuggestions(res.data.data);
+            } catch {
+                setSuggestions([]);
+            }
+        }, 250);
+        return () => clearTimeout(timer);
+    }, [suggestFor]);
+
     // Team Helpers
     const handleAddTeammate = () => {
         if (!event) return;
@@ -61,6 +81,7 @@ export default function EventDetails() {
         const newEmails = [...teamEmails];
         newEmails[index] = value;
         setTeamEmails(newEmails);
+        setSuggestFor(value);
     };
 
     const handleRemoveTeammate = (index: number) => {
@@ -87,11 +108,20 @@ export default function EventDetails() {
             return;
         }
 
+        const register = (allowScheduleClash: boolean) => client.post('/registrations/', {
+            event: id,
+            teamEmails: validEmails,
+            allowScheduleClash
+        });
+
         try {
-            await client.post('/registrations/', {
-                event: id,
-                teamEmails: validEmails
-            });
+            try {
+                await register(false);
+            } catch (error: any) {
+                // Overlapping events are allowed once the user confirms
+                if (error.response?.status !== 409 || !window.confirm(`${error.response.data.detail}\n\nRegister anyway?`)) throw error;
+                await register(true);
+            }
             setRegistrationStatus('pending');
             toast.success("Successfully registered!");
             navigate('/dashboard');
@@ -327,6 +357,7 @@ export default function EventDetails() {
                                                             placeholder={`Member ${idx + 2} Email`}
                                                             value={email}
                                                             onChange={e => handleEmailChange(idx, e.target.value)}
+                                                            list="teammate-suggestions"
                                                         />
                                                         <button
                                                             onClick={() => handleRemoveTeammate(idx)}
@@ -336,6 +367,11 @@ export default function EventDetails() {
                                                         </button>
                                                     </div>
                                                 ))}
+                                                <datalist id="teammate-suggestions">
+                                                    {suggestions.map(s => (
+                                                        <option key={s._id} value={s.email}>{s.name}</option>
+                                                    ))}
+                                                </datalist>
                                             </div>
 
                                             {teamEmails.length + 1 < event.groupSizeMax && (
@@ -6,6 +6,7 @@ interface IMerchItem {
     name: string;
     price: number;
     image: string;
+    imageThumbnail?: string;
 }
 
 export default function Merch() {
@@ -53,7 +54,7 @@ export default function Merch() {
                                 <div className="aspect-square bg-[#151516] rounded-[32px] overflow-hidden mb-8 relative">
                                     <div className="absolute inset-0 bg-white/5 opacity-0 group-hover:opacity-100 transition-opacity duration-500 z-10"></div>
                                     <img
-                                        src={item.image || '/placeholder.png'}
+                                        src={item.imageThumbnail || item.image || '/placeholder.png'}
                                         alt={item.name}
                                         className="w-full h-full object-cover transform transition-transform duration-700 ease-out group-hover:scale-105"
                                     />
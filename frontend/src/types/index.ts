@@ -17,6 +17,7 @@ export interface Event {
     name: string;
     description?: string;
     poster?: string;
+    posterThumbnail?: string;
     clubs: Club[]; // Populated in backend or handled appropriately
     isCollaboration: boolean;
     venue?: string;